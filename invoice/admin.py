@@ -1,71 +1,286 @@
-from decimal import Decimal
+import os
+from copy import copy
+from datetime import datetime
+
 from django.contrib import admin, messages
-from django.db.models import Q
-from django.http import HttpResponse
+from django.contrib.admin import helpers
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ALL_VAR, ERROR_FLAG, ORDER_VAR, SEARCH_VAR
+from django.core.exceptions import PermissionDenied
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import F, Max, Min, OuterRef, Q, Subquery
+from django.http import FileResponse, Http404, HttpResponseRedirect, JsonResponse
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+from django.utils.text import smart_split, unescape_string_literal
 from django.utils.translation import gettext_lazy as _
 from functools import reduce
 from import_export import fields
 from import_export.admin import ImportExportMixin, ImportForm
 from import_export.resources import ModelResource
 from import_export.widgets import Widget
-from io import BytesIO
-from operator import or_
+from operator import and_, or_
+from tempfile import SpooledTemporaryFile
+from time import perf_counter
+
+
+from .archive import current_month, month_start, move_call_logs, restore_call_ids, shift_period
+from .caching import cached_for_queryset, call_logs_changed
+from .choices import ChoiceLookup, SpellingLookup, known_languages
+from .dedup import chunk_digest, imported_chunks, record_chunks
+from .exports import STREAM_FORMATS, ExportCallLogResource, ExportInterpreterResource, export_rows
+from .forms import CallLogConfirmImportForm, CallLogImportForm, StreamImportForm
+from .instrumentation import instrumented_resource, recording, timed_class
+from .importer import (
+    CALL_LOG_HEADERS,
+    CHUNK_SIZE,
+    FORMATS,
+    interpreter_ids,
+    link_interpreters,
+    zip_files,
+)
+from .jobs import SPOOL_SIZE, enqueue, retryable_jobs, selection_params
+from .models import (
+    ArchivedCallLog,
+    CallLog,
+    DailyTotal,
+    ImportedFile,
+    Interpreter,
+    InterpreterTotal,
+    Job,
+    PipelineRun,
+)
+from .pagination import CachedCountPaginator
+from .search import sqlite_contains_q, sqlite_search_available
+from .snapshots import CallLogSnapshot, snapshots_enabled
+from .streaming import ThreadedStreamingHttpResponse
+from .timing import QueryTimer, server_timing
+from .totals import (
+    LOOKUP_BATCH_SIZE,
+    WRITE_BATCH_SIZE,
+    TotalsDelta,
+    batched,
+    call_log_summary,
+    daily_total_summary,
+    period_of,
+    refresh_interpreter_totals,
+)
+
+# Rows of a bulk mode import that get a full diff in the preview
+PREVIEW_SAMPLE_SIZE = 50
+# Distinct unknown values listed per column after an import
+UNKNOWN_CHOICES_SHOWN = 10
+
+def job_url(job):
+    return reverse("admin:invoice_job_change", args=[job.pk])
 
 
-from .models import CallLog, Interpreter
-import pandas as pd
+def queue_export(modeladmin, request, queryset, kind):
+    job = enqueue(kind, request.user, selection_params(request, queryset))
+    modeladmin.message_user(
+        request,
+        format_html(
+            _('Export queued as <a href="{}">{}</a>. The file can be downloaded from the job page once it finishes.'),
+            job_url(job),
+            job,
+        ),
+    )
+    return HttpResponseRedirect(job_url(job))
+
+
+# Records every import (its preview too) in the import history, with the
+# file parsing timed as its own stage
+class InstrumentedImportMixin:
+    import_run_kind = None
+
+    def get_import_formats(self):
+        return [
+            timed_class(import_format, "parse", "create_dataset")
+            for import_format in super().get_import_formats()
+        ]
+
+    def import_action(self, request, *args, **kwargs):
+        if request.method != "POST":
+            return super().import_action(request, *args, **kwargs)
+        import_file = request.FILES.get("import_file")
+        with recording(
+            self.import_run_kind,
+            name=import_file.name if import_file else "",
+            user=request.user,
+            dry_run=True,
+            profile=bool(request.POST.get("profile")),
+        ):
+            return super().import_action(request, *args, **kwargs)
+
+    def process_import(self, request, *args, **kwargs):
+        with recording(
+            self.import_run_kind,
+            name=request.POST.get("original_file_name", ""),
+            user=request.user,
+            profile=bool(request.POST.get("profile")),
+        ):
+            return super().process_import(request, *args, **kwargs)
+
 
 class CustomImportExportMixin(ImportExportMixin):
     def import_action(self, request, *args, **kwargs):
-        messages.warning(request, _('Once the SUBMIT button is clicked, please wait until imported data is shown below. Then, click CONFIRM IMPORT and wait to be redirected.'))
-        return super().import_action(request, *args, **kwargs)
+        messages.warning(request, _('Once the SUBMIT button is clicked, please wait until the preview is shown below. CONFIRM IMPORT then queues the import as a background job.'))
+        response = super().import_action(request, *args, **kwargs)
+        context = getattr(response, "context_data", None) or {}
+        self.add_rollup_message(context.get("result"), request)
+        return response
 
-class PaymentChoiceWidget(Widget):
-    def clean(self, value, row=None, *args, **kwargs):
-        for choice in Interpreter.PAYMENT_CHOICES:
-            if choice[1] == value:
-                return choice[0]
-        return value
+    def add_success_message(self, result, request):
+        super().add_success_message(result, request)
+        self.add_rollup_message(result, request)
 
+    def add_rollup_message(self, result, request):
+        skipped = getattr(result, "skipped_rows", 0)
+        if skipped:
+            messages.info(
+                request,
+                _("Skipped {rows} rows an earlier import already had.").format(rows=skipped),
+            )
+        rollup = getattr(result, "rollup", None)
+        if rollup:
+            messages.info(
+                request,
+                _("Interpreter totals: {interpreters} interpreters across {periods} periods updated in {seconds:.2f}s.").format(**rollup),
+            )
 
-class CenterChoiceWidget(Widget):
-    def clean(self, value, row=None, *args, **kwargs):
-        for choice in Interpreter.CENTER_CHOICES:
-            if choice[1] == value:
-                return choice[0]
-        return value
+# Actions flagged with acts_on_changelist run on every row matching the
+# current filters and search when no row is ticked, as if "Select all" had
+# been clicked.
+class ChangelistActionsMixin:
+    def changelist_view(self, request, extra_context=None):
+        if (
+            request.method == "POST"
+            and "index" in request.POST
+            and not request.POST.getlist(helpers.ACTION_CHECKBOX_NAME)
+        ):
+            try:
+                name = request.POST.getlist("action")[int(request.POST["index"])]
+            except (IndexError, ValueError):
+                name = None
+            action = self.get_actions(request).get(name)
+            if action and getattr(action[0], "acts_on_changelist", False):
+                request.POST = request.POST.copy()
+                request.POST["select_across"] = "1"
+                # Ignored with select_across, but the admin wants a selection
+                request.POST.setlist(helpers.ACTION_CHECKBOX_NAME, ["0"])
+        return super().changelist_view(request, extra_context)
 
 
-class ExportInterpreterResource(ModelResource):
-    class Meta:
-        model = Interpreter
-        fields = (
-            "Name",
-            "Payment_Method",
-            "Service_Center",
-            "Total_Amount",
-            "Total_Minutes",
+# Download links for the whole filtered changelist as CSV or XLSX, sent
+# straight away instead of through an export job. The rows are only read
+# once the download starts, and under ASGI off the event loop.
+class StreamExportMixin:
+    # Download file name, without the extension
+    stream_export_name = None
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path(
+                "stream-export/<str:file_format>/",
+                self.admin_site.admin_view(self.stream_export_view),
+                name="%s_%s_stream_export" % info,
+            ),
+        ] + super().get_urls()
+
+    # Headers and rows of the download for the changelist's filters and search
+    def stream_export_rows(self, changelist, request):
+        resource = self.get_export_resource_class()()
+        return resource.get_export_headers(), export_rows(resource, changelist.get_queryset(request))
+
+    def stream_export_chunks(self, changelist, request, file_format):
+        headers, rows = self.stream_export_rows(changelist, request)
+        yield from STREAM_FORMATS[file_format][0](headers, rows)
+
+    def stream_export_view(self, request, file_format):
+        if file_format not in STREAM_FORMATS:
+            raise Http404
+        if not (self.has_view_or_change_permission(request) and self.has_export_permission(request)):
+            raise PermissionDenied
+        try:
+            changelist = self.get_changelist_instance(request)
+        except IncorrectLookupParameters:
+            info = self.model._meta.app_label, self.model._meta.model_name
+            return HttpResponseRedirect(
+                reverse("admin:%s_%s_changelist" % info) + "?" + ERROR_FLAG + "=1"
+            )
+        response = ThreadedStreamingHttpResponse(
+            self.stream_export_chunks(changelist, request, file_format),
+            content_type=STREAM_FORMATS[file_format][1],
         )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{self.stream_export_name}.{file_format}"'
+        )
+        return response
+
+
+# Resources deep-copy their fields, so each import gets fresh lookups
+class LookupWidget(Widget):
+    def __init__(self, lookup):
+        self.lookup = lookup
+
+    def clean(self, value, row=None, *args, **kwargs):
+        return self.lookup(value)
+
 
-    def get_export_fields(self):
-        fields = super().get_export_fields()
-        for field in fields:
-            field.column_name = Interpreter._meta.get_field(
-                field.attribute
-            ).verbose_name
-        return fields
+# {column: Counter of values matching no choice} of the resource's import
+def unknown_choices(resource):
+    unknown = {}
+    for field in resource.get_fields():
+        lookup = getattr(field.widget, "lookup", None)
+        if isinstance(lookup, ChoiceLookup) and lookup.unknown:
+            unknown[field.column_name] = lookup.unknown
+    return unknown
 
 
+# One warning per column listing its unknown values, instead of one per row
+class UnknownChoicesMixin:
+    def import_action(self, request, *args, **kwargs):
+        response = super().import_action(request, *args, **kwargs)
+        context = getattr(response, "context_data", None) or {}
+        self.add_unknown_choices_message(context.get("result"), request)
+        return response
+
+    def add_success_message(self, result, request):
+        super().add_success_message(result, request)
+        self.add_unknown_choices_message(result, request)
+
+    def add_unknown_choices_message(self, result, request):
+        for column, counts in getattr(result, "unknown_choices", {}).items():
+            values = ", ".join(
+                f"'{value}' ({count} row{'s' if count > 1 else ''})"
+                for value, count in counts.most_common(UNKNOWN_CHOICES_SHOWN)
+            )
+            if len(counts) > UNKNOWN_CHOICES_SHOWN:
+                values += f" and {len(counts) - UNKNOWN_CHOICES_SHOWN} more"
+            messages.warning(
+                request,
+                _("Unknown {column} values, imported as they are: {values}.").format(
+                    column=column, values=values
+                ),
+            )
+
+
+@instrumented_resource
 class InterpreterResource(ModelResource):
     Payment_Method = fields.Field(
         column_name="Payment Method",
         attribute="Payment_Method",
-        widget=PaymentChoiceWidget(),
+        widget=LookupWidget(ChoiceLookup(Interpreter.PAYMENT_CHOICES)),
     )
     Service_Center = fields.Field(
         column_name="Service Center",
         attribute="Service_Center",
-        widget=CenterChoiceWidget(),
+        widget=LookupWidget(ChoiceLookup(Interpreter.CENTER_CHOICES)),
     )
 
     class Meta:
@@ -80,27 +295,32 @@ class InterpreterResource(ModelResource):
             "Service Center",
         ]
 
+    def after_import(self, dataset, result, using_transactions, dry_run, **kwargs):
+        super().after_import(dataset, result, using_transactions, dry_run, **kwargs)
+        result.unknown_choices = unknown_choices(self)
+        if not dry_run:
+            link_interpreters()
+            refresh_interpreter_totals()
+
 
 def export_selected_interpreter_objects(modeladmin, request, queryset):
-    selected = queryset.values_list("pk", flat=True)
-    order_by = request.GET.get("order_by", "")
-    print(order_by)
-    queryset = Interpreter.objects.filter(pk__in=selected)
-    dataset = ExportInterpreterResource().export(queryset)
-    response = HttpResponse(
-        dataset.xlsx,
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = 'attachment; filename="InterpretersPay.xlsx"'
-    return response
+    return queue_export(modeladmin, request, queryset, Job.EXPORT_INTERPRETERS)
 
 
 export_selected_interpreter_objects.short_description = (
-    "Export selected interpreters to XLSX"
+    "Export selected interpreters to XLSX (all filtered rows if none are selected)"
 )
+export_selected_interpreter_objects.acts_on_changelist = True
 
 
-class InterpreterAdmin(ImportExportMixin, admin.ModelAdmin):
+class InterpreterAdmin(
+    InstrumentedImportMixin,
+    UnknownChoicesMixin,
+    ChangelistActionsMixin,
+    StreamExportMixin,
+    ImportExportMixin,
+    admin.ModelAdmin,
+):
     list_display = (
         "Name",
         "Payment_Method",
@@ -111,13 +331,48 @@ class InterpreterAdmin(ImportExportMixin, admin.ModelAdmin):
     list_filter = ("Service_Center", "Payment_Method")
     search_fields = ("Name",)
     resource_class = InterpreterResource
+    import_run_kind = PipelineRun.INTERPRETER_IMPORT
+    import_export_change_list_template = "admin/invoice/interpreter/change_list.html"
+    stream_export_name = "InterpretersPay"
     actions = [export_selected_interpreter_objects]
 
     def get_export_resource_class(self):
         return ExportInterpreterResource
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        link_interpreters(CallLog.objects.filter(Interpreter_Name=obj.Name))
+        refresh_interpreter_totals()
+
+
+class InterpreterTotalAdmin(admin.ModelAdmin):
+    list_display = (
+        "Interpreter_Name",
+        "Period",
+        "Call_Count",
+        "Total_Amount",
+        "Total_Minutes",
+    )
+    list_filter = ("Period",)
+    search_fields = ("Interpreter_Name",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    # Kept in step with the call logs; rebuild_totals recomputes them
+    def has_delete_permission(self, request, obj=None):
+        return False
 
+
+@instrumented_resource
 class ImportCallLogResource(ModelResource):
+    Language = fields.Field(
+        column_name="Language", attribute="Language", widget=LookupWidget(SpellingLookup())
+    )
+
     class Meta:
         model = CallLog
         import_id_fields = ("CallId",)
@@ -131,193 +386,322 @@ class ImportCallLogResource(ModelResource):
             "CallId",
         )
 
+    def __init__(self, bulk=False, file_hash=None, import_again=False, **kwargs):
+        super().__init__(**kwargs)
+        self.bulk = bulk
+        self.file_hash = file_hash
+        self.import_again = import_again
+        if bulk:
+            # Per-instance copy so the class-wide options stay row-by-row
+            self._meta = copy(self._meta)
+            self._meta.use_bulk = True
+            self._meta.batch_size = WRITE_BATCH_SIZE
+            self._meta.skip_diff = True
+
+    def import_data(
+        self,
+        dataset,
+        dry_run=False,
+        raise_errors=False,
+        use_transactions=None,
+        collect_failed_rows=False,
+        rollback_on_validation_errors=False,
+        **kwargs,
+    ):
+        if not self.bulk:
+            return super().import_data(
+                dataset,
+                dry_run,
+                raise_errors,
+                use_transactions,
+                collect_failed_rows,
+                rollback_on_validation_errors,
+                **kwargs,
+            )
+        # One transaction around the whole file, rolled back like import_data
+        # would, instead of a savepoint around every row that doubled the
+        # queries. Told it isn't in a transaction, import-export writes
+        # nothing on a dry run; the archived rows before_import restores
+        # are still rolled back.
+        using = self.get_db_connection_name()
+        with transaction.atomic(using=using):
+            result = self.import_data_inner(
+                dataset,
+                dry_run,
+                raise_errors,
+                False,
+                collect_failed_rows,
+                rollback_on_validation_errors,
+                **kwargs,
+            )
+            if (
+                dry_run
+                or result.has_errors()
+                or (rollback_on_validation_errors and result.has_validation_errors())
+            ):
+                transaction.set_rollback(True, using=using)
+        return result
+
     def before_import(self, dataset, using_transactions, dry_run, **kwargs):
-        df = pd.DataFrame(dataset.dict)
-        df.drop(
-            columns=[
-                "CallId",
-                "Caller Id",
-                "Billed Seconds",
-                "Operator",
-                "Datacapture",
-                "Interpreter Number",
-                "Language Id",
-                "Language",
-                "Bill Customer",
-                "Account Code",
-                "Customer Name",
-                "Call Time",
-            ],
-            inplace=True,
-        )
+        self.totals = TotalsDelta()
+        self.interpreters = interpreter_ids()
+        self.fields["Language"].widget.lookup = SpellingLookup(known_languages())
+        dataset.headers = list(CALL_LOG_HEADERS)
+        self.skip_imported_chunks(dataset)
+        restore_call_ids(str(value) for value in dataset["CallId"] if value not in (None, ""))
+        if self.bulk:
+            # Existing rows by CallId, fetched up front instead of a get() per row
+            self.existing = {}
+            call_ids = {str(value) for value in dataset["CallId"] if value not in (None, "")}
+            for batch in batched(call_ids, LOOKUP_BATCH_SIZE):
+                self.existing.update(
+                    (call.CallId, call) for call in CallLog.objects.filter(CallId__in=batch)
+                )
 
-        df["Interpreter Pay"] = df["Interpreter Pay"].apply(
-            pd.to_numeric, downcast="float", errors="coerce"
-        )
-        df["Interpreter Calltime"] = df["Interpreter Calltime"].apply(
-            pd.to_numeric, downcast="integer", errors="coerce"
-        )
+    def get_instance(self, instance_loader, row):
+        if not self.bulk:
+            return super().get_instance(instance_loader, row)
+        call_id = row.get("CallId")
+        if call_id in (None, ""):
+            return None
+        return self.existing.get(str(call_id))
 
-        group = (
-            df.groupby(["Interpreter Name"])["Interpreter Pay"]
-            .sum()
-            .sort_values(ascending=False)
-            .reset_index()
-        )
-        minutes = (
-            df.groupby(["Interpreter Name"])["Interpreter Calltime"]
-            .sum()
-            .sort_values(ascending=False)
-            .reset_index()
-        )
+    def import_row(self, row, instance_loader, **kwargs):
+        if self.bulk:
+            # Only the first rows get a diff, shown as a sample in the preview
+            self._meta.skip_diff = kwargs.get("row_number", 0) > PREVIEW_SAMPLE_SIZE
+        return super().import_row(row, instance_loader, **kwargs)
 
-        interpreters = Interpreter.objects.all()
-        for interpreter in interpreters:
-            if interpreter.Name in group.values:
-                result = float(
-                    group.loc[group["Interpreter Name"] == interpreter.Name][
-                        "Interpreter Pay"
-                    ].iloc[0]
-                )
-                total_minutes = float(
-                    minutes.loc[minutes["Interpreter Name"] == interpreter.Name][
-                        "Interpreter Calltime"
-                    ].iloc[0]
-                )
+    def get_bulk_update_fields(self):
+        return super().get_bulk_update_fields() + ["Interpreter"]
 
-                interpreter.Total_Amount = round(Decimal(result), 2)
-                interpreter.Total_Minutes = total_minutes
-                interpreter.save()
+    def before_save_instance(self, instance, using_transactions, dry_run):
+        instance.Interpreter_id = self.interpreters.get(instance.Interpreter_Name)
 
-        dataset.headers = [
-            "CallId",
-            "Caller_Id",
-            "Call_Time",
-            "Billed_Seconds",
-            "Operator",
-            "Datacapture",
-            "Customer_Calltime",
-            "Interpreter_Calltime",
-            "Interpreter_Number",
-            "Language_Id",
-            "Language",
-            "Interpreter_Pay",
-            "Bill_Customer",
-            "Account_Code",
-            "Interpreter_Name",
-            "Customer_Name",
+    def save_instance(self, instance, is_create, using_transactions=True, dry_run=False):
+        if self.bulk and not is_create and instance.pk is None:
+            # Repeated CallId whose first row is still waiting to be created;
+            # the pending instance was updated in place.
+            self.before_save_instance(instance, using_transactions, dry_run)
+            self.after_save_instance(instance, using_transactions, dry_run)
+            return
+        super().save_instance(instance, is_create, using_transactions, dry_run)
+
+    def after_import_instance(self, instance, new, row_number=None, **kwargs):
+        if not new:
+            # Contribution of the stored row, replaced once the row is saved
+            instance.stored_call = copy(instance)
+
+    def after_save_instance(self, instance, using_transactions, dry_run):
+        stored = getattr(instance, "stored_call", None)
+        if stored is not None:
+            self.totals.remove_call(stored)
+        self.totals.add_call(instance)
+        if self.bulk and instance.CallId:
+            self.existing.setdefault(instance.CallId, instance)
+
+    # Drops the rows of CHUNK_SIZE chunks some earlier import already had,
+    # chunked and hashed like the fast import so either can skip the other's
+    def skip_imported_chunks(self, dataset):
+        self.new_chunks, self.skipped_rows = [], 0
+        self.file_rows = len(dataset)
+        if self.file_hash is None:
+            return
+        chunks = [
+            (start, chunk_digest(dataset[start:start + CHUNK_SIZE]))
+            for start in range(0, len(dataset), CHUNK_SIZE)
         ]
+        imported = set() if self.import_again else imported_chunks([digest for start, digest in chunks])
+        # From the end, so deleting rows doesn't move the chunks still to go
+        for start, digest in reversed(chunks):
+            rows = min(CHUNK_SIZE, self.file_rows - start)
+            if digest in imported:
+                del dataset[start:start + rows]
+                self.skipped_rows += rows
+            else:
+                self.new_chunks.append((digest, rows))
 
+    def after_import(self, dataset, result, using_transactions, dry_run, **kwargs):
+        super().after_import(dataset, result, using_transactions, dry_run, **kwargs)
+        result.bulk = self.bulk
+        result.skipped_rows = self.skipped_rows
+        if not dry_run:
+            result.rollup = self.totals.apply()
+            call_logs_changed()
+            if self.file_hash is not None:
+                self.record_file(kwargs.get("file_name", ""), kwargs.get("user"))
 
-class ExportCallLogResource(ModelResource):
-    class Meta:
-        model = CallLog
-        fields = (
-            "Interpreter_Name",
-            "Language",
-            "Interpreter_Pay",
-            "Interpreter_Calltime",
-            "Call_Time",
-            "CallId",
-            "Service_Center"
+    def record_file(self, name, user):
+        imported, created = ImportedFile.objects.update_or_create(
+            Sha256=self.file_hash,
+            defaults={
+                "Name": name[:255],
+                "Created_By": user if user is not None and user.is_authenticated else None,
+                "Rows_Done": self.file_rows,
+                "Completed_At": timezone.now(),
+            },
         )
-
-    def get_export_fields(self):
-        fields = super().get_export_fields()
-        for field in fields:
-            field.column_name = CallLog._meta.get_field(field.attribute).verbose_name
-        return fields
+        record_chunks(imported, self.new_chunks)
 
 
 def export_selected_call_logs(modeladmin, request, queryset):
-    selected = queryset.values_list("pk", flat=True)
-    queryset = CallLog.objects.filter(pk__in=selected)
-    dataset = ExportCallLogResource().export(queryset)
-    response = HttpResponse(
-        dataset.xlsx,
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
-    response["Content-Disposition"] = 'attachment; filename="InterpreterCalls.xlsx"'
-    return response
+    return queue_export(modeladmin, request, queryset, Job.EXPORT_CALL_LOGS)
 
 
 def export_sergio_center(modeladmin, request, queryset):
-    selected = queryset.values_list("pk", flat=True)
-    queryset = CallLog.objects.filter(pk__in=selected)
-    dataset = ExportCallLogResource().export(queryset)
-
-    df = pd.DataFrame(dataset.dict)
-    df["Total"] = df["Interpreter Pay"]
-    df["Total"] = df["Total"].astype(float)
-    df["Day Rate"] = 0.25
-    df["Night Rate"] = 0.37
-
-    df["Day Minutes"] = df.apply(
-        lambda x: x["Interpreter Pay"] / x["Interpreter Calltime"]
-        if x["Interpreter Calltime"] != 0
-        else Decimal("NaN"),
-        axis=1,
-    )
-    df["Day Minutes"].fillna(0, inplace=True)
-    df["Day Minutes"] = df["Day Minutes"].astype(float)
-
-    df["Night Minutes"] = df.apply(
-        lambda x: x["Interpreter Pay"] / x["Interpreter Calltime"]
-        if x["Interpreter Calltime"] != 0
-        else Decimal("NaN"),
-        axis=1,
-    )
-    df["Night Minutes"].fillna(0, inplace=True)
-    df["Night Minutes"] = df["Night Minutes"].astype(float)
-
-    group = df.groupby(["Interpreter Name"]).aggregate(
-        {
-            "Day Minutes": "sum",
-            "Day Rate": "first",
-            "Night Minutes": "sum",
-            "Night Rate": "first",
-            "Total": "sum",
-        }
-    )
-
-    with BytesIO() as b:
-        writer = pd.ExcelWriter(b, engine="openpyxl")
-        group.to_excel(writer, sheet_name="Sheet1")
-        writer.save()
-        # TODO: CHANGE FILENAME
-        filename = "InterpreterCalls.xlsx"
-        response = HttpResponse(
-            b.getvalue(),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
-        response["Content-Disposition"] = "attachment; filename=%s" % filename
-        return response
+    return queue_export(modeladmin, request, queryset, Job.EXPORT_UNIVERSAL)
 
 
 def get_total_pay(modeladmin, request, queryset):
-    total = sum(obj.Interpreter_Pay for obj in queryset)
-    message = f"Total Amount for selected rows: {total}"
+    summary = call_log_summary(queryset)
+    message = "Total Amount for selected rows: {Pay} ({Calls} calls, {Minutes} minutes)".format(**summary)
     modeladmin.message_user(request, message)
 
 
 def update_service_center(modeladmin, request, queryset):
-    for call in queryset:
-        try:
-            interpreter = Interpreter.objects.get(Name=call.Interpreter_Name)
-        except Interpreter.DoesNotExist:
-            continue
-        
-        call.Service_Center = interpreter.Service_Center
-        call.save()
-    
-    modeladmin.message_user(request, "The Service Center has been updated for the selected rows.")
-    
-export_selected_call_logs.short_description = "Export selected call logs to XLSX"
-export_sergio_center.short_description = "Export selected rows to Universal's Format"
+    link_interpreters(queryset)
+    # One UPDATE, touching only the rows whose center differs
+    outdated = queryset.filter(Interpreter__isnull=False).exclude(
+        Service_Center=F("Interpreter__Service_Center")
+    )
+    totals = TotalsDelta()
+    with transaction.atomic():
+        totals.move_to_interpreter_center(outdated)
+        changed = outdated.update(
+            Service_Center=Subquery(
+                Interpreter.objects.filter(pk=OuterRef("Interpreter_id")).values(
+                    "Service_Center"
+                )[:1]
+            )
+        )
+        totals.apply()
+    call_logs_changed()
+    unmatched = queryset.filter(Interpreter__isnull=True).count()
+    message = f"The Service Center has been updated on {changed} call logs."
+    if unmatched:
+        message += f" {unmatched} call logs have no matching interpreter and were left unchanged."
+    modeladmin.message_user(request, message)
+
+
+export_selected_call_logs.short_description = "Export selected call logs to XLSX (all filtered rows if none are selected)"
+export_selected_call_logs.acts_on_changelist = True
+export_sergio_center.short_description = "Export selected rows to Universal's Format (all filtered rows if none are selected)"
+export_sergio_center.acts_on_changelist = True
 get_total_pay.short_description = "Obtain total pay for selected call logs"
-update_service_center.short_description = "Update Service Center"
+update_service_center.short_description = "Update Service Center (all filtered rows if none are selected)"
+update_service_center.acts_on_changelist = True
+
+# Changelist parameters DailyTotal can answer as well
+DAILY_TOTAL_PARAMS = {
+    "period",
+    "Service_Center__exact",
+    "Call_Time__year",
+    "Call_Time__month",
+    "Call_Time__day",
+    ALL_VAR,
+    ORDER_VAR,
+    SEARCH_VAR,
+}
+# Changelist parameters the call log snapshots can answer: whole months,
+# in the default order
+SNAPSHOT_PARAMS = {"period", "Service_Center__exact", "Call_Time__year", "Call_Time__month", ALL_VAR}
+
+
+# Call logs open on the current month, so the everyday pages only touch
+# recent rows. Picking a date in the date hierarchy overrides it.
+class CallPeriodFilter(admin.SimpleListFilter):
+    title = _("period")
+    parameter_name = "period"
+
+    def __init__(self, request, params, model, model_admin):
+        self.date_prefix = model_admin.date_hierarchy + "__"
+        self.date_picked = any(key.startswith(self.date_prefix) for key in request.GET)
+        # Export jobs count from the month they were queued in
+        self.month = getattr(request, "current_month", None) or current_month()
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        return [
+            ("month", _("This month")),
+            ("last_month", _("Last month")),
+            ("all", _("All")),
+        ]
+
+    def value(self):
+        if self.date_picked:
+            return "all"
+        return super().value() or "month"
+
+    # No "All" entry for a missing parameter; that means this month here
+    def choices(self, changelist):
+        for lookup, title in self.lookup_choices:
+            yield {
+                "selected": self.value() == lookup,
+                "query_string": changelist.get_query_string(
+                    {self.parameter_name: lookup}, [self.date_prefix]
+                ),
+                "display": title,
+            }
+
+    # (start, end) of the chosen period, None where it is open
+    def bounds(self):
+        month = self.month
+        if self.value() == "month":
+            return month_start(month), None
+        if self.value() == "last_month":
+            return month_start(shift_period(month, -1)), month_start(month)
+        return None, None
+
+    def queryset(self, request, queryset):
+        start, end = self.bounds()
+        if start is not None:
+            queryset = queryset.filter(Call_Time__gte=start)
+        if end is not None:
+            queryset = queryset.filter(Call_Time__lt=end)
+        return queryset
+
 
-class CallLogAdmin(CustomImportExportMixin, admin.ModelAdmin):
+# The interpreters' service centers, without the SELECT DISTINCT over the
+# whole table a plain "Service_Center" filter runs on every page load.
+# Same parameter as that filter, so saved links keep working.
+class ServiceCenterFilter(admin.SimpleListFilter):
+    title = _("Service Center")
+    parameter_name = "Service_Center__exact"
+
+    def lookups(self, request, model_admin):
+        return Interpreter.CENTER_CHOICES
+
+    def queryset(self, request, queryset):
+        if self.value() is not None:
+            queryset = queryset.filter(Service_Center=self.value())
+        return queryset
+
+
+# Deleted call logs, archived or not, are taken off the totals
+class DeleteFromTotalsMixin:
+    def delete_model(self, request, obj):
+        totals = TotalsDelta()
+        totals.remove_call(obj)
+        super().delete_model(request, obj)
+        totals.apply()
+        call_logs_changed()
+
+    def delete_queryset(self, request, queryset):
+        totals = TotalsDelta()
+        totals.remove_queryset(queryset)
+        super().delete_queryset(request, queryset)
+        totals.apply()
+        call_logs_changed()
+
+
+class CallLogAdmin(
+    InstrumentedImportMixin,
+    ChangelistActionsMixin,
+    DeleteFromTotalsMixin,
+    StreamExportMixin,
+    CustomImportExportMixin,
+    admin.ModelAdmin,
+):
     list_display = (
         "Interpreter_Name",
         "Language",
@@ -330,47 +714,575 @@ class CallLogAdmin(CustomImportExportMixin, admin.ModelAdmin):
 
     actions = [export_selected_call_logs, export_sergio_center, get_total_pay, update_service_center]
     search_fields = ["Interpreter_Name", "Customer_Name"]
-    list_filter = ("Service_Center",)
+    list_filter = (CallPeriodFilter, ServiceCenterFilter)
+    date_hierarchy = "Call_Time"
+    readonly_fields = ("Interpreter",)
+    paginator = CachedCountPaginator
+    # Skips the second COUNT(*) over the unfiltered table on filtered lists
+    show_full_result_count = False
     resource_class = ImportCallLogResource
+    import_run_kind = PipelineRun.CALL_LOG_IMPORT
+    import_export_change_list_template = "admin/invoice/calllog/change_list.html"
+    import_template_name = "admin/invoice/calllog/import.html"
+    import_form_class = CallLogImportForm
+    confirm_form_class = CallLogConfirmImportForm
+    stream_export_name = "InterpreterCalls"
 
     def get_export_resource_class(self):
         return ExportCallLogResource
 
-    def get_search_results(self, request, queryset, search_term):
-        orig_queryset = queryset
-        queryset, use_distinct = super(CallLogAdmin, self).get_search_results(
-            request, queryset, search_term
+    def get_import_resource_kwargs(self, request, *args, **kwargs):
+        resource_kwargs = super().get_import_resource_kwargs(request, *args, **kwargs)
+        form = kwargs.get("form")
+        if form is not None and form.is_bound and form.is_valid():
+            resource_kwargs["bulk"] = form.cleaned_data.get("bulk_mode", False)
+            resource_kwargs["file_hash"] = form.cleaned_data.get("file_hash") or None
+            resource_kwargs["import_again"] = form.cleaned_data.get("import_again", False)
+        return resource_kwargs
+
+    def get_import_context_data(self, **kwargs):
+        context = super().get_import_context_data(**kwargs)
+        context["sample_size"] = PREVIEW_SAMPLE_SIZE
+        return context
+
+    # Lower-case title of the import format at `index` on the import form
+    def import_format_title(self, index):
+        return self.get_import_formats()[int(index)]().get_title().lower()
+
+    def get_confirm_form_initial(self, request, import_form):
+        initial = super().get_confirm_form_initial(request, import_form)
+        if import_form is not None:
+            # The queued CSV and XLSX imports always write in batches, so
+            # bulk mode only shaped their preview
+            if self.import_format_title(import_form.cleaned_data["input_format"]) not in FORMATS:
+                initial["bulk_mode"] = import_form.cleaned_data.get("bulk_mode", False)
+            initial["profile"] = import_form.cleaned_data.get("profile", False)
+            initial["import_again"] = import_form.cleaned_data.get("import_again", False)
+            initial["file_hash"] = import_form.cleaned_data.get("file_hash", "")
+        return initial
+
+    # The confirmed import of a CSV or XLSX file runs as a fast import job,
+    # so the request only hands over the file the preview already checked.
+    # Other formats are still imported here.
+    def process_import(self, request, *args, **kwargs):
+        if not self.has_import_permission(request):
+            raise PermissionDenied
+        confirm_form = self.create_confirm_form(request)
+        if not confirm_form.is_valid():
+            return super().process_import(request, *args, **kwargs)
+        file_format = self.import_format_title(confirm_form.cleaned_data["input_format"])
+        if file_format not in FORMATS:
+            return super().process_import(request, *args, **kwargs)
+
+        tmp_storage = self.get_tmp_storage_class()(
+            name=confirm_form.cleaned_data["import_file_name"], read_mode="rb"
+        )
+        name = os.path.splitext(confirm_form.cleaned_data["original_file_name"])[0] or "call_logs"
+        job = enqueue(
+            Job.IMPORT_CALL_LOGS,
+            request.user,
+            {
+                "profile": confirm_form.cleaned_data.get("profile", False),
+                "import_again": confirm_form.cleaned_data.get("import_again", False),
+            },
+            input_file=ContentFile(tmp_storage.read(), name=f"{name}.{file_format}"),
+        )
+        tmp_storage.remove()
+        messages.success(
+            request,
+            _("{job} queued. Progress is shown below and the page refreshes until it finishes.").format(job=job),
         )
+        return HttpResponseRedirect(job_url(job))
+
+    def generate_log_entries(self, result, request):
+        # One admin log entry per row would double the writes of a bulk import
+        if not getattr(result, "bulk", False):
+            super().generate_log_entries(result, request)
+
+    def get_urls(self):
+        info = self.get_model_info()
+        return [
+            path(
+                "stream-import/",
+                self.admin_site.admin_view(self.stream_import_view),
+                name="%s_%s_stream_import" % info,
+            ),
+        ] + super().get_urls()
+
+    def stream_import_view(self, request):
+        if not self.has_import_permission(request):
+            raise PermissionDenied
+
+        form = StreamImportForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            import_files = form.cleaned_data["import_file"]
+            with SpooledTemporaryFile(max_size=SPOOL_SIZE) as bundle:
+                # Several files go to the worker as one zip
+                if len(import_files) > 1:
+                    import_files = [File(zip_files(import_files, bundle), name="call_logs.zip")]
+                job = enqueue(
+                    Job.IMPORT_CALL_LOGS,
+                    request.user,
+                    {
+                        "profile": form.cleaned_data["profile"],
+                        "import_again": form.cleaned_data["import_again"],
+                    },
+                    input_file=import_files[0],
+                )
+            messages.success(
+                request,
+                _("{job} queued. Progress is shown below and the page refreshes until it finishes.").format(job=job),
+            )
+            return HttpResponseRedirect(job_url(job))
+
+        context = {
+            **self.admin_site.each_context(request),
+            "title": _("Fast import"),
+            "form": form,
+            "opts": self.model._meta,
+            "headers": CALL_LOG_HEADERS,
+            "chunk_size": CHUNK_SIZE,
+        }
+        return TemplateResponse(request, "admin/invoice/calllog/stream_import.html", context)
+
+    def save_model(self, request, obj, form, change):
+        obj.Interpreter = (
+            Interpreter.objects.filter(Name=obj.Interpreter_Name).order_by("pk").first()
+        )
+        totals = TotalsDelta()
+        if change:
+            totals.remove_call(CallLog.objects.get(pk=obj.pk))
+        super().save_model(request, obj, form, change)
+        totals.add_call(obj)
+        totals.apply()
+        call_logs_changed()
+
+    def changelist_view(self, request, extra_context=None):
+        started = perf_counter()
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            response = super().changelist_view(request, extra_context)
+            cl = (getattr(response, "context_data", None) or {}).get("cl")
+            if cl is not None:
+                # Totals for the current filters and search, not just this page
+                daily_totals = self.daily_totals_for(cl)
+                if daily_totals is not None:
+                    summary = cached_for_queryset(
+                        "daily_summary", daily_totals, daily_total_summary
+                    )
+                else:
+                    summary = cached_for_queryset("summary", cl.queryset, call_log_summary)
+                response.context_data["summary"] = summary
+                # Rendered here so the result list query is timed as well
+                response.render()
+        response["Server-Timing"] = ", ".join(
+            [
+                server_timing("db", timer.seconds, f"{timer.queries} queries"),
+                server_timing("total", perf_counter() - started),
+            ]
+        )
+        return response
+
+    # Whole months are read from the call log snapshots where possible
+    def stream_export_rows(self, changelist, request):
+        snapshot = self.snapshot_for(changelist) if snapshots_enabled() else None
+        if snapshot is None:
+            return super().stream_export_rows(changelist, request)
+        return ExportCallLogResource().get_export_headers(), snapshot.rows()
+
+    # Quoted terms match a whole name exactly, so the name indexes can serve
+    # them. Otherwise every word must appear in one of the names, or any
+    # comma separated part of the search does; with the SQLite search index
+    # that is a single FTS5 query.
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
 
         if '"' in search_term:
-            # Search for exact match using quotation marks
-            terms = search_term.split('"')[1::2]  # extract all quoted terms
-            print("This is the term length: ", len(terms))
-            if len(terms) == 1:
-                term = terms[0]
-                q_objects = [Q(**{field: term}) for field in self.search_fields]
-                queryset |= self.model.objects.filter(reduce(or_, q_objects))
-            else:
-                # Search for all quoted terms in relevant fields
-                for term in terms:
-                    print("This is the term: ", term)
-                    q_objects = [Q(**{field: term}) for field in self.search_fields]
-                    queryset |= self.model.objects.filter(reduce(or_, q_objects))
-        else:
-            # Search for records containing any of the searched words
-            search_words = search_term.split(", ")
-            if search_words:
-                q_objects = [
-                    Q(**{field + "__icontains": word})
-                    for field in self.search_fields
-                    for word in search_words
-                ]
-                queryset |= self.model.objects.filter(reduce(or_, q_objects))
-
-        queryset = queryset & orig_queryset
-
-        return queryset, use_distinct
+            terms = [term for term in search_term.split('"')[1::2] if term]
+            if not terms:
+                return queryset, False
+            q = reduce(
+                or_, [Q(**{field: term}) for field in self.search_fields for term in terms]
+            )
+            return queryset.filter(q), False
+
+        words = []
+        for bit in smart_split(search_term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            words.append(bit)
+        alternatives = [word for word in search_term.split(", ") if word]
+
+        q = sqlite_search_available() and sqlite_contains_q(words, alternatives)
+        if not q:
+            q = reduce(
+                or_,
+                [self.contains_q(alternative) for alternative in alternatives],
+                reduce(and_, [self.contains_q(word) for word in words]),
+            )
+        return queryset.filter(q), False
+
+    # The DailyTotal rows covering the same call logs as the changelist, or
+    # None if its search or filters can't be answered from them. DailyTotal
+    # includes archived call logs, so the list must start after the archive.
+    def daily_totals_for(self, changelist):
+        params = changelist.params
+        if changelist.query or set(params) - DAILY_TOTAL_PARAMS:
+            return None
+        period = next(
+            spec for spec in changelist.filter_specs if isinstance(spec, CallPeriodFilter)
+        )
+        start, end = period.bounds()
+        lookups = {}
+        if "Call_Time__year" in params:
+            parts = [int(params.get(f"Call_Time__{part}", 1)) for part in ("year", "month", "day")]
+            start = timezone.make_aware(datetime(*parts))
+        # A month or day can also come without a year, e.g. every March
+        for part in ("year", "month", "day"):
+            if f"Call_Time__{part}" in params:
+                lookups[f"Day__{part}"] = int(params[f"Call_Time__{part}"])
+        if start is not None:
+            lookups["Day__gte"] = start.date()
+        if end is not None:
+            lookups["Day__lt"] = end.date()
+        if "Service_Center__exact" in params:
+            lookups["Service_Center"] = params["Service_Center__exact"]
+
+        archived_until = ArchivedCallLog.objects.aggregate(Max("Call_Time"))["Call_Time__max"]
+        if archived_until is not None and (start is None or start <= archived_until):
+            return None
+        return DailyTotal.objects.filter(**lookups)
+
+    # Snapshot of the months the changelist shows, or None when it is
+    # searched, sorted or filtered in a way snapshots don't cover
+    def snapshot_for(self, changelist):
+        if changelist.query or set(changelist.params) - SNAPSHOT_PARAMS:
+            return None
+        queryset = changelist.queryset.order_by()
+        periods = []
+        bounds = queryset.aggregate(first=Min("Call_Time"), last=Max("Call_Time"))
+        if bounds["first"] is not None:
+            period, last = period_of(bounds["first"]), period_of(bounds["last"])
+            while period <= last:
+                periods.append(period)
+                period = shift_period(period, 1)
+        if "Call_Time__month" in changelist.params:
+            # Without a year the months in between aren't all in the list
+            month = int(changelist.params["Call_Time__month"])
+            periods = [period for period in periods if int(period[5:]) == month]
+        if queryset.filter(Call_Time__isnull=True).exists():
+            periods.append(None)
+        return CallLogSnapshot(periods, changelist.params.get("Service_Center__exact"))
+
+    def contains_q(self, word):
+        return reduce(
+            or_, [Q(**{field + "__icontains": word}) for field in self.search_fields]
+        )
+
+
+def restore_archived_call_logs(modeladmin, request, queryset):
+    restored = move_call_logs(queryset, CallLog)
+    modeladmin.message_user(request, f"{restored} call logs restored.")
+
+
+restore_archived_call_logs.short_description = "Move selected call logs back out of the archive"
+
+
+class ArchivedCallLogAdmin(DeleteFromTotalsMixin, admin.ModelAdmin):
+    list_display = (
+        "Interpreter_Name",
+        "Language",
+        "Interpreter_Pay",
+        "Interpreter_Calltime",
+        "Customer_Name",
+        "Call_Time",
+        "Service_Center",
+    )
+    actions = [restore_archived_call_logs]
+    search_fields = ["Interpreter_Name", "Customer_Name"]
+    list_filter = (ServiceCenterFilter,)
+    date_hierarchy = "Call_Time"
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class DailyTotalAdmin(admin.ModelAdmin):
+    list_display = (
+        "Day",
+        "Interpreter_Name",
+        "Service_Center",
+        "Language",
+        "Call_Count",
+        "Total_Amount",
+        "Total_Minutes",
+    )
+    list_filter = (ServiceCenterFilter, "Language")
+    search_fields = ("Interpreter_Name",)
+    date_hierarchy = "Day"
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    # Derived rows, like the interpreter totals
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        cl = (getattr(response, "context_data", None) or {}).get("cl")
+        if cl is not None:
+            response.context_data["summary"] = cached_for_queryset(
+                "daily_summary", cl.queryset, daily_total_summary
+            )
+        return response
+
+
+# The import picks up after the last chunk the earlier attempt committed
+def retry_jobs(modeladmin, request, queryset):
+    retried = retryable_jobs(queryset).update(
+        Status=Job.PENDING, Message="", Started_At=None, Heartbeat=None, Finished_At=None
+    )
+    modeladmin.message_user(request, f"{retried} failed or stalled imports queued again.")
+
+
+retry_jobs.short_description = "Retry selected failed or stalled imports"
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        "__str__",
+        "Status",
+        "progress",
+        "throughput",
+        "Created_By",
+        "Created_At",
+        "download",
+    )
+    list_filter = ("Kind", "Status")
+    actions = [retry_jobs]
+    readonly_fields = (
+        "Kind",
+        "Status",
+        "progress",
+        "throughput",
+        "Message",
+        "Created_By",
+        "Created_At",
+        "Started_At",
+        "Heartbeat",
+        "Finished_At",
+        "download",
+    )
+    fields = readonly_fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path(
+                "<path:object_id>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="%s_%s_download" % info,
+            ),
+            path(
+                "<path:object_id>/status/",
+                self.admin_site.admin_view(self.status_view),
+                name="%s_%s_status" % info,
+            ),
+        ] + super().get_urls()
+
+    @admin.display(description="Progress")
+    def progress(self, obj):
+        if not obj.Rows_Total:
+            return f"{obj.Rows_Done:,} rows"
+        percent = min(100, 100 * obj.Rows_Done // obj.Rows_Total)
+        return f"{obj.Rows_Done:,} / {obj.Rows_Total:,} rows ({percent}%)"
+
+    @admin.display(description="Throughput")
+    def throughput(self, obj):
+        rate = obj.rows_per_second
+        return f"{rate:,.0f} rows/s" if rate else "-"
+
+    @admin.display(description="Result")
+    def download(self, obj):
+        if not obj.Result_File:
+            return "-"
+        return format_html(
+            '<a href="{}">{}</a>',
+            reverse("admin:invoice_job_download", args=[obj.pk]),
+            obj.Params.get("filename", _("Download")),
+        )
+
+    def download_view(self, request, object_id):
+        job = self.get_object(request, object_id)
+        if job is None or not job.Result_File or not self.has_view_permission(request, job):
+            raise Http404
+        return FileResponse(
+            job.Result_File.open("rb"),
+            as_attachment=True,
+            filename=job.Params.get("filename"),
+        )
+
+    def status_view(self, request, object_id):
+        job = self.get_object(request, object_id)
+        if job is None or not self.has_view_permission(request, job):
+            raise Http404
+        return JsonResponse(
+            {
+                "status": job.Status,
+                "rows_done": job.Rows_Done,
+                "rows_total": job.Rows_Total,
+                "rows_per_second": job.rows_per_second,
+                "message": job.Message,
+                "result": bool(job.Result_File),
+            }
+        )
+
+
+def format_bytes(value):
+    if value is None:
+        return "-"
+    for unit in ("B", "KB", "MB"):
+        if value < 1024:
+            return f"{value:,.0f} {unit}"
+        value /= 1024
+    return f"{value:,.1f} GB"
+
+
+class PipelineRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "Started_At",
+        "Kind",
+        "Name",
+        "Dry_Run",
+        "Rows",
+        "seconds",
+        "throughput",
+        "Queries",
+        "peak_memory",
+        "Created_By",
+        "download",
+    )
+    list_filter = ("Kind", "Dry_Run")
+    search_fields = ("Name",)
+    date_hierarchy = "Started_At"
+    readonly_fields = (
+        "Kind",
+        "Name",
+        "Dry_Run",
+        "Job",
+        "Created_By",
+        "Started_At",
+        "seconds",
+        "Rows",
+        "throughput",
+        "Queries",
+        "peak_memory",
+        "stages",
+        "Error",
+        "download",
+    )
+    fields = readonly_fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path(
+                "<path:object_id>/profile/",
+                self.admin_site.admin_view(self.download_view),
+                name="%s_%s_profile" % info,
+            ),
+        ] + super().get_urls()
+
+    @admin.display(description="Seconds", ordering="Seconds")
+    def seconds(self, obj):
+        return f"{obj.Seconds:,.2f}"
+
+    @admin.display(description="Throughput")
+    def throughput(self, obj):
+        if not obj.Rows or not obj.Seconds:
+            return "-"
+        return f"{obj.Rows / obj.Seconds:,.0f} rows/s"
+
+    @admin.display(description="Peak Memory", ordering="Peak_Memory")
+    def peak_memory(self, obj):
+        return format_bytes(obj.Peak_Memory)
+
+    # Slowest stages first
+    @admin.display(description="Stages")
+    def stages(self, obj):
+        if not obj.Stages:
+            return "-"
+        rows = sorted(obj.Stages.items(), key=lambda item: -item[1]["seconds"])
+        return format_html(
+            "<table><thead><tr><th>Stage</th><th>Calls</th><th>Seconds</th>"
+            "<th>Queries</th><th>Query seconds</th><th>Peak memory</th></tr></thead>"
+            "<tbody>{}</tbody></table>",
+            format_html_join(
+                "",
+                "<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>",
+                (
+                    (
+                        name,
+                        f"{stats['calls']:,}",
+                        f"{stats['seconds']:,.3f}",
+                        f"{stats['queries']:,}",
+                        f"{stats['db_seconds']:,.3f}",
+                        format_bytes(stats.get("peak_memory")),
+                    )
+                    for name, stats in rows
+                ),
+            ),
+        )
+
+    @admin.display(description="Profile")
+    def download(self, obj):
+        if not obj.Profile:
+            return "-"
+        return format_html(
+            '<a href="{}">{}</a>',
+            reverse("admin:invoice_pipelinerun_profile", args=[obj.pk]),
+            _("Download"),
+        )
+
+    def download_view(self, request, object_id):
+        run = self.get_object(request, object_id)
+        if run is None or not run.Profile or not self.has_view_permission(request, run):
+            raise Http404
+        return FileResponse(
+            run.Profile.open("rb"),
+            as_attachment=True,
+            filename=f"{run.Kind}-{run.pk}.prof",
+        )
 
 
 admin.site.register(Interpreter, InterpreterAdmin)
 admin.site.register(CallLog, CallLogAdmin)
+admin.site.register(ArchivedCallLog, ArchivedCallLogAdmin)
+admin.site.register(InterpreterTotal, InterpreterTotalAdmin)
+admin.site.register(DailyTotal, DailyTotalAdmin)
+admin.site.register(Job, JobAdmin)
+admin.site.register(PipelineRun, PipelineRunAdmin)
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class InvoiceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'invoice'
+
+    def ready(self):
+        from .database import configure_sqlite
+
+        connection_created.connect(configure_sqlite)
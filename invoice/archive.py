@@ -0,0 +1,80 @@
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import call_logs_changed
+from .models import ArchivedCallLog, CallLog
+from .totals import LOOKUP_BATCH_SIZE, WRITE_BATCH_SIZE, batched, period_of
+
+ARCHIVE_BATCH_SIZE = 5000
+# Copied as is, pk included, so a restored row gets its old pk back
+MOVED_FIELDS = [field.attname for field in CallLog._meta.concrete_fields]
+
+
+def month_start(period):
+    year, month = map(int, period.split("-"))
+    return timezone.make_aware(datetime(year, month, 1))
+
+
+def shift_period(period, months):
+    year, month = map(int, period.split("-"))
+    year, month = divmod(year * 12 + month - 1 + months, 12)
+    return f"{year:04d}-{month + 1:02d}"
+
+
+def current_month():
+    return period_of(timezone.now())
+
+
+# Moves the rows of `queryset` into `model` in pk ranges, each range
+# committing on its own so neither table stays locked for long. Totals are
+# kept over both tables and don't change.
+def move_call_logs(queryset, model, batch_size=ARCHIVE_BATCH_SIZE, progress=None):
+    queryset = queryset.order_by("pk")
+    moved, last_pk = 0, None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(batch.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            break
+        chunk = queryset.filter(pk__gte=pks[0], pk__lte=pks[-1])
+        with transaction.atomic():
+            model.objects.bulk_create(
+                [model(**row) for row in chunk.values(*MOVED_FIELDS)],
+                batch_size=WRITE_BATCH_SIZE,
+            )
+            chunk.delete()
+            call_logs_changed()
+        moved += len(pks)
+        last_pk = pks[-1]
+        if progress:
+            progress(moved)
+    return moved
+
+
+def archive_before(period, progress=None):
+    return move_call_logs(
+        CallLog.objects.filter(Call_Time__lt=month_start(period)), ArchivedCallLog, progress=progress
+    )
+
+
+def restore_period(period, progress=None):
+    return move_call_logs(
+        ArchivedCallLog.objects.filter(
+            Call_Time__gte=month_start(period), Call_Time__lt=month_start(shift_period(period, 1))
+        ),
+        CallLog,
+        progress=progress,
+    )
+
+
+# Imports update call logs by CallId, so archived rows that show up again
+# are moved back first instead of getting a second copy.
+def restore_call_ids(call_ids):
+    restored = 0
+    for batch in batched({call_id for call_id in call_ids if call_id}, LOOKUP_BATCH_SIZE):
+        archived = ArchivedCallLog.objects.filter(CallId__in=batch)
+        if archived.exists():
+            restored += move_call_logs(archived, CallLog)
+    return restored
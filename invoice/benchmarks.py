@@ -0,0 +1,790 @@
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+from io import BytesIO
+from itertools import islice
+from statistics import median
+from tempfile import SpooledTemporaryFile, TemporaryDirectory, mkdtemp
+from time import perf_counter
+
+import pandas as pd
+import tablib
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.handlers.asgi import ASGIHandler
+from django.core.files import File
+from django.db import OperationalError, connection
+from django.http import HttpResponse
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import synthetic
+from .admin import update_service_center
+from .exports import ExportCallLogResource, call_log_snapshot_xlsx, call_logs_xlsx, universal_xlsx
+from .importer import (
+    CHUNK_SIZE,
+    IMPORT_PROCESSES,
+    import_call_log_files,
+    import_call_logs,
+    upsert_call_logs,
+)
+from .instrumentation import recording
+from .jobs import SPOOL_SIZE, enqueue, run_job, selection_changelist
+from .models import CallLog, DailyTotal, Interpreter, Job, PipelineRun
+from .streaming import StreamingASGIHandler
+from .totals import call_log_summary, daily_total_summary, rebuild_totals
+
+BENCHMARKS = {}
+
+
+# on_disk benchmarks need a real SQLite file rather than the in-memory test
+# database, e.g. to use more than one connection
+def benchmark(name, on_disk=False):
+    def register(func):
+        func.on_disk = on_disk
+        BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+# Benchmarks seed and migrate a throwaway test database, never the real one
+@contextmanager
+def scratch_database(verbosity=0, on_disk=False):
+    old_name = connection.settings_dict["NAME"]
+    test_settings = connection.settings_dict["TEST"]
+    old_test_name = test_settings["NAME"]
+    if on_disk and connection.vendor == "sqlite":
+        test_settings["NAME"] = os.path.join(mkdtemp(), "benchmark.sqlite3")
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        test_settings["NAME"] = old_test_name
+
+
+# db_index fields added alongside the CallLog Meta indexes
+LOOKUP_FIELDS = [(CallLog, "CallId"), (Interpreter, "Name")]
+
+
+def without_db_index(field):
+    clone = field.clone()
+    clone.db_index = False
+    clone.set_attributes_from_name(field.name)
+    clone.model = field.model
+    return clone
+
+
+def existing_constraints(model):
+    with connection.cursor() as cursor:
+        return connection.introspection.get_constraints(cursor, model._meta.db_table)
+
+
+# Field alterations go first: SQLite rebuilds the table for them, which
+# recreates every index from Meta.
+def drop_lookup_indexes():
+    with connection.schema_editor() as editor:
+        for model, name in LOOKUP_FIELDS:
+            field = model._meta.get_field(name)
+            editor.alter_field(model, field, without_db_index(field))
+    existing = existing_constraints(CallLog)
+    with connection.schema_editor() as editor:
+        for constraint in CallLog._meta.constraints:
+            if constraint.name in existing:
+                editor.remove_constraint(CallLog, constraint)
+        for index in CallLog._meta.indexes:
+            if index.name in existing:
+                editor.remove_index(CallLog, index)
+
+
+def add_lookup_indexes():
+    started = perf_counter()
+    with connection.schema_editor() as editor:
+        for model, name in LOOKUP_FIELDS:
+            field = model._meta.get_field(name)
+            editor.alter_field(model, without_db_index(field), field)
+    existing = existing_constraints(CallLog)
+    with connection.schema_editor() as editor:
+        for index in CallLog._meta.indexes:
+            if index.name not in existing:
+                editor.add_index(CallLog, index)
+        for constraint in CallLog._meta.constraints:
+            if constraint.name not in existing:
+                editor.add_constraint(CallLog, constraint)
+    return perf_counter() - started
+
+
+# Best of `repeat` runs, which hides most of the noise from other processes
+def timed(func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = perf_counter()
+        func()
+        elapsed = perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def xlsx_bytes(build, queryset):
+    file = BytesIO()
+    build(queryset, file)
+    return file.getvalue()
+
+
+def measure(querysets, repeat=5):
+    return {
+        name: {
+            "seconds": timed(lambda: list(queryset.all()), repeat),
+            "plan": queryset.explain(),
+        }
+        for name, queryset in querysets.items()
+    }
+
+
+def lookup_querysets():
+    names = list(Interpreter.objects.values_list("Name", flat=True)[:1])
+    center = Interpreter.CENTER_CHOICES[0][0]
+    month = (
+        timezone.make_aware(datetime(2023, 3, 1)),
+        timezone.make_aware(datetime(2023, 4, 1)),
+    )
+    # Spread over the table so no lookup only touches the first pages
+    count = CallLog.objects.count()
+    call_ids = [f"S{number}" for number in range(0, count, max(count // 500, 1))]
+    return {
+        "CallId upsert lookup (500 ids)": CallLog.objects.filter(CallId__in=call_ids),
+        "Interpreter by name": Interpreter.objects.filter(Name__in=names),
+        "Service center changelist page": CallLog.objects.filter(
+            Service_Center=center
+        ).order_by("-Call_Time")[:100],
+        "Service center month": CallLog.objects.filter(
+            Service_Center=center, Call_Time__range=month
+        ).values_list("Interpreter_Pay", flat=True),
+        "Interpreter month": CallLog.objects.filter(
+            Interpreter_Name__in=names, Call_Time__range=month
+        ).values_list("Interpreter_Pay", flat=True),
+        "Call time range page": CallLog.objects.filter(Call_Time__range=month).order_by(
+            "Call_Time"
+        )[:100],
+    }
+
+
+@benchmark("indexes")
+def index_benchmark(rows, progress=None):
+    # Seed without the lookup indexes, then time building them
+    drop_lookup_indexes()
+    synthetic.seed(rows, progress=progress)
+    before = measure(lookup_querysets())
+    index_seconds = add_lookup_indexes()
+    after = measure(lookup_querysets())
+    return {
+        "rows": rows,
+        "index_seconds": index_seconds,
+        "results": {
+            name: {"before": before[name], "after": after[name]} for name in before
+        },
+    }
+
+
+# The Universal report as it was built before moving to a GROUP BY query,
+# kept as the baseline for the universal_export benchmark
+def legacy_universal_xlsx(queryset):
+    dataset = ExportCallLogResource().export(queryset)
+
+    df = pd.DataFrame(dataset.dict)
+    df["Total"] = df["Interpreter Pay"]
+    df["Total"] = df["Total"].astype(float)
+    df["Day Rate"] = 0.25
+    df["Night Rate"] = 0.37
+
+    df["Day Minutes"] = df.apply(
+        lambda x: x["Interpreter Pay"] / x["Interpreter Calltime"]
+        if x["Interpreter Calltime"] != 0
+        else Decimal("NaN"),
+        axis=1,
+    )
+    df["Day Minutes"].fillna(0, inplace=True)
+    df["Day Minutes"] = df["Day Minutes"].astype(float)
+
+    df["Night Minutes"] = df.apply(
+        lambda x: x["Interpreter Pay"] / x["Interpreter Calltime"]
+        if x["Interpreter Calltime"] != 0
+        else Decimal("NaN"),
+        axis=1,
+    )
+    df["Night Minutes"].fillna(0, inplace=True)
+    df["Night Minutes"] = df["Night Minutes"].astype(float)
+
+    group = df.groupby(["Interpreter Name"]).aggregate(
+        {
+            "Day Minutes": "sum",
+            "Day Rate": "first",
+            "Night Minutes": "sum",
+            "Night Rate": "first",
+            "Total": "sum",
+        }
+    )
+
+    with BytesIO() as b:
+        with pd.ExcelWriter(b, engine="openpyxl") as writer:
+            group.to_excel(writer, sheet_name="Sheet1")
+        return b.getvalue()
+
+
+@benchmark("universal_export")
+def universal_export_benchmark(rows, progress=None):
+    synthetic.seed(rows, progress=progress)
+    queryset = CallLog.objects.all()
+    before = pd.read_excel(BytesIO(legacy_universal_xlsx(queryset)))
+    after = pd.read_excel(BytesIO(xlsx_bytes(universal_xlsx, queryset)))
+    pd.testing.assert_frame_equal(before, after, check_exact=False)
+    return {
+        "rows": rows,
+        "results": {
+            "Universal's Format export": {
+                "before": {"seconds": timed(lambda: legacy_universal_xlsx(queryset), 1)},
+                "after": {
+                    "seconds": timed(lambda: xlsx_bytes(universal_xlsx, queryset), 3)
+                },
+            }
+        },
+    }
+
+
+@benchmark("call_log_export")
+def call_log_export_benchmark(rows, progress=None):
+    synthetic.seed(rows, progress=progress)
+    queryset = CallLog.objects.all()
+
+    # The whole tablib dataset and workbook in memory, as before
+    def before():
+        return ExportCallLogResource().export(queryset).xlsx
+
+    # Streamed into a spooled file like the export jobs do
+    def after():
+        with SpooledTemporaryFile(max_size=SPOOL_SIZE) as file:
+            call_logs_xlsx(queryset, file)
+
+    return {
+        "rows": rows,
+        "results": {
+            "Call log export": {
+                "before": {"seconds": timed(before, 1), "peak_memory": peak_memory(before)},
+                "after": {"seconds": timed(after, 1), "peak_memory": peak_memory(after)},
+            }
+        },
+    }
+
+
+# Exports of the whole call log list and of one month, from the database
+# against from the month snapshots: first while the snapshots still have to
+# be built, then again once they exist.
+@benchmark("export_snapshots")
+def export_snapshots_benchmark(rows, progress=None):
+    synthetic.seed(rows, progress=progress)
+    admin_class = admin.site._registry[CallLog]
+    results = {}
+    for label, query in [
+        ("all months", "period=all"),
+        ("one month", "period=all&Call_Time__year=2023&Call_Time__month=3"),
+    ]:
+        with TemporaryDirectory() as directory, override_settings(CALL_LOG_SNAPSHOT_DIR=directory):
+            changelist, request = call_log_changelist(query)
+            queryset = changelist.get_queryset(request)
+
+            def before():
+                with SpooledTemporaryFile(max_size=SPOOL_SIZE) as file:
+                    call_logs_xlsx(queryset, file)
+
+            def after():
+                with SpooledTemporaryFile(max_size=SPOOL_SIZE) as file:
+                    call_log_snapshot_xlsx(admin_class.snapshot_for(changelist), file)
+
+            for run in ("first run", "again"):
+                results[f"Call log export, {label}, {run}"] = {
+                    "before": {"seconds": timed(before, 1)},
+                    "after": {"seconds": timed(after, 1)},
+                }
+    return {"rows": rows, "results": results}
+
+
+@benchmark("daily_totals")
+def daily_totals_benchmark(rows, progress=None):
+    synthetic.seed(rows, progress=progress)
+    rebuild_totals()
+    month = (
+        timezone.make_aware(datetime(2023, 3, 1)),
+        timezone.make_aware(datetime(2023, 4, 1)),
+    )
+    calls = CallLog.objects.filter(Call_Time__gte=month[0], Call_Time__lt=month[1])
+    days = DailyTotal.objects.filter(Day__gte=month[0].date(), Day__lt=month[1].date())
+    assert call_log_summary(calls) == daily_total_summary(days)
+    return {
+        "rows": rows,
+        "results": {
+            "Month summary": {
+                "before": {"seconds": timed(lambda: call_log_summary(calls))},
+                "after": {"seconds": timed(lambda: daily_total_summary(days))},
+            },
+            "Universal's Format export, all months": {
+                "before": {
+                    "seconds": timed(lambda: xlsx_bytes(universal_xlsx, CallLog.objects.all()), 1)
+                },
+                "after": {
+                    "seconds": timed(lambda: xlsx_bytes(universal_xlsx, DailyTotal.objects.all()), 1)
+                },
+            },
+        },
+    }
+
+
+# What the admin runs for a changelist page: the page itself and the count
+def changelist_read(center):
+    list(CallLog.objects.filter(Service_Center=center).order_by("-Call_Time")[:100])
+    CallLog.objects.filter(Service_Center=center).count()
+
+
+# Imports `rows` call logs from another thread, chunk by chunk like the
+# import job, while this thread keeps reading changelist pages.
+def reads_during_import(rows, prefix):
+    rng = random.Random(1)
+    people = list(Interpreter.objects.all())
+    center = Interpreter.CENTER_CHOICES[0][0]
+    timings = {}
+
+    def run_import():
+        started = perf_counter()
+        try:
+            calls = synthetic.call_logs(rows, people, rng, prefix=prefix)
+            for chunk in iter(lambda: list(islice(calls, CHUNK_SIZE)), []):
+                upsert_call_logs(chunk)
+        finally:
+            timings["import"] = perf_counter() - started
+            connection.close()
+
+    writer = threading.Thread(target=run_import)
+    reads, failed = [], 0
+    writer.start()
+    while writer.is_alive():
+        started = perf_counter()
+        try:
+            changelist_read(center)
+        except OperationalError:
+            failed += 1
+        else:
+            reads.append(perf_counter() - started)
+    writer.join()
+    return timings["import"], reads, failed
+
+
+@benchmark("concurrency", on_disk=True)
+def concurrency_benchmark(rows, progress=None):
+    synthetic.seed(rows, progress=progress)
+    runs = {}
+    # Before: SQLite's default rollback journal. After: the SQLITE_PRAGMAS
+    # from settings, i.e. WAL.
+    for label, prefix, pragmas in [("before", "B", {"journal_mode": "DELETE"}), ("after", "A", None)]:
+        connection.close()
+        with override_settings(**({"SQLITE_PRAGMAS": pragmas} if pragmas else {})):
+            runs[label] = reads_during_import(rows, prefix)
+        connection.close()
+    return {
+        "rows": rows,
+        "results": {
+            "Import": {
+                label: {"seconds": import_seconds}
+                for label, (import_seconds, reads, failed) in runs.items()
+            },
+            "Changelist read during import (median)": {
+                label: {"seconds": median(reads) if reads else 0, "reads": len(reads), "failed": failed}
+                for label, (import_seconds, reads, failed) in runs.items()
+            },
+            "Changelist read during import (slowest)": {
+                label: {"seconds": max(reads, default=0)}
+                for label, (import_seconds, reads, failed) in runs.items()
+            },
+        },
+    }
+
+
+SEARCH_TERMS = [
+    "0042",
+    "Interpreter 0042",
+    '"Interpreter 0042"',
+    "Acme, Globex",
+    # Too short for the trigram index
+    "42",
+]
+
+
+# Per-run figures of one import history entry
+def run_result(record):
+    return {
+        "seconds": record.Seconds,
+        "rows": record.Rows,
+        "queries": record.Queries,
+        "stages": {name: stats["seconds"] for name, stats in record.Stages.items()},
+    }
+
+
+def job_result(kind, params=None, input_file=None):
+    job = run_job(enqueue(kind, params=params, input_file=input_file))
+    if job.Status != Job.DONE:
+        raise RuntimeError(job.Message)
+    return run_result(job.pipelinerun_set.get())
+
+
+def admin_import_result(path, dry_run):
+    admin_class = admin.site._registry[CallLog]
+    with open(path, encoding="utf-8") as f:
+        dataset = tablib.Dataset().load(f.read(), format="csv")
+    resource = admin_class.get_import_resource_classes()[0](bulk=True)
+    with recording(PipelineRun.CALL_LOG_IMPORT, dry_run=dry_run) as run:
+        result = resource.import_data(dataset, dry_run=dry_run, use_transactions=True)
+    if result.has_errors() or result.has_validation_errors():
+        raise RuntimeError(f"{path}: the admin import failed")
+    return run_result(run.record)
+
+
+# The call log changelist for `query`, as a select-all action gets it
+def call_log_changelist(query):
+    return selection_changelist(Job(Params={"query": query}), CallLog)
+
+
+def search_results(changelist, request):
+    admin_class = admin.site._registry[CallLog]
+    queryset = changelist.get_queryset(request)
+    results = {}
+    for term in SEARCH_TERMS:
+        found, _ = admin_class.get_search_results(request, queryset, term)
+
+        def page():
+            list(found.order_by("-Call_Time")[:100])
+            found.count()
+
+        results[f"Search {term}"] = {"seconds": timed(page, 3), "rows": found.count()}
+    return results
+
+
+def update_service_center_result(changelist, request):
+    request._messages = CookieStorage(request)
+    queryset = changelist.get_queryset(request)
+    started = perf_counter()
+    update_service_center(admin.site._registry[CallLog], request, queryset)
+    return {"seconds": perf_counter() - started, "rows": queryset.count()}
+
+
+# Times the import, every export action, the changelist search and Update
+# Service Center end to end on `rows` generated call logs. Each result is a
+# single run, for comparing whole runs of this benchmark against each other
+# (see --json and --compare).
+@benchmark("regression", on_disk=True)
+def regression_benchmark(rows, progress=None):
+    rng = random.Random(0)
+    people = Interpreter.objects.bulk_create(synthetic.interpreters(200, rng))
+    names = [person.Name for person in people]
+    results = {}
+    with TemporaryDirectory() as directory, override_settings(MEDIA_ROOT=directory):
+        path = os.path.join(directory, "calls.csv")
+        synthetic.write_call_log_file(path, "csv", synthetic.call_log_rows(rows, names, rng))
+        admin_path = os.path.join(directory, "admin.csv")
+        synthetic.write_call_log_file(
+            admin_path, "csv", synthetic.call_log_rows(rows, names, rng, prefix="A")
+        )
+        if progress:
+            progress(rows)
+
+        for label in ("Fast import, new rows", "Fast import, same file again"):
+            with open(path, "rb") as f:
+                results[label] = job_result(Job.IMPORT_CALL_LOGS, input_file=File(f, name="calls.csv"))
+        # A file of its own, so the admin import creates rows too
+        results["Admin import preview, bulk mode"] = admin_import_result(admin_path, dry_run=True)
+        results["Admin import, bulk mode"] = admin_import_result(admin_path, dry_run=False)
+
+        # The whole list, not just the current month
+        query = "period=all"
+        changelist, request = call_log_changelist(query)
+        results.update(search_results(changelist, request))
+
+        results["Export call logs"] = job_result(Job.EXPORT_CALL_LOGS, {"query": query})
+        results["Export Universal's Format"] = job_result(Job.EXPORT_UNIVERSAL, {"query": query})
+        results["Export interpreters"] = job_result(Job.EXPORT_INTERPRETERS, {"query": ""})
+
+        results["Update Service Center"] = update_service_center_result(changelist, request)
+        results["Update Service Center, nothing to change"] = update_service_center_result(
+            changelist, request
+        )
+    return {"rows": rows, "results": results}
+
+
+# One file per service center, as they arrive each month
+SERVICE_CENTER_FILES = 8
+
+
+# (name, format, contents) of `files` CSV files sharing `rows` call logs
+def call_log_files(directory, rows, files, names, rng, prefix):
+    contents = []
+    for number in range(files):
+        path = os.path.join(directory, f"{prefix}{number}.csv")
+        count = rows // files + (number < rows % files)
+        synthetic.write_call_log_file(
+            path, "csv", synthetic.call_log_rows(count, names, rng, prefix=f"{prefix}{number}-")
+        )
+        with open(path, "rb") as f:
+            contents.append((os.path.basename(path), "csv", f.read()))
+    return contents
+
+
+# Imports `rows` call logs split over one file per service center: before,
+# one fast import per file, each updating the totals as it goes; after, all
+# files at once, parsed in parallel and totalled once.
+@benchmark("multi_file", on_disk=True)
+def multi_file_benchmark(rows, progress=None):
+    rng = random.Random(0)
+    people = Interpreter.objects.bulk_create(synthetic.interpreters(200, rng))
+    names = [person.Name for person in people]
+    # Interpreters of their own, so both runs start without any totals
+    half = len(names) // 2
+    with TemporaryDirectory() as directory:
+        before = call_log_files(directory, rows, SERVICE_CENTER_FILES, names[:half], rng, "B")
+        after = call_log_files(directory, rows, SERVICE_CENTER_FILES, names[half:], rng, "A")
+    if progress:
+        progress(rows)
+
+    def import_one_by_one():
+        for name, file_format, data in before:
+            import_call_logs(BytesIO(data), file_format, name=name)
+
+    return {
+        "rows": rows,
+        "results": {
+            f"Import {SERVICE_CENTER_FILES} files ({IMPORT_PROCESSES} processes)": {
+                "before": {"seconds": timed(import_one_by_one, 1)},
+                "after": {"seconds": timed(lambda: import_call_log_files(after), 1)},
+            },
+        },
+    }
+
+
+# Call log downloads streaming at the same time
+ASGI_DOWNLOADS = 3
+
+
+# GETs `path` from the ASGI application in this process, as a server would,
+# and returns the status, the body size, the seconds until the first body
+# bytes arrived and the seconds it took
+async def asgi_get(application, path, query="", cookie=""):
+    response = {"size": 0, "first_byte": None}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message.get("body"):
+            if response["first_byte"] is None:
+                response["first_byte"] = perf_counter() - started
+            response["size"] += len(message["body"])
+
+    started = perf_counter()
+    await application(
+        {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"localhost"), (b"cookie", cookie.encode())],
+            "client": ("127.0.0.1", 50000),
+            "server": ("localhost", 80),
+        },
+        receive,
+        send,
+    )
+    return response["status"], response["size"], response["first_byte"], perf_counter() - started
+
+
+# The way Django 4.1's own handler can serve the downloads: its streaming
+# runs on the event loop, where the database can't be used, so the whole
+# file is made in the request's thread before anything is sent.
+class BufferingASGIHandler(ASGIHandler):
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        content = await sync_to_async(b"".join, thread_sensitive=True)(response)
+        buffered = HttpResponse(content, status=response.status_code)
+        for header, value in response.items():
+            buffered[header] = value
+        await sync_to_async(response.close, thread_sensitive=True)()
+        return await super().send_response(buffered, send)
+
+
+# Requests an admin page over and over while the downloads stream
+async def pages_during_downloads(application, downloads, page, cookie):
+    loads = [
+        asyncio.create_task(asgi_get(application, path, query, cookie)) for path, query in downloads
+    ]
+    pages = []
+    while not all(load.done() for load in loads):
+        pages.append(await admin_page(application, page, cookie))
+    finished = await asyncio.gather(*loads)
+    for status, size, first_byte, seconds in finished:
+        if status != 200 or not size:
+            raise RuntimeError(f"A download answered {status} with {size} bytes")
+    return {
+        "pages": pages,
+        "first_byte": max(first_byte for status, size, first_byte, seconds in finished),
+        "downloads": max(seconds for status, size, first_byte, seconds in finished),
+    }
+
+
+async def admin_page(application, page, cookie):
+    status, size, first_byte, seconds = await asgi_get(application, page, cookie=cookie)
+    if status != 200:
+        raise RuntimeError(f"{page} answered {status}")
+    return seconds
+
+
+# The interpreter list served through ASGI while whole call log lists
+# download as CSV. Before: BufferingASGIHandler. After: StreamingASGIHandler,
+# sending each chunk as soon as it is made.
+@benchmark("async_downloads", on_disk=True)
+def async_downloads_benchmark(rows, progress=None):
+    synthetic.seed(rows, progress=progress)
+    user = User.objects.create_superuser("benchmark", password=None)
+    client = Client()
+    client.force_login(user)
+    cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+    downloads = [
+        (reverse("admin:invoice_calllog_stream_export", args=["csv"]), "period=all")
+    ] * ASGI_DOWNLOADS
+    page = reverse("admin:invoice_interpreter_changelist")
+    runs = {}
+    with TemporaryDirectory() as directory, override_settings(
+        ALLOWED_HOSTS=["localhost"], CALL_LOG_SNAPSHOT_DIR=directory
+    ):
+        # Builds the month snapshots, which both runs then read
+        asyncio.run(asgi_get(StreamingASGIHandler(), *downloads[0], cookie))
+        idle = [asyncio.run(admin_page(ASGIHandler(), page, cookie)) for _ in range(5)]
+        for label, application in [("before", BufferingASGIHandler()), ("after", StreamingASGIHandler())]:
+            runs[label] = asyncio.run(pages_during_downloads(application, downloads, page, cookie))
+    connection.close()
+    return {
+        "rows": rows,
+        "results": {
+            "Admin page without downloads (median)": {"seconds": median(idle)},
+            f"{ASGI_DOWNLOADS} call log CSV downloads, first bytes": {
+                label: {"seconds": run["first_byte"]} for label, run in runs.items()
+            },
+            f"{ASGI_DOWNLOADS} call log CSV downloads, complete": {
+                label: {"seconds": run["downloads"]} for label, run in runs.items()
+            },
+            "Admin page during downloads (median)": {
+                label: {"seconds": median(run["pages"]), "pages": len(run["pages"])}
+                for label, run in runs.items()
+            },
+            "Admin page during downloads (slowest)": {
+                label: {"seconds": max(run["pages"])} for label, run in runs.items()
+            },
+        },
+    }
+
+
+# Run in a fresh interpreter: imports `sys.argv[2:]` first, then boots
+# Django either as `manage.py check` or as a WSGI worker that has resolved
+# its URLs, and prints its peak RSS as the last line. ru_maxrss survives
+# exec on Linux and would report the benchmark's own RSS, hence VmHWM.
+STARTUP_SCRIPT = """
+import json, os, resource, sys
+for module in sys.argv[2:]:
+    __import__(module)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "wwi.settings")
+if sys.argv[1] == "check":
+    from django.core.management import execute_from_command_line
+    execute_from_command_line(["manage.py", "check"])
+else:
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()
+    import wwi.urls
+try:
+    with open("/proc/self/status") as f:
+        peak = int(next(line for line in f if line.startswith("VmHWM:")).split()[1])
+except OSError:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "peak_memory": peak * 1024,
+    "pandas": "pandas" in sys.modules,
+}))
+"""
+
+
+# Total of the top-level imports in `python -X importtime` output, in seconds
+def import_seconds(importtime):
+    total = 0
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+    return total / 1e6
+
+
+def startup(mode, preload=(), repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT, mode, *preload],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        run = json.loads(process.stdout.splitlines()[-1])
+        run["seconds"] = perf_counter() - started
+        run["import_seconds"] = import_seconds(process.stderr)
+        if best is None or run["seconds"] < best["seconds"]:
+            best = run
+    return best
+
+
+# Boot time, import time and peak RSS of a fresh process. Before: pandas
+# imported up front, as invoice.exports used to. After: as the code is now.
+@benchmark("startup")
+def startup_benchmark(rows, progress=None):
+    return {
+        "rows": 0,
+        "results": {
+            label: {"before": startup(mode, ["pandas"]), "after": startup(mode)}
+            for label, mode in [("manage.py check", "check"), ("WSGI worker boot", "wsgi")]
+        },
+    }
@@ -0,0 +1,38 @@
+import time
+from hashlib import md5
+
+from django.core.cache import cache
+from django.db import transaction
+
+CALL_LOG_VERSION_KEY = "invoice:calllog:version"
+SUMMARY_TIMEOUT = 5 * 60
+
+
+# Cached values derived from call logs embed this version in their keys, so
+# bumping it after a write invalidates all of them at once.
+def call_log_version():
+    return cache.get_or_set(CALL_LOG_VERSION_KEY, time.time_ns, None)
+
+
+def bump_call_log_version():
+    try:
+        cache.incr(CALL_LOG_VERSION_KEY)
+    except ValueError:
+        # Evicted; a fresh timestamp can't collide with an older version
+        cache.set(CALL_LOG_VERSION_KEY, time.time_ns(), None)
+
+
+# Deferred to the commit so no request can cache pre-commit values under the
+# new version
+def call_logs_changed():
+    transaction.on_commit(bump_call_log_version)
+
+
+def queryset_key(prefix, queryset):
+    sql, params = queryset.query.sql_with_params()
+    digest = md5(repr((sql, params)).encode(), usedforsecurity=False).hexdigest()
+    return f"invoice:{prefix}:{call_log_version()}:{digest}"
+
+
+def cached_for_queryset(prefix, queryset, compute, timeout=SUMMARY_TIMEOUT):
+    return cache.get_or_set(queryset_key(prefix, queryset), lambda: compute(queryset), timeout)
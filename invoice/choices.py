@@ -0,0 +1,59 @@
+from collections import Counter
+
+from .models import DailyTotal
+
+
+# Case and whitespace differences don't make a different value
+def normalize(value):
+    return " ".join(str(value).split()).casefold()
+
+
+# Maps a column's values to the stored value of the matching choice, by
+# value or label. Every distinct cell is normalized once and then answered
+# from a dict, so cleaning a column costs one lookup per row whatever the
+# number of choices. Values matching no choice are kept as they are and
+# counted in `unknown`, to be reported once for the whole file.
+class ChoiceLookup:
+    def __init__(self, choices):
+        self.values = {}
+        for value, label in choices:
+            self.values.setdefault(normalize(value), value)
+            self.values.setdefault(normalize(label), value)
+        self.cells = {}
+        self.unknown = Counter()
+
+    def __call__(self, value):
+        if value is None or value == "":
+            return value
+        if value not in self.cells:
+            self.cells[value] = self.values.get(normalize(value))
+        choice = self.cells[value]
+        if choice is None:
+            self.unknown[value] += 1
+            return value
+        return choice
+
+
+# Same for columns without a fixed set of values, like Language: spellings
+# differing only in case or spacing become the first one seen, preferring
+# those already stored, so "spanish " doesn't get totals of its own.
+class SpellingLookup:
+    def __init__(self, known=()):
+        self.values = {}
+        for value in known:
+            self.values.setdefault(normalize(value), value)
+        self.cells = {}
+
+    # Text columns store a missing value as ""
+    def __call__(self, value):
+        if value is None or value == "":
+            return ""
+        if value not in self.cells:
+            spelling = " ".join(str(value).split())
+            self.cells[value] = self.values.setdefault(normalize(spelling), spelling)
+        return self.cells[value]
+
+
+# DailyTotal has every language of the call logs and archive in far fewer rows
+def known_languages():
+    return DailyTotal.objects.order_by().values_list("Language", flat=True).distinct()
@@ -0,0 +1,42 @@
+from hashlib import sha256
+
+from .models import ImportedChunk, ImportedFile
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+# Leaves the file at its start again for the import
+def file_digest(file):
+    digest = sha256()
+    file.seek(0)
+    for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+# Cells as text, so a chunk hashes the same whether it came from the CSV
+# reader, openpyxl or tablib
+def chunk_digest(rows):
+    digest = sha256()
+    for row in rows:
+        digest.update(
+            "\x1f".join("" if value is None else str(value) for value in row).encode()
+        )
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+def completed_import(digest):
+    return ImportedFile.objects.filter(Sha256=digest, Completed_At__isnull=False).first()
+
+
+def imported_chunks(digests):
+    return set(ImportedChunk.objects.filter(Sha256__in=digests).values_list("Sha256", flat=True))
+
+
+def record_chunks(imported_file, chunks):
+    ImportedChunk.objects.bulk_create(
+        [ImportedChunk(Sha256=digest, File=imported_file, Rows=rows) for digest, rows in chunks],
+        ignore_conflicts=True,
+    )
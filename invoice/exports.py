@@ -0,0 +1,190 @@
+import csv
+from io import StringIO
+from tempfile import SpooledTemporaryFile
+
+from django.db.models import FloatField, Sum
+from django.db.models.functions import Cast
+from import_export.resources import ModelResource
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from .models import CallLog, DailyTotal, Interpreter
+from .totals import pay_per_minute
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_CONTENT_TYPE = "text/csv"
+EXPORT_CHUNK_SIZE = 2000
+# Export files are built in memory up to this size, then on disk
+SPOOL_SIZE = 10 * 1024 * 1024
+# Bytes per chunk of a downloaded XLSX file
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class ExportInterpreterResource(ModelResource):
+    class Meta:
+        model = Interpreter
+        fields = (
+            "Name",
+            "Payment_Method",
+            "Service_Center",
+            "Total_Amount",
+            "Total_Minutes",
+        )
+
+    def get_export_fields(self):
+        fields = super().get_export_fields()
+        for field in fields:
+            field.column_name = Interpreter._meta.get_field(
+                field.attribute
+            ).verbose_name
+        return fields
+
+
+class ExportCallLogResource(ModelResource):
+    class Meta:
+        model = CallLog
+        fields = (
+            "Interpreter_Name",
+            "Language",
+            "Interpreter_Pay",
+            "Interpreter_Calltime",
+            "Call_Time",
+            "CallId",
+            "Service_Center"
+        )
+
+    def get_export_fields(self):
+        fields = super().get_export_fields()
+        for field in fields:
+            field.column_name = CallLog._meta.get_field(field.attribute).verbose_name
+        return fields
+
+
+def write_sheet(headers, rows, file, progress=None):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Tablib Dataset")
+    sheet.freeze_panes = "A2"
+    bold = Font(bold=True)
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(sheet, value=header)
+        cell.font = bold
+        header_cells.append(cell)
+    sheet.append(header_cells)
+
+    count = 0
+    for row in rows:
+        sheet.append(row)
+        count += 1
+        if progress and count % EXPORT_CHUNK_SIZE == 0:
+            progress(count)
+    workbook.save(file)
+    return count
+
+
+# Rows are read from the database in chunks, so memory use does not grow
+# with the number of rows exported.
+def export_rows(resource, queryset):
+    fields = resource.get_export_fields()
+    return (
+        [resource.export_field(field, obj) for field in fields]
+        for obj in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def write_xlsx(resource, queryset, file, progress=None):
+    return write_sheet(resource.get_export_headers(), export_rows(resource, queryset), file, progress)
+
+
+def interpreters_xlsx(queryset, file, progress=None):
+    return write_xlsx(ExportInterpreterResource(), queryset, file, progress)
+
+
+def call_logs_xlsx(queryset, file, progress=None):
+    return write_xlsx(ExportCallLogResource(), queryset, file, progress)
+
+
+# Same sheet from a snapshots.CallLogSnapshot instead of a queryset
+def call_log_snapshot_xlsx(snapshot, file, progress=None):
+    return write_sheet(ExportCallLogResource().get_export_headers(), snapshot.rows(), file, progress)
+
+
+# A CSV download, EXPORT_CHUNK_SIZE rows at a time
+def csv_chunks(headers, rows):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+# An XLSX file only has its zip directory at the end, so the whole sheet is
+# written first and then sent in chunks
+def xlsx_chunks(headers, rows):
+    with SpooledTemporaryFile(max_size=SPOOL_SIZE) as file:
+        write_sheet(headers, rows, file)
+        file.seek(0)
+        yield from iter(lambda: file.read(STREAM_CHUNK_SIZE), b"")
+
+
+# Format of a streamed download -> (chunks of headers and rows, content type)
+STREAM_FORMATS = {
+    "csv": (csv_chunks, CSV_CONTENT_TYPE),
+    "xlsx": (xlsx_chunks, XLSX_CONTENT_TYPE),
+}
+
+
+UNIVERSAL_DAY_RATE = 0.25
+UNIVERSAL_NIGHT_RATE = 0.37
+UNIVERSAL_COLUMNS = ["Day Minutes", "Day Rate", "Night Minutes", "Night Rate", "Total"]
+
+
+# One row per interpreter, grouped in the database so only the per
+# interpreter sums leave it. Reads the daily totals when given those.
+def universal_xlsx(queryset, file, progress=None):
+    # Imported here so web workers and commands that never build this
+    # report don't pay pandas' import time and memory
+    import numpy as np
+    import pandas as pd
+
+    if queryset.model is DailyTotal:
+        sums = {"Minutes": Sum("Pay_Per_Minute"), "Total": Sum("Total_Amount")}
+    else:
+        sums = {
+            "Minutes": Sum(pay_per_minute()),
+            "Total": Sum(Cast("Interpreter_Pay", FloatField())),
+        }
+    rows = queryset.order_by().values_list("Interpreter_Name").annotate(**sums)
+    names, minutes, total = zip(*rows) if rows else ((), (), ())
+    minutes = np.array(minutes, dtype=float)
+    group = pd.DataFrame(
+        {
+            "Day Minutes": minutes,
+            "Day Rate": UNIVERSAL_DAY_RATE,
+            "Night Minutes": minutes,
+            "Night Rate": UNIVERSAL_NIGHT_RATE,
+            "Total": np.array(total, dtype=float),
+        },
+        index=pd.Index(names, name="Interpreter Name"),
+        columns=UNIVERSAL_COLUMNS,
+    )
+    group = group.fillna(0).sort_index()
+
+    with pd.ExcelWriter(file, engine="openpyxl") as writer:
+        group.to_excel(writer, sheet_name="Sheet1")
+
+
+# Kind of export -> (builder writing to a file, download file name)
+EXPORTS = {
+    "call_logs": (call_logs_xlsx, "InterpreterCalls.xlsx"),
+    "call_log_snapshot": (call_log_snapshot_xlsx, "InterpreterCalls.xlsx"),
+    # TODO: CHANGE FILENAME
+    "universal": (universal_xlsx, "InterpreterCalls.xlsx"),
+    "interpreters": (interpreters_xlsx, "InterpretersPay.xlsx"),
+}
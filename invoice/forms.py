@@ -0,0 +1,102 @@
+from django import forms
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from import_export.forms import ConfirmImportForm, ImportForm
+
+from .dedup import completed_import, file_digest
+from .importer import UPLOAD_FORMATS, CallLogImportError, format_for
+
+
+PROFILE_HELP_TEXT = _(
+    "Record a cProfile dump and memory use for this import in the import history. Makes it slower."
+)
+IMPORT_AGAIN_HELP_TEXT = _(
+    "Import the file even if it was imported before, including rows other files already had."
+)
+
+
+# Rejects a file whose exact contents were imported before, unless
+# "Import again" is ticked, and keeps its hash as cleaned_data["file_hash"].
+# Of several uploaded files, each is checked.
+class ImportedFileCheckMixin:
+    def clean(self):
+        cleaned_data = super().clean()
+        import_file = cleaned_data.get("import_file")
+        if import_file is None:
+            return cleaned_data
+        files = import_file if isinstance(import_file, list) else [import_file]
+        for file in files:
+            file_hash = file_digest(file)
+            imported = completed_import(file_hash)
+            if imported is not None and not cleaned_data.get("import_again"):
+                # On the field, as the import-export template shows no form errors
+                self.add_error(
+                    "import_file",
+                    _("{file} was already imported on {date:%Y-%m-%d %H:%M}{by}. Tick \"Import again\" to import it anyway.").format(
+                        file=_("This file") if len(files) == 1 else file.name,
+                        date=timezone.localtime(imported.Completed_At),
+                        by=f" by {imported.Created_By}" if imported.Created_By else "",
+                    ),
+                )
+        if import_file is file:
+            cleaned_data["file_hash"] = file_hash
+        return cleaned_data
+
+
+# Django's file input only hands over the last of several selected files
+class MultipleFileInput(forms.FileInput):
+    allow_multiple_selected = True
+
+    def __init__(self, attrs=None):
+        super().__init__({"multiple": True, **(attrs or {})})
+
+    def value_from_datadict(self, data, files, name):
+        return files.getlist(name)
+
+
+class MultipleFileField(forms.FileField):
+    widget = MultipleFileInput
+
+    def clean(self, data, initial=None):
+        if not data:
+            return super().clean(data, initial)
+        return [super(MultipleFileField, self).clean(file, initial) for file in data]
+
+
+class StreamImportForm(ImportedFileCheckMixin, forms.Form):
+    import_file = MultipleFileField(
+        label=_("Files to import"),
+        help_text=_("CSV or XLSX call log exports, or a zip of them, imported in the background without a preview. Several files are read in parallel and saved together."),
+    )
+    import_again = forms.BooleanField(
+        label=_("Import again"), required=False, help_text=IMPORT_AGAIN_HELP_TEXT
+    )
+    profile = forms.BooleanField(label=_("Profile"), required=False, help_text=PROFILE_HELP_TEXT)
+
+    def clean_import_file(self):
+        import_files = self.cleaned_data["import_file"]
+        try:
+            for import_file in import_files:
+                format_for(import_file.name, UPLOAD_FORMATS)
+        except CallLogImportError as e:
+            raise forms.ValidationError(str(e))
+        return import_files
+
+
+class CallLogImportForm(ImportedFileCheckMixin, ImportForm):
+    bulk_mode = forms.BooleanField(
+        label=_("Bulk mode"),
+        required=False,
+        help_text=_("Preview only the totals and a sample of rows. Recommended for large files. CSV and XLSX files are imported in batches in the background either way; files in other formats are then also written in batches."),
+    )
+    import_again = forms.BooleanField(
+        label=_("Import again"), required=False, help_text=IMPORT_AGAIN_HELP_TEXT
+    )
+    profile = forms.BooleanField(label=_("Profile"), required=False, help_text=PROFILE_HELP_TEXT)
+
+
+class CallLogConfirmImportForm(ConfirmImportForm):
+    bulk_mode = forms.BooleanField(required=False, widget=forms.HiddenInput())
+    profile = forms.BooleanField(required=False, widget=forms.HiddenInput())
+    import_again = forms.BooleanField(required=False, widget=forms.HiddenInput())
+    file_hash = forms.CharField(required=False, widget=forms.HiddenInput())
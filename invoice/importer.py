@@ -0,0 +1,497 @@
+import csv
+import io
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice, repeat
+from time import perf_counter
+
+import django
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from .archive import restore_call_ids
+from .caching import call_logs_changed
+from .choices import SpellingLookup, known_languages
+from .dedup import chunk_digest, completed_import, file_digest, imported_chunks, record_chunks
+from .instrumentation import stage
+from .models import CallLog, ImportedFile, Interpreter
+from .pagination import analyze_table
+from .totals import LOOKUP_BATCH_SIZE, WRITE_BATCH_SIZE, TotalsDelta, batched, update_rows
+
+# Positional column layout of the vendor call log export
+CALL_LOG_HEADERS = [
+    "CallId",
+    "Caller_Id",
+    "Call_Time",
+    "Billed_Seconds",
+    "Operator",
+    "Datacapture",
+    "Customer_Calltime",
+    "Interpreter_Calltime",
+    "Interpreter_Number",
+    "Language_Id",
+    "Language",
+    "Interpreter_Pay",
+    "Bill_Customer",
+    "Account_Code",
+    "Interpreter_Name",
+    "Customer_Name",
+]
+CHUNK_SIZE = 5000
+FORMATS = ("csv", "xlsx")
+# Several files are uploaded as one zip of CSV and XLSX files
+ARCHIVE_FORMAT = "zip"
+UPLOAD_FORMATS = FORMATS + (ARCHIVE_FORMAT,)
+# Files of a zip are parsed this many at a time, each in its own process
+IMPORT_PROCESSES = os.cpu_count() or 1
+UPDATE_FIELDS = [
+    "Call_Time",
+    "Interpreter_Calltime",
+    "Language",
+    "Interpreter_Pay",
+    "Interpreter_Name",
+    "Interpreter_id",
+    "Customer_Name",
+]
+
+
+class CallLogImportError(ValueError):
+    pass
+
+
+def format_for(name, formats=FORMATS):
+    extension = os.path.splitext(name)[1].lower().lstrip(".")
+    if extension not in formats:
+        names = [format_.upper() for format_ in formats]
+        raise CallLogImportError(
+            f"Unsupported file type '{extension}', use {', '.join(names[:-1])} or {names[-1]}."
+        )
+    return extension
+
+
+# (name, format, contents) of the call log files in a zip
+def zip_members(file):
+    members = []
+    with zipfile.ZipFile(file) as archive:
+        for info in archive.infolist():
+            # Folders, and the resource forks macOS adds to the zips it makes
+            if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                continue
+            name = os.path.basename(info.filename)
+            members.append((name, format_for(name), archive.read(info)))
+    return members
+
+
+# Several uploaded files, stored as one zip for the background worker
+def zip_files(files, target):
+    with zipfile.ZipFile(target, "w") as archive:
+        for file in files:
+            file.seek(0)
+            with archive.open(os.path.basename(file.name), "w") as member:
+                for block in iter(lambda: file.read(1 << 20), b""):
+                    member.write(block)
+    target.seek(0)
+    return target
+
+
+def read_csv(file):
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        yield from csv.reader(text)
+    finally:
+        # Leave the underlying upload open for the caller, if it still is
+        if not file.closed:
+            text.detach()
+
+
+def read_xlsx(file):
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+READERS = {"csv": read_csv, "xlsx": read_xlsx}
+
+
+# Cheap row count for progress reporting, without parsing the rows
+def count_rows(file, file_format):
+    if file_format == ARCHIVE_FORMAT:
+        counts = [
+            count_rows(io.BytesIO(data), member_format)
+            for name, member_format, data in zip_members(file)
+        ]
+        return None if None in counts else sum(counts)
+    if file_format == "xlsx":
+        workbook = load_workbook(file, read_only=True)
+        try:
+            max_row = workbook.active.max_row
+        finally:
+            workbook.close()
+        return max(max_row - 1, 0) if max_row else None
+    lines = sum(chunk.count(b"\n") for chunk in iter(lambda: file.read(1 << 20), b""))
+    return max(lines - 1, 0)
+
+
+# Interpreter name -> pk, loaded once per import. Names are not unique, so
+# the oldest interpreter wins, as in the data migration.
+def interpreter_ids():
+    ids = {}
+    for pk, name in Interpreter.objects.order_by("-pk").values_list("pk", "Name"):
+        ids[name] = pk
+    return ids
+
+
+# Links call logs without an interpreter to the one matching their name, in a
+# single UPDATE
+def link_interpreters(queryset=None):
+    if queryset is None:
+        queryset = CallLog.objects.all()
+    return queryset.filter(
+        Interpreter__isnull=True, Interpreter_Name__in=Interpreter.objects.values("Name")
+    ).update(
+        Interpreter=Subquery(
+            Interpreter.objects.filter(Name=OuterRef("Interpreter_Name"))
+            .order_by("pk")
+            .values("pk")[:1]
+        )
+    )
+
+
+def clean_text(value):
+    if value is None:
+        return ""
+    return str(value)
+
+
+def clean_integer(value):
+    if value is None or str(value).strip() == "":
+        return None
+    return int(Decimal(str(value)))
+
+
+def clean_decimal(value):
+    if value is None or str(value).strip() == "":
+        return None
+    return Decimal(str(value))
+
+
+class DateTimeCleaner:
+    # Same input formats as import-export's DateTimeWidget, trying the last
+    # matching format first since a file uses one format throughout.
+    def __init__(self):
+        self.formats = list(settings.DATETIME_INPUT_FORMATS or ("%Y-%m-%d %H:%M:%S",))
+        self.timezone = timezone.get_current_timezone()
+
+    def __call__(self, value):
+        if value is None or value == "":
+            return None
+        if not isinstance(value, datetime):
+            value = self.parse(str(value).strip())
+        if settings.USE_TZ and timezone.is_naive(value):
+            value = timezone.make_aware(value, self.timezone)
+        return value
+
+    def parse(self, value):
+        for index, format_ in enumerate(self.formats):
+            try:
+                parsed = datetime.strptime(value, format_)
+            except ValueError:
+                continue
+            if index:
+                self.formats.insert(0, self.formats.pop(index))
+            return parsed
+        raise ValueError("Enter a valid date/time.")
+
+
+# Yields (line number, row) with the positional headers before_import uses
+def normalized_rows(rows):
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = len([column for column in header if column not in (None, "")])
+    if columns != len(CALL_LOG_HEADERS):
+        raise CallLogImportError(
+            f"Expected {len(CALL_LOG_HEADERS)} columns, found {columns}."
+        )
+    for number, row in enumerate(rows, 2):
+        if any(value not in (None, "") for value in row):
+            yield number, dict(zip(CALL_LOG_HEADERS, row))
+
+
+class CallLogBuilder:
+    # Worker processes get the interpreters and languages from the parent
+    # instead of querying the database themselves
+    def __init__(self, interpreters=None, languages=None):
+        self.interpreters = interpreter_ids() if interpreters is None else interpreters
+        languages = known_languages() if languages is None else languages
+        self.cleaners = {
+            "CallId": clean_text,
+            "Call_Time": DateTimeCleaner(),
+            "Interpreter_Calltime": clean_integer,
+            "Language": SpellingLookup(languages),
+            "Interpreter_Pay": clean_decimal,
+            "Interpreter_Name": clean_text,
+            "Customer_Name": clean_text,
+        }
+
+    def build(self, row, number):
+        values = {}
+        for field, clean in self.cleaners.items():
+            try:
+                values[field] = clean(row.get(field))
+            except (ValueError, InvalidOperation):
+                raise CallLogImportError(
+                    f"Row {number}: invalid {field} value {row.get(field)!r}."
+                )
+        values["Interpreter_id"] = self.interpreters.get(values["Interpreter_Name"])
+        return CallLog(**values)
+
+
+# The totals are updated before returning, unless the caller passes its own
+# `totals` to apply once it is done
+def upsert_call_logs(call_logs, totals=None):
+    # Later rows win when a CallId repeats, as with a row-by-row import
+    unique = {}
+    for number, call in enumerate(call_logs):
+        unique[call.CallId or f"#{number}"] = call
+
+    with transaction.atomic():
+        existing = {}
+        call_ids = [call.CallId for call in unique.values() if call.CallId]
+        with stage("lookup"):
+            restore_call_ids(call_ids)
+            for batch in batched(call_ids, LOOKUP_BATCH_SIZE):
+                existing.update(
+                    (call.CallId, call) for call in CallLog.objects.filter(CallId__in=batch)
+                )
+
+        apply_totals = totals is None
+        if apply_totals:
+            totals = TotalsDelta()
+        created, updated = [], []
+        for call in unique.values():
+            stored = existing.get(call.CallId) if call.CallId else None
+            if stored is None:
+                created.append(call)
+                totals.add_call(call)
+            else:
+                totals.remove_call(stored)
+                for field in UPDATE_FIELDS:
+                    setattr(stored, field, getattr(call, field))
+                updated.append(stored)
+                # The stored row keeps fields the file doesn't have, such as
+                # its Service Center
+                totals.add_call(stored)
+
+        with stage("write"):
+            CallLog.objects.bulk_create(created, batch_size=WRITE_BATCH_SIZE)
+            update_rows(CallLog, updated, UPDATE_FIELDS)
+        if apply_totals:
+            totals.apply()
+        call_logs_changed()
+    return len(created), len(updated)
+
+
+# Reads and writes chunk_size rows at a time, each chunk committing on its
+# own, so memory use does not grow with the size of the file. A file that
+# was imported before is left alone, a failed import of it resumes after its
+# last committed chunk, and chunks already imported from another file are
+# skipped, unless import_again is set. import_again starts the file over,
+# unless `resume` says an earlier attempt of the same import already did.
+def import_call_logs(
+    file,
+    file_format,
+    chunk_size=CHUNK_SIZE,
+    progress=None,
+    name="",
+    user=None,
+    import_again=False,
+    resume=False,
+):
+    started = perf_counter()
+    stats = {"rows": 0, "created": 0, "updated": 0, "chunks": 0, "skipped": 0, "resumed": 0}
+    with stage("hash"):
+        digest = file_digest(file)
+    imported, _ = ImportedFile.objects.get_or_create(
+        Sha256=digest, defaults={"Name": name[:255], "Created_By": user}
+    )
+    if import_again and not resume:
+        imported.Rows_Done, imported.Completed_At = 0, None
+        imported.save(update_fields=["Rows_Done", "Completed_At"])
+    elif imported.Completed_At is not None:
+        stats["already_imported"] = imported.Completed_At
+        stats["seconds"] = perf_counter() - started
+        stats["rows_per_second"] = 0
+        return stats
+
+    builder = CallLogBuilder()
+    rows = normalized_rows(READERS[file_format](file))
+    if imported.Rows_Done:
+        with stage("resume"):
+            stats["resumed"] = sum(1 for _ in islice(rows, imported.Rows_Done))
+    while True:
+        with stage("read"):
+            raw = list(islice(rows, chunk_size))
+        if not raw:
+            break
+        digest = chunk_digest(row.values() for number, row in raw)
+        if not import_again and imported_chunks([digest]):
+            stats["skipped"] += len(raw)
+            ImportedFile.objects.filter(pk=imported.pk).update(Rows_Done=F("Rows_Done") + len(raw))
+        else:
+            with stage("read"):
+                chunk = [builder.build(row, number) for number, row in raw]
+            # The chunk and the resume point commit together
+            with stage("upsert"), transaction.atomic():
+                created, updated = upsert_call_logs(chunk)
+                record_chunks(imported, [(digest, len(raw))])
+                ImportedFile.objects.filter(pk=imported.pk).update(
+                    Rows_Done=F("Rows_Done") + len(raw)
+                )
+            stats["rows"] += len(chunk)
+            stats["created"] += created
+            stats["updated"] += updated
+            stats["chunks"] += 1
+        if progress:
+            progress(stats)
+
+    ImportedFile.objects.filter(pk=imported.pk).update(Completed_At=timezone.now())
+    with stage("analyze"):
+        analyze_table(CallLog)
+    stats["seconds"] = perf_counter() - started
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0
+    return stats
+
+
+# Runs in a worker process: reads and cleans a whole file, in chunks hashed
+# like import_call_logs' so either skips the chunks the other imported
+def parse_call_log_file(name, file_format, data, interpreters, languages, chunk_size=CHUNK_SIZE):
+    builder = CallLogBuilder(interpreters, languages)
+    rows = normalized_rows(READERS[file_format](io.BytesIO(data)))
+    chunks = []
+    try:
+        while True:
+            raw = list(islice(rows, chunk_size))
+            if not raw:
+                break
+            chunks.append(
+                (
+                    chunk_digest(row.values() for number, row in raw),
+                    [builder.build(row, number) for number, row in raw],
+                )
+            )
+    except CallLogImportError as e:
+        raise CallLogImportError(f"{name}: {e}")
+    return chunks
+
+
+# Parsed files in the order given, several at a time in a process pool
+def parse_call_log_files(files, interpreters, languages, processes=IMPORT_PROCESSES):
+    if not files:
+        return
+    args = [*zip(*files), repeat(interpreters), repeat(languages)]
+    processes = min(processes, len(files))
+    if processes <= 1:
+        yield from map(parse_call_log_file, *args)
+        return
+    # Workers that are spawned rather than forked need Django set up first
+    with ProcessPoolExecutor(processes, initializer=django.setup) as pool:
+        yield from pool.map(parse_call_log_file, *args)
+
+
+# Imports several (name, format, contents) files at once, such as the members
+# of a zip: the files are parsed in parallel, then written in file order in
+# one transaction, with the interpreter totals updated once at the end. Files
+# imported before are left out, as are chunks of them, unless import_again
+# is set. Unlike import_call_logs, a failed import saves none of the files.
+def import_call_log_files(
+    files, progress=None, user=None, import_again=False, processes=IMPORT_PROCESSES
+):
+    started = perf_counter()
+    stats = {
+        "rows": 0,
+        "created": 0,
+        "updated": 0,
+        "chunks": 0,
+        "skipped": 0,
+        "resumed": 0,
+        "files": 0,
+        "files_skipped": 0,
+    }
+    pending = []
+    with stage("hash"):
+        for name, file_format, data in files:
+            file_hash = file_digest(io.BytesIO(data))
+            if import_again or completed_import(file_hash) is None:
+                pending.append((file_hash, (name, file_format, data)))
+            else:
+                stats["files_skipped"] += 1
+
+    parsed = parse_call_log_files(
+        [file for file_hash, file in pending], interpreter_ids(), list(known_languages()), processes
+    )
+    totals = TotalsDelta()
+    with transaction.atomic():
+        for file_hash, (name, file_format, data) in pending:
+            with stage("read"):
+                chunks = next(parsed)
+            imported, _ = ImportedFile.objects.get_or_create(
+                Sha256=file_hash, defaults={"Name": name[:255], "Created_By": user}
+            )
+            known = set() if import_again else imported_chunks([digest for digest, chunk in chunks])
+            for digest, chunk in chunks:
+                if digest in known:
+                    stats["skipped"] += len(chunk)
+                else:
+                    with stage("upsert"):
+                        created, updated = upsert_call_logs(chunk, totals)
+                    stats["rows"] += len(chunk)
+                    stats["created"] += created
+                    stats["updated"] += updated
+                    stats["chunks"] += 1
+                if progress:
+                    progress(stats)
+            record_chunks(
+                imported, [(digest, len(chunk)) for digest, chunk in chunks if digest not in known]
+            )
+            ImportedFile.objects.filter(pk=imported.pk).update(
+                Rows_Done=sum(len(chunk) for digest, chunk in chunks), Completed_At=timezone.now()
+            )
+            stats["files"] += 1
+        totals.apply()
+
+    with stage("analyze"):
+        analyze_table(CallLog)
+    stats["seconds"] = perf_counter() - started
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0
+    return stats
+
+
+# Summary of an import_call_logs run for job messages and the command line
+def import_message(stats):
+    if "already_imported" in stats:
+        return "Already imported on {:%Y-%m-%d %H:%M}, nothing was changed.".format(
+            timezone.localtime(stats["already_imported"])
+        )
+    message = (
+        "Imported {rows} call logs ({created} new, {updated} updated){source} in "
+        "{seconds:.1f}s, {rows_per_second:.0f} rows/s.".format(
+            source=" from {files} files".format(**stats) if "files" in stats else "", **stats
+        )
+    )
+    if stats.get("files_skipped"):
+        message += " Left out {files_skipped} files imported before.".format(**stats)
+    if stats["resumed"]:
+        message += " Resumed after the {resumed} rows an earlier attempt had imported.".format(**stats)
+    if stats["skipped"]:
+        message += " Skipped {skipped} rows already imported from another file.".format(**stats)
+    return message
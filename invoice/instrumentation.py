@@ -0,0 +1,187 @@
+import cProfile
+import json
+import logging
+import os
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from django.core.files import File
+from django.db import connection
+from django.utils import timezone
+
+from .models import PipelineRun
+from .timing import QueryTimer
+
+logger = logging.getLogger("invoice.pipeline")
+
+_current_run = ContextVar("pipeline_run", default=None)
+
+
+# Duration, query count and, while memory is traced, peak memory of each
+# named stage of one import or export. Stages nest and repeat; a stage run
+# once per row adds up over all rows.
+class PipelineRecorder:
+    def __init__(self):
+        self.stages = {}
+        self.rows = 0
+        # Highest traced memory of the enclosing stages, which a nested
+        # stage would otherwise lose by resetting tracemalloc's peak
+        self.peaks = []
+
+    @contextmanager
+    def stage(self, name):
+        stats = self.stages.setdefault(
+            name, {"calls": 0, "seconds": 0.0, "queries": 0, "db_seconds": 0.0}
+        )
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            memory, peak = tracemalloc.get_traced_memory()
+            if self.peaks:
+                self.peaks[-1] = max(self.peaks[-1], peak)
+            self.peaks.append(0)
+            tracemalloc.reset_peak()
+        timer = QueryTimer()
+        started = perf_counter()
+        try:
+            with connection.execute_wrapper(timer):
+                yield stats
+        finally:
+            stats["calls"] += 1
+            stats["seconds"] += perf_counter() - started
+            stats["queries"] += timer.queries
+            stats["db_seconds"] += timer.seconds
+            if tracing:
+                peak = max(tracemalloc.get_traced_memory()[1], self.peaks.pop())
+                if self.peaks:
+                    self.peaks[-1] = max(self.peaks[-1], peak)
+                stats["peak_memory"] = max(stats.get("peak_memory", 0), peak - memory)
+
+
+def current_run():
+    return _current_run.get()
+
+
+# Times the block as a stage of the run being recorded, if any
+def stage(name):
+    run = current_run()
+    return run.stage(name) if run is not None else nullcontext()
+
+
+def add_rows(rows):
+    run = current_run()
+    if run is not None:
+        run.rows += rows
+
+
+def timed(name):
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+# Records the block as a PipelineRun and logs it as one JSON line. With
+# profile=True the run is also traced for memory and profiled with cProfile,
+# both of which slow it down noticeably.
+@contextmanager
+def recording(kind, name="", user=None, job=None, dry_run=False, profile=False):
+    run = PipelineRecorder()
+    token = _current_run.set(run)
+    profiler = cProfile.Profile() if profile else None
+    started_at = timezone.now()
+    error = ""
+    if profile:
+        tracemalloc.start()
+        profiler.enable()
+    try:
+        with run.stage("total"):
+            yield run
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if profile:
+            profiler.disable()
+            tracemalloc.stop()
+        _current_run.reset(token)
+        total = run.stages.pop("total")
+        record = PipelineRun(
+            Kind=kind,
+            Name=name[:255],
+            Created_By=user if user is not None and user.is_authenticated else None,
+            Job=job,
+            Dry_Run=dry_run,
+            Started_At=started_at,
+            Seconds=total["seconds"],
+            Rows=run.rows,
+            Queries=total["queries"],
+            Peak_Memory=total.get("peak_memory"),
+            Stages=run.stages,
+            Error=error,
+        )
+        if profiler is not None:
+            with TemporaryDirectory() as directory:
+                path = os.path.join(directory, f"{kind}.prof")
+                profiler.dump_stats(path)
+                with open(path, "rb") as f:
+                    record.Profile.save(os.path.basename(path), File(f), save=False)
+        record.save()
+        run.record = record
+        logger.info(json.dumps(record.as_log()))
+
+
+RESOURCE_STAGES = {
+    "before_import": "before_import",
+    "import_row": "rows",
+    "save_instance": "save",
+    "bulk_create": "bulk_write",
+    "bulk_update": "bulk_write",
+    "bulk_delete": "bulk_write",
+    "after_import": "after_import",
+}
+_timed_classes = {}
+
+
+# Subclass of `cls` with the named methods timed as `name`, made once per class
+def timed_class(cls, name, *methods):
+    key = (cls, name)
+    if key not in _timed_classes:
+        _timed_classes[key] = type(
+            cls.__name__,
+            (cls,),
+            {method: timed(name)(getattr(cls, method)) for method in methods},
+        )
+    return _timed_classes[key]
+
+
+# Class decorator timing the stages of an import-export resource. "rows"
+# (import_row) includes "diff" and "save"; "import" covers all of them.
+def instrumented_resource(cls):
+    for method, name in RESOURCE_STAGES.items():
+        setattr(cls, method, timed(name)(getattr(cls, method)))
+
+    import_data = cls.import_data
+
+    def timed_import_data(self, dataset, *args, **kwargs):
+        add_rows(len(dataset))
+        with stage("import"):
+            return import_data(self, dataset, *args, **kwargs)
+
+    # A classmethod, so this is already bound to the resource class
+    get_diff_class = cls.get_diff_class
+
+    def timed_diff_class(cls):
+        return timed_class(get_diff_class(), "diff", "__init__", "compare_with")
+
+    cls.import_data = wraps(import_data)(timed_import_data)
+    cls.get_diff_class = classmethod(wraps(get_diff_class)(timed_diff_class))
+    return cls
@@ -0,0 +1,272 @@
+import os
+import traceback
+from datetime import timedelta
+from tempfile import SpooledTemporaryFile
+from time import monotonic
+
+from django.contrib import admin
+from django.contrib.auth.models import AnonymousUser
+from django.core.files import File
+from django.db import close_old_connections
+from django.db.models import Q, Sum
+from django.http import QueryDict
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+
+from .archive import current_month
+from .exports import EXPORTS, SPOOL_SIZE
+from .importer import (
+    ARCHIVE_FORMAT,
+    UPLOAD_FORMATS,
+    count_rows,
+    format_for,
+    import_call_log_files,
+    import_call_logs,
+    import_message,
+    zip_members,
+)
+from .instrumentation import recording, stage
+from .models import CallLog, DailyTotal, Interpreter, Job
+from .snapshots import snapshots_enabled
+
+HANDLERS = {}
+# A running job whose worker hasn't saved its progress for this long is
+# taken to have lost that worker, e.g. to a crash or a restart, and may be
+# retried
+STALE_JOB_AGE = timedelta(minutes=15)
+
+
+def handler(kind):
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+def enqueue(kind, user=None, params=None, input_file=None):
+    params = params or {}
+    if "query" in params:
+        # The month the changelist's "this month" and "last month" count
+        # from, so a job the worker reaches after midnight on the 1st still
+        # exports the period that was on screen
+        params.setdefault("month", current_month())
+    job = Job(Kind=kind, Created_By=user, Params=params)
+    if input_file is not None:
+        job.Input_File.save(input_file.name, input_file, save=False)
+    job.save()
+    return job
+
+
+# Rows ticked on the current page are stored by pk; "select all" keeps the
+# changelist filters instead so the worker can rebuild the queryset.
+def selection_params(request, queryset):
+    if request.POST.get("select_across") == "1":
+        return {"query": request.GET.urlencode()}
+    return {"pks": list(queryset.values_list("pk", flat=True))}
+
+
+def selection_changelist(job, model):
+    opts = model._meta
+    request = RequestFactory().get(
+        reverse("admin:%s_%s_changelist" % (opts.app_label, opts.model_name)),
+        QueryDict(job.Params["query"]),
+    )
+    request.user = job.Created_By or AnonymousUser()
+    request.current_month = job.Params.get("month")
+    return admin.site._registry[model].get_changelist_instance(request), request
+
+
+def selection_queryset(job, model):
+    if "query" not in job.Params:
+        return model.objects.filter(pk__in=job.Params.get("pks", []))
+    changelist, request = selection_changelist(job, model)
+    return changelist.get_queryset(request)
+
+
+class JobProgress:
+    def __init__(self, job, interval=1.0):
+        self.job = job
+        self.interval = interval
+        self.saved_at = 0
+
+    def __call__(self, rows_done, rows_total=None, force=False):
+        self.job.Rows_Done = rows_done
+        fields = {"Rows_Done": rows_done}
+        if rows_total is not None:
+            self.job.Rows_Total = fields["Rows_Total"] = rows_total
+        if force or rows_total is not None or monotonic() - self.saved_at >= self.interval:
+            beat(self.job, **fields)
+            self.saved_at = monotonic()
+
+
+# Raised in a worker whose job was retried and claimed by another worker
+class JobLost(Exception):
+    pass
+
+
+# Saves `fields` with a new heartbeat, provided the job is still running
+# with the heartbeat this worker last saved
+def beat(job, **fields):
+    heartbeat = timezone.now()
+    saved = Job.objects.filter(pk=job.pk, Status=Job.RUNNING, Heartbeat=job.Heartbeat).update(
+        Heartbeat=heartbeat, **fields
+    )
+    if not saved:
+        raise JobLost(f"{job} was queued again by someone else.")
+    job.Heartbeat = heartbeat
+
+
+# Imports that failed, or whose worker went away mid-import, resume after
+# the last chunk they committed when queued again
+def retryable_jobs(queryset):
+    return queryset.filter(Kind=Job.IMPORT_CALL_LOGS).filter(
+        Q(Status=Job.FAILED) | Q(Status=Job.RUNNING, Heartbeat__lt=timezone.now() - STALE_JOB_AGE)
+    )
+
+
+# Only one worker wins the PENDING -> RUNNING transition
+def claim_job(job):
+    now = timezone.now()
+    claimed = Job.objects.filter(pk=job.pk, Status=Job.PENDING).update(
+        Status=Job.RUNNING, Started_At=now, Heartbeat=now
+    )
+    if claimed:
+        job.Status, job.Started_At, job.Heartbeat = Job.RUNNING, now, now
+    return claimed
+
+
+def claim_next_job():
+    pending = Job.objects.filter(Status=Job.PENDING).order_by("pk")
+    for job in pending.only("pk")[:10]:
+        if claim_job(job):
+            return Job.objects.get(pk=job.pk)
+    return None
+
+
+# A job still pending is claimed first
+def run_job(job):
+    if job.Status == Job.PENDING and not claim_job(job):
+        return job
+    try:
+        with recording(
+            job.Kind,
+            name=os.path.basename(job.Input_File.name) if job.Input_File else str(job),
+            user=job.Created_By,
+            job=job,
+            profile=job.Params.get("profile", False),
+        ) as run:
+            HANDLERS[job.Kind](job, JobProgress(job))
+            run.rows = job.Rows_Done
+    except JobLost:
+        # The worker that claimed it since finishes it
+        close_old_connections()
+        return job
+    except Exception:
+        job.Status = Job.FAILED
+        job.Message = traceback.format_exc()
+    else:
+        job.Status = Job.DONE
+    job.Finished_At = timezone.now()
+    try:
+        beat(
+            job,
+            Status=job.Status,
+            Params=job.Params,
+            Message=job.Message,
+            Result_File=job.Result_File.name,
+            Rows_Done=job.Rows_Done,
+            Rows_Total=job.Rows_Total,
+            Finished_At=job.Finished_At,
+        )
+    except JobLost:
+        pass
+    close_old_connections()
+    return job
+
+
+@handler(Job.IMPORT_CALL_LOGS)
+def run_call_log_import(job, progress):
+    file_format = format_for(job.Input_File.name, UPLOAD_FORMATS)
+
+    def import_progress(stats):
+        progress(stats["rows"] + stats["skipped"] + stats["resumed"])
+
+    # A retried import carries on from the rows its first attempt saved,
+    # even one that started the file over with import_again
+    resume = job.Params.get("attempted", False)
+    if not resume:
+        job.Params["attempted"] = True
+        beat(job, Params=job.Params)
+
+    with job.Input_File.open("rb") as f:
+        progress(0, count_rows(f.file, file_format))
+        f.seek(0)
+        if file_format == ARCHIVE_FORMAT:
+            stats = import_call_log_files(
+                zip_members(f.file),
+                progress=import_progress,
+                user=job.Created_By,
+                import_again=job.Params.get("import_again", False),
+            )
+        else:
+            stats = import_call_logs(
+                f.file,
+                file_format,
+                progress=import_progress,
+                name=os.path.basename(job.Input_File.name),
+                user=job.Created_By,
+                import_again=job.Params.get("import_again", False),
+                resume=resume,
+            )
+    job.Message = import_message(stats)
+
+
+def run_export(job, progress, queryset, export):
+    build, filename = EXPORTS[export]
+    with stage("count"):
+        total = queryset.count()
+    progress(0, total)
+    with SpooledTemporaryFile(max_size=SPOOL_SIZE) as file:
+        with stage("build"):
+            build(queryset, file, progress)
+        file.seek(0)
+        with stage("store"):
+            job.Result_File.save(filename, File(file), save=False)
+    job.Params["filename"] = filename
+    progress(total, force=True)
+    job.Message = f"Exported {total} {queryset.model._meta.verbose_name_plural}."
+
+
+@handler(Job.EXPORT_CALL_LOGS)
+def run_call_log_export(job, progress):
+    if "query" in job.Params and snapshots_enabled():
+        # Whole months are read from the call log snapshots where possible
+        changelist, request = selection_changelist(job, CallLog)
+        snapshot = admin.site._registry[CallLog].snapshot_for(changelist)
+        if snapshot is not None:
+            run_export(job, progress, snapshot, "call_log_snapshot")
+            return
+    run_export(job, progress, selection_queryset(job, CallLog), "call_logs")
+
+
+@handler(Job.EXPORT_UNIVERSAL)
+def run_universal_export(job, progress):
+    queryset = None
+    if "query" in job.Params:
+        # Whole changelists are summed from the daily totals where possible
+        changelist, request = selection_changelist(job, CallLog)
+        queryset = admin.site._registry[CallLog].daily_totals_for(changelist)
+    if queryset is None:
+        queryset = selection_queryset(job, CallLog)
+    run_export(job, progress, queryset, "universal")
+    if queryset.model is DailyTotal:
+        # Each daily total stands for Call_Count call logs
+        calls = queryset.aggregate(calls=Sum("Call_Count"))["calls"] or 0
+        job.Message = f"Exported {calls} {CallLog._meta.verbose_name_plural}."
+
+
+@handler(Job.EXPORT_INTERPRETERS)
+def run_interpreter_export(job, progress):
+    run_export(job, progress, selection_queryset(job, Interpreter), "interpreters")
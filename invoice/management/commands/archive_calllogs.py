@@ -0,0 +1,51 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+
+from invoice.archive import archive_before, current_month, restore_period, shift_period
+
+
+def period(value):
+    if not re.fullmatch(r"\d{4}-\d{2}", value) or not 1 <= int(value[5:]) <= 12:
+        raise CommandError(f"Expected a month as YYYY-MM, got {value!r}")
+    return value
+
+
+class Command(BaseCommand):
+    help = (
+        "Move call logs of older months into the archive table, or move an "
+        "archived month back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-months",
+            type=int,
+            default=2,
+            help="Months to keep in the call log table, the current one included.",
+        )
+        parser.add_argument(
+            "--before", type=period, help="Archive everything before this month (YYYY-MM)."
+        )
+        parser.add_argument(
+            "--restore", type=period, help="Move this archived month (YYYY-MM) back."
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        if options["restore"]:
+            moved = restore_period(options["restore"], progress=self.report_progress)
+            self.stdout.write(
+                self.style.SUCCESS(f"Restored {moved} call logs of {options['restore']}.")
+            )
+            return
+
+        if options["keep_months"] < 1:
+            raise CommandError("--keep-months must be at least 1")
+        before = options["before"] or shift_period(current_month(), 1 - options["keep_months"])
+        moved = archive_before(before, progress=self.report_progress)
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} call logs from before {before}."))
+
+    def report_progress(self, rows):
+        if self.verbosity > 1:
+            self.stdout.write(f"  {rows} rows moved")
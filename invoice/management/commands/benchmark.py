@@ -0,0 +1,137 @@
+import json
+import logging
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from invoice.benchmarks import BENCHMARKS, scratch_database
+
+
+# The figure compared between runs: "after" for before/after comparisons
+def headline(runs):
+    return runs.get("after", runs)
+
+
+class Command(BaseCommand):
+    help = "Run performance benchmarks against a throwaway database seeded with synthetic call logs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "names", nargs="*", help="Benchmarks to run: %s (default: all)." % ", ".join(sorted(BENCHMARKS))
+        )
+        parser.add_argument("--rows", type=int, default=1000000)
+        parser.add_argument("--json", metavar="PATH", help="Also write the results to this JSON file.")
+        parser.add_argument(
+            "--compare", metavar="PATH", help="Compare against the results of an earlier --json run."
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        unknown = set(options["names"]) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError("Unknown benchmark: %s" % ", ".join(sorted(unknown)))
+        previous = {}
+        if options["compare"]:
+            try:
+                with open(options["compare"]) as f:
+                    earlier = json.load(f)
+                previous = earlier["benchmarks"]
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"{options['compare']}: {e}")
+            if earlier.get("rows") != options["rows"]:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"{options['compare']} was run with --rows {earlier.get('rows')}, "
+                        "the timings are not comparable."
+                    )
+                )
+        if self.verbosity < 2:
+            # The benchmarks' imports and exports would log a line each
+            logging.getLogger("invoice.pipeline").setLevel(logging.WARNING)
+
+        reports = {}
+        for name in options["names"] or sorted(BENCHMARKS):
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name} ({options['rows']:,} rows)"))
+            with scratch_database(on_disk=BENCHMARKS[name].on_disk):
+                report = BENCHMARKS[name](options["rows"], progress=self.report_progress)
+            self.write_report(report, previous.get(name, {}).get("results", {}))
+            reports[name] = report
+
+        if options["json"]:
+            with open(options["json"], "w") as f:
+                json.dump(
+                    {
+                        "created": timezone.now().isoformat(),
+                        "rows": options["rows"],
+                        "database": connection.vendor,
+                        "python": platform.python_version(),
+                        "django": django.get_version(),
+                        "benchmarks": reports,
+                    },
+                    f,
+                    indent=2,
+                )
+
+    def report_progress(self, rows):
+        if self.verbosity > 1:
+            self.stdout.write(f"  seeded {rows:,} rows")
+
+    def write_report(self, report, previous):
+        if "index_seconds" in report:
+            self.stdout.write(f"  building indexes: {report['index_seconds']:.2f}s")
+        for name, runs in report["results"].items():
+            if "before" in runs:
+                self.write_comparison(name, runs)
+            else:
+                self.write_run(name, runs)
+            if name in previous:
+                self.write_change(headline(previous[name]), headline(runs))
+
+    def write_comparison(self, name, runs):
+        before, after = runs["before"], runs["after"]
+        speedup = before["seconds"] / after["seconds"] if after["seconds"] else 0
+        self.stdout.write(
+            f"  {name}: {before['seconds'] * 1000:.1f}ms -> "
+            f"{after['seconds'] * 1000:.1f}ms ({speedup:.{0 if speedup >= 10 else 1}f}x)"
+        )
+        if "import_seconds" in before:
+            self.stdout.write(
+                f"    imports: {before['import_seconds'] * 1000:.1f}ms -> "
+                f"{after['import_seconds'] * 1000:.1f}ms"
+            )
+        if "peak_memory" in before:
+            self.stdout.write(
+                f"    peak memory: {before['peak_memory'] / 2**20:.1f}MB -> "
+                f"{after['peak_memory'] / 2**20:.1f}MB"
+            )
+        if "reads" in before:
+            self.stdout.write(
+                f"    reads: {before['reads']} ({before['failed']} failed) -> "
+                f"{after['reads']} ({after['failed']} failed)"
+            )
+        if self.verbosity > 1 and "plan" in before:
+            for label, run in runs.items():
+                self.stdout.write(f"    {label}: {run['plan']}")
+
+    def write_run(self, name, run):
+        line = f"  {name}: {run['seconds'] * 1000:.1f}ms"
+        if "rows" in run:
+            line += f", {run['rows']:,} rows"
+        if "queries" in run:
+            line += f", {run['queries']:,} queries"
+        self.stdout.write(line)
+        if self.verbosity > 1:
+            # Stages nest, so they don't add up to the total
+            for stage, seconds in sorted(run.get("stages", {}).items(), key=lambda item: -item[1]):
+                self.stdout.write(f"    {stage}: {seconds * 1000:.1f}ms")
+
+    def write_change(self, before, after):
+        if not before["seconds"] or not after["seconds"]:
+            return
+        ratio = after["seconds"] / before["seconds"]
+        change = f"{ratio:.2f}x slower" if ratio >= 1 else f"{1 / ratio:.2f}x faster"
+        line = f"    previous run: {before['seconds'] * 1000:.1f}ms ({change})"
+        self.stdout.write(self.style.WARNING(line) if ratio >= 1.2 else line)
@@ -0,0 +1,74 @@
+import random
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from invoice import synthetic
+from invoice.importer import CallLogImportError, format_for
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a CSV or XLSX file of synthetic call logs in the vendor export layout, "
+        "for load testing the imports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to write, .csv or .xlsx.")
+        parser.add_argument("--rows", type=int, default=100000)
+        parser.add_argument("--interpreters", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=0, help="Same seed, same file.")
+        parser.add_argument(
+            "--start",
+            type=datetime.fromisoformat,
+            default=datetime(2023, 1, 1),
+            help="First day of the calls, as YYYY-MM-DD (default: 2023-01-01).",
+        )
+        parser.add_argument("--days", type=int, default=365, help="Days the calls are spread over.")
+        parser.add_argument("--prefix", default="S", help="Call Id prefix; files with different prefixes don't overlap.")
+        parser.add_argument(
+            "--interpreter-list",
+            metavar="PATH",
+            help="Also write the interpreters as a CSV to import on the interpreters page first.",
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        try:
+            file_format = format_for(options["path"])
+        except CallLogImportError as e:
+            raise CommandError(e)
+        rows = options["rows"]
+        if rows < 1 or options["interpreters"] < 1 or options["days"] < 1:
+            raise CommandError("--rows, --interpreters and --days must be at least 1.")
+        if file_format == "xlsx" and rows > synthetic.XLSX_MAX_ROWS:
+            raise CommandError(
+                f"An XLSX sheet holds at most {synthetic.XLSX_MAX_ROWS:,} rows, write a CSV instead."
+            )
+
+        rng = random.Random(options["seed"])
+        people = synthetic.interpreters(options["interpreters"], rng)
+        if options["interpreter_list"]:
+            synthetic.write_interpreter_list(options["interpreter_list"], people)
+        synthetic.write_call_log_file(
+            options["path"],
+            file_format,
+            self.report_progress(
+                synthetic.call_log_rows(
+                    rows,
+                    [person.Name for person in people],
+                    rng,
+                    start=options["start"],
+                    days=options["days"],
+                    prefix=options["prefix"],
+                ),
+                rows,
+            ),
+        )
+        self.stdout.write(self.style.SUCCESS(f"{options['path']}: {rows:,} call logs"))
+
+    def report_progress(self, rows, total):
+        for number, row in enumerate(rows, 1):
+            yield row
+            if self.verbosity > 1 and (number % 100000 == 0 or number == total):
+                self.stdout.write(f"  {number:,} rows")
@@ -0,0 +1,92 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from invoice.importer import (
+    ARCHIVE_FORMAT,
+    CHUNK_SIZE,
+    IMPORT_PROCESSES,
+    UPLOAD_FORMATS,
+    CallLogImportError,
+    format_for,
+    import_call_log_files,
+    import_call_logs,
+    import_message,
+    zip_members,
+)
+
+
+class Command(BaseCommand):
+    help = "Stream CSV or XLSX call log exports into the database in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument(
+            "--import-again",
+            action="store_true",
+            help="Import files and chunks even if they were imported before.",
+        )
+        parser.add_argument(
+            "--together",
+            action="store_true",
+            help="Parse the files (and the files of zips) in parallel and save them in one "
+            "transaction, instead of streaming them one after the other. Zips are always "
+            "imported this way.",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=IMPORT_PROCESSES,
+            help="Files parsed at the same time by --together imports (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        try:
+            formats = {path: format_for(path, UPLOAD_FORMATS) for path in options["paths"]}
+        except CallLogImportError as e:
+            raise CommandError(str(e))
+        if options["together"]:
+            self.import_together(options["paths"], options)
+            return
+        for path, file_format in formats.items():
+            if file_format == ARCHIVE_FORMAT:
+                self.import_together([path], options)
+                continue
+            try:
+                with open(path, "rb") as f:
+                    stats = import_call_logs(
+                        f,
+                        file_format,
+                        chunk_size=options["chunk_size"],
+                        progress=self.report_progress,
+                        name=os.path.basename(path),
+                        import_again=options["import_again"],
+                    )
+            except CallLogImportError as e:
+                raise CommandError(f"{path}: {e}")
+            self.stdout.write(self.style.SUCCESS(f"{path}: {import_message(stats)}"))
+
+    def import_together(self, paths, options):
+        files = []
+        try:
+            for path in paths:
+                with open(path, "rb") as f:
+                    if format_for(path, UPLOAD_FORMATS) == ARCHIVE_FORMAT:
+                        files.extend(zip_members(f))
+                    else:
+                        files.append((os.path.basename(path), format_for(path), f.read()))
+            stats = import_call_log_files(
+                files,
+                progress=self.report_progress,
+                import_again=options["import_again"],
+                processes=options["processes"],
+            )
+        except CallLogImportError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"{', '.join(paths)}: {import_message(stats)}"))
+
+    def report_progress(self, stats):
+        if self.verbosity > 1:
+            self.stdout.write("  {rows} rows in {chunks} chunks".format(**stats))
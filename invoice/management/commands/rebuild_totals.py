@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from invoice.totals import rebuild_totals
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-period interpreter totals and the daily totals from the stored call logs."
+
+    def handle(self, *args, **options):
+        stats = rebuild_totals()
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Rebuilt totals for {interpreters} interpreters across {periods} periods "
+                "({days} days) in {seconds:.2f}s.".format(**stats)
+            )
+        )
@@ -0,0 +1,30 @@
+from time import sleep
+
+from django.core.management.base import BaseCommand
+
+from invoice.jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued import and export jobs, polling the job table for new work."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once the queue is empty."
+        )
+        parser.add_argument(
+            "--interval", type=float, default=2.0, help="Seconds between polls."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options["once"]:
+                    return
+                sleep(options["interval"])
+                continue
+            self.stdout.write(f"Running {job}")
+            job = run_job(job)
+            style = self.style.SUCCESS if job.Status == job.DONE else self.style.ERROR
+            self.stdout.write(style(f"{job}: {job.get_Status_display()}"))
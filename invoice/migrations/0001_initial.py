@@ -0,0 +1,135 @@
+# Generated by Django 4.1.5 on 2026-10-18 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="CallLog",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "CallId",
+                    models.CharField(blank=True, max_length=25, verbose_name="Call Id"),
+                ),
+                (
+                    "Call_Time",
+                    models.DateTimeField(null=True, verbose_name="Call Time"),
+                ),
+                (
+                    "Interpreter_Calltime",
+                    models.IntegerField(null=True, verbose_name="Interpreter Calltime"),
+                ),
+                (
+                    "Language",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="Language"
+                    ),
+                ),
+                (
+                    "Interpreter_Pay",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=6,
+                        null=True,
+                        verbose_name="Interpreter Pay",
+                    ),
+                ),
+                (
+                    "Interpreter_Name",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="Interpreter Name"
+                    ),
+                ),
+                (
+                    "Customer_Name",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="Customer Name"
+                    ),
+                ),
+                (
+                    "Service_Center",
+                    models.CharField(
+                        blank=True, max_length=50, verbose_name="Service Center"
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Interpreter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("Name", models.CharField(max_length=255, verbose_name="Name")),
+                (
+                    "Payment_Method",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("BCheck", "BCheck"),
+                            ("BTransfer", "BTransfer"),
+                            ("Check", "Check"),
+                            ("Gusto", "Gusto"),
+                            (
+                                "Michael Kings OPI Services",
+                                "Michael Kings OPI Services",
+                            ),
+                            ("QBD", "QBD"),
+                            ("Universal Call Center", "Universal Call Center"),
+                            ("Trolly", "Trolly"),
+                            ("VIP Call Center", "VIP Call Center"),
+                        ],
+                        max_length=50,
+                        verbose_name="Payment Method",
+                    ),
+                ),
+                (
+                    "Service_Center",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            (
+                                "Michael Kings OPI Services",
+                                "Michael Kings OPI Services",
+                            ),
+                            ("Universal Call Center", "Universal Call Center"),
+                            ("VIP Call Center", "VIP Call Center"),
+                            ("WWI Foreign", "WWI Foreign"),
+                            ("WWI Spanish", "WWI Spanish"),
+                        ],
+                        max_length=50,
+                        verbose_name="Service Center",
+                    ),
+                ),
+                (
+                    "Total_Amount",
+                    models.FloatField(null=True, verbose_name="Total Amount"),
+                ),
+                (
+                    "Total_Minutes",
+                    models.IntegerField(null=True, verbose_name="Total Minutes"),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 4.1.5 on 2026-10-18 17:18
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+def populate_totals(apps, schema_editor):
+    CallLog = apps.get_model("invoice", "CallLog")
+    InterpreterTotal = apps.get_model("invoice", "InterpreterTotal")
+    rows = (
+        CallLog.objects.annotate(Month=TruncMonth("Call_Time"))
+        .values("Interpreter_Name", "Month")
+        .annotate(
+            Calls=Count("pk"),
+            Pay=Sum("Interpreter_Pay"),
+            Minutes=Sum("Interpreter_Calltime"),
+        )
+    )
+    InterpreterTotal.objects.bulk_create(
+        [
+            InterpreterTotal(
+                Interpreter_Name=row["Interpreter_Name"],
+                Period=timezone.localtime(row["Month"]).strftime("%Y-%m")
+                if row["Month"]
+                else "",
+                Call_Count=row["Calls"],
+                Total_Amount=row["Pay"] or 0,
+                Total_Minutes=row["Minutes"] or 0,
+            )
+            for row in rows
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("invoice", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InterpreterTotal",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "Interpreter_Name",
+                    models.CharField(max_length=255, verbose_name="Interpreter Name"),
+                ),
+                (
+                    "Period",
+                    models.CharField(blank=True, max_length=7, verbose_name="Period"),
+                ),
+                (
+                    "Call_Count",
+                    models.IntegerField(default=0, verbose_name="Call Count"),
+                ),
+                (
+                    "Total_Amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=12,
+                        verbose_name="Total Amount",
+                    ),
+                ),
+                (
+                    "Total_Minutes",
+                    models.IntegerField(default=0, verbose_name="Total Minutes"),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="interpretertotal",
+            constraint=models.UniqueConstraint(
+                fields=("Interpreter_Name", "Period"),
+                name="unique_interpreter_period_total",
+            ),
+        ),
+        migrations.RunPython(populate_totals, migrations.RunPython.noop),
+    ]
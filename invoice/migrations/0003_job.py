@@ -0,0 +1,107 @@
+# Generated by Django 4.1.5 on 2026-10-18 17:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("invoice", "0002_interpretertotal"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Job",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "Kind",
+                    models.CharField(
+                        choices=[
+                            ("import_call_logs", "Call log import"),
+                            ("export_call_logs", "Call log export"),
+                            ("export_universal", "Universal's Format export"),
+                            ("export_interpreters", "Interpreter export"),
+                        ],
+                        max_length=50,
+                        verbose_name="Kind",
+                    ),
+                ),
+                (
+                    "Status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "Params",
+                    models.JSONField(
+                        blank=True, default=dict, verbose_name="Parameters"
+                    ),
+                ),
+                (
+                    "Input_File",
+                    models.FileField(
+                        blank=True, upload_to="jobs/input/", verbose_name="Input File"
+                    ),
+                ),
+                (
+                    "Result_File",
+                    models.FileField(
+                        blank=True,
+                        upload_to="jobs/results/",
+                        verbose_name="Result File",
+                    ),
+                ),
+                ("Rows_Done", models.IntegerField(default=0, verbose_name="Rows Done")),
+                (
+                    "Rows_Total",
+                    models.IntegerField(null=True, verbose_name="Rows Total"),
+                ),
+                ("Message", models.TextField(blank=True, verbose_name="Message")),
+                (
+                    "Created_At",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created At"),
+                ),
+                (
+                    "Started_At",
+                    models.DateTimeField(null=True, verbose_name="Started At"),
+                ),
+                (
+                    "Finished_At",
+                    models.DateTimeField(null=True, verbose_name="Finished At"),
+                ),
+                (
+                    "Created_By",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Created By",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-pk"],
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.1.5 on 2026-10-18 17:29
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_call_ids(apps, schema_editor):
+    CallLog = apps.get_model("invoice", "CallLog")
+    duplicates = list(
+        CallLog.objects.exclude(CallId="")
+        .values("CallId")
+        .annotate(Rows=Count("pk"))
+        .filter(Rows__gt=1)
+        .values_list("CallId", flat=True)[:20]
+    )
+    if duplicates:
+        # Which copy is right is a billing decision, so leave it to a person
+        raise RuntimeError(
+            "Call logs with repeated Call Ids must be merged or deleted before "
+            "Call Id can be made unique, e.g. %s" % ", ".join(duplicates)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("invoice", "0003_job"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="calllog",
+            name="CallId",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=25, verbose_name="Call Id"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="interpreter",
+            name="Name",
+            field=models.CharField(db_index=True, max_length=255, verbose_name="Name"),
+        ),
+        migrations.AddIndex(
+            model_name="calllog",
+            index=models.Index(fields=["Call_Time"], name="calllog_time_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="calllog",
+            index=models.Index(
+                fields=["Service_Center", "Call_Time"], name="calllog_center_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="calllog",
+            index=models.Index(
+                fields=["Interpreter_Name", "Call_Time"],
+                name="calllog_interpreter_time_idx",
+            ),
+        ),
+        migrations.RunPython(check_duplicate_call_ids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="calllog",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("CallId", ""), _negated=True),
+                fields=("CallId",),
+                name="unique_call_id",
+            ),
+        ),
+    ]
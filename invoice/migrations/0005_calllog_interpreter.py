@@ -0,0 +1,42 @@
+# Generated by Django 4.1.5 on 2026-10-18 17:33
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def link_interpreters(apps, schema_editor):
+    CallLog = apps.get_model("invoice", "CallLog")
+    Interpreter = apps.get_model("invoice", "Interpreter")
+    CallLog.objects.filter(
+        Interpreter_Name__in=Interpreter.objects.values("Name")
+    ).update(
+        Interpreter=Subquery(
+            Interpreter.objects.filter(Name=OuterRef("Interpreter_Name"))
+            .order_by("pk")
+            .values("pk")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("invoice", "0004_calllog_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="calllog",
+            name="Interpreter",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="call_logs",
+                to="invoice.interpreter",
+                verbose_name="Interpreter",
+            ),
+        ),
+        migrations.RunPython(link_interpreters, migrations.RunPython.noop),
+    ]
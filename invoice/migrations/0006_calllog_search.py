@@ -0,0 +1,96 @@
+# Generated by Django 4.1.5 on 2026-10-18 18:08
+
+from django.db import DatabaseError, migrations, models, transaction
+
+SQLITE_SETUP = [
+    # External content table: only the trigram index is stored, the text
+    # stays in invoice_calllog
+    """
+    CREATE VIRTUAL TABLE invoice_calllog_search USING fts5(
+        Interpreter_Name, Customer_Name,
+        content='invoice_calllog', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER invoice_calllog_search_insert AFTER INSERT ON invoice_calllog BEGIN
+        INSERT INTO invoice_calllog_search (rowid, Interpreter_Name, Customer_Name)
+        VALUES (new.id, new.Interpreter_Name, new.Customer_Name);
+    END
+    """,
+    """
+    CREATE TRIGGER invoice_calllog_search_delete AFTER DELETE ON invoice_calllog BEGIN
+        INSERT INTO invoice_calllog_search (invoice_calllog_search, rowid, Interpreter_Name, Customer_Name)
+        VALUES ('delete', old.id, old.Interpreter_Name, old.Customer_Name);
+    END
+    """,
+    """
+    CREATE TRIGGER invoice_calllog_search_update
+    AFTER UPDATE OF Interpreter_Name, Customer_Name ON invoice_calllog BEGIN
+        INSERT INTO invoice_calllog_search (invoice_calllog_search, rowid, Interpreter_Name, Customer_Name)
+        VALUES ('delete', old.id, old.Interpreter_Name, old.Customer_Name);
+        INSERT INTO invoice_calllog_search (rowid, Interpreter_Name, Customer_Name)
+        VALUES (new.id, new.Interpreter_Name, new.Customer_Name);
+    END
+    """,
+    "INSERT INTO invoice_calllog_search (invoice_calllog_search) VALUES ('rebuild')",
+]
+SQLITE_TEARDOWN = [
+    "DROP TRIGGER IF EXISTS invoice_calllog_search_insert",
+    "DROP TRIGGER IF EXISTS invoice_calllog_search_delete",
+    "DROP TRIGGER IF EXISTS invoice_calllog_search_update",
+    "DROP TABLE IF EXISTS invoice_calllog_search",
+]
+# Django's icontains compares UPPER(column), so the indexes are on that
+POSTGRES_SETUP = [
+    'CREATE INDEX invoice_calllog_interpreter_trgm ON invoice_calllog USING gin (UPPER("Interpreter_Name") gin_trgm_ops)',
+    'CREATE INDEX invoice_calllog_customer_trgm ON invoice_calllog USING gin (UPPER("Customer_Name") gin_trgm_ops)',
+]
+POSTGRES_TEARDOWN = [
+    "DROP INDEX IF EXISTS invoice_calllog_interpreter_trgm",
+    "DROP INDEX IF EXISTS invoice_calllog_customer_trgm",
+]
+
+
+# Substring search indexes are optional: without FTS5 (SQLite) or the
+# pg_trgm extension (PostgreSQL) search falls back to plain LIKE scans.
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            if vendor == "sqlite":
+                for sql in SQLITE_SETUP:
+                    schema_editor.execute(sql)
+            elif vendor == "postgresql":
+                schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                for sql in POSTGRES_SETUP:
+                    schema_editor.execute(sql)
+    except DatabaseError:
+        pass
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for sql in SQLITE_TEARDOWN:
+            schema_editor.execute(sql)
+    elif vendor == "postgresql":
+        for sql in POSTGRES_TEARDOWN:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("invoice", "0005_calllog_interpreter"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="calllog",
+            name="Customer_Name",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=255, verbose_name="Customer Name"
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
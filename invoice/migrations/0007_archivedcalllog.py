@@ -0,0 +1,103 @@
+# Generated by Django 4.1.5 on 2026-10-18 18:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("invoice", "0006_calllog_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedCallLog",
+            fields=[
+                (
+                    "CallId",
+                    models.CharField(
+                        blank=True, db_index=True, max_length=25, verbose_name="Call Id"
+                    ),
+                ),
+                (
+                    "Call_Time",
+                    models.DateTimeField(null=True, verbose_name="Call Time"),
+                ),
+                (
+                    "Interpreter_Calltime",
+                    models.IntegerField(null=True, verbose_name="Interpreter Calltime"),
+                ),
+                (
+                    "Language",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="Language"
+                    ),
+                ),
+                (
+                    "Interpreter_Pay",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=6,
+                        null=True,
+                        verbose_name="Interpreter Pay",
+                    ),
+                ),
+                (
+                    "Interpreter_Name",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="Interpreter Name"
+                    ),
+                ),
+                (
+                    "Customer_Name",
+                    models.CharField(
+                        blank=True,
+                        db_index=True,
+                        max_length=255,
+                        verbose_name="Customer Name",
+                    ),
+                ),
+                (
+                    "Service_Center",
+                    models.CharField(
+                        blank=True, max_length=50, verbose_name="Service Center"
+                    ),
+                ),
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "Interpreter",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="archived_call_logs",
+                        to="invoice.interpreter",
+                        verbose_name="Interpreter",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "archived call log",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="archivedcalllog",
+            index=models.Index(fields=["Call_Time"], name="archivedcalllog_time_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="archivedcalllog",
+            index=models.Index(
+                fields=["Interpreter_Name", "Call_Time"],
+                name="archivedcalllog_interp_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="archivedcalllog",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("CallId", ""), _negated=True),
+                fields=("CallId",),
+                name="unique_archived_call_id",
+            ),
+        ),
+    ]
@@ -0,0 +1,135 @@
+# Generated by Django 4.1.5 on 2026-10-18 18:21
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast, TruncDate
+from django.utils import timezone
+
+
+def fill_daily_totals(apps, schema_editor):
+    DailyTotal = apps.get_model("invoice", "DailyTotal")
+    sums = defaultdict(lambda: [0, Decimal(0), 0, 0.0])
+    for name in ("CallLog", "ArchivedCallLog"):
+        rows = (
+            apps.get_model("invoice", name)
+            .objects.annotate(Day=TruncDate("Call_Time", tzinfo=timezone.get_default_timezone()))
+            .values("Interpreter_Name", "Service_Center", "Language", "Day")
+            .annotate(
+                Calls=Count("pk"),
+                Pay=Sum("Interpreter_Pay"),
+                Minutes=Sum("Interpreter_Calltime"),
+                Per_Minute=Sum(
+                    Case(
+                        When(Interpreter_Calltime=0, then=Value(0.0)),
+                        default=Cast("Interpreter_Pay", FloatField()) / F("Interpreter_Calltime"),
+                        output_field=FloatField(),
+                    )
+                ),
+            )
+            .order_by()
+        )
+        for row in rows:
+            total = sums[(row["Interpreter_Name"], row["Service_Center"], row["Language"], row["Day"])]
+            total[0] += row["Calls"]
+            total[1] += Decimal(row["Pay"] or 0)
+            total[2] += row["Minutes"] or 0
+            total[3] += row["Per_Minute"] or 0
+    DailyTotal.objects.bulk_create(
+        [
+            DailyTotal(
+                Interpreter_Name=name,
+                Service_Center=center,
+                Language=language,
+                Day=day,
+                Call_Count=calls,
+                Total_Amount=pay,
+                Total_Minutes=minutes,
+                Pay_Per_Minute=per_minute,
+            )
+            for (name, center, language, day), (calls, pay, minutes, per_minute) in sums.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("invoice", "0007_archivedcalllog"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyTotal",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "Interpreter_Name",
+                    models.CharField(max_length=255, verbose_name="Interpreter Name"),
+                ),
+                (
+                    "Service_Center",
+                    models.CharField(
+                        blank=True, max_length=50, verbose_name="Service Center"
+                    ),
+                ),
+                (
+                    "Language",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="Language"
+                    ),
+                ),
+                ("Day", models.DateField(null=True, verbose_name="Day")),
+                (
+                    "Call_Count",
+                    models.IntegerField(default=0, verbose_name="Call Count"),
+                ),
+                (
+                    "Total_Amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=12,
+                        verbose_name="Total Amount",
+                    ),
+                ),
+                (
+                    "Total_Minutes",
+                    models.IntegerField(default=0, verbose_name="Total Minutes"),
+                ),
+                (
+                    "Pay_Per_Minute",
+                    models.FloatField(default=0, verbose_name="Pay Per Minute"),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="dailytotal",
+            index=models.Index(fields=["Day"], name="dailytotal_day_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="dailytotal",
+            index=models.Index(
+                fields=["Service_Center", "Day"], name="dailytotal_center_day_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailytotal",
+            constraint=models.UniqueConstraint(
+                fields=("Interpreter_Name", "Service_Center", "Language", "Day"),
+                name="unique_daily_total",
+            ),
+        ),
+        migrations.RunPython(fill_daily_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 4.1.5 on 2026-10-18 18:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("invoice", "0008_dailytotal"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PipelineRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "Kind",
+                    models.CharField(
+                        choices=[
+                            ("call_log_import", "Call log import"),
+                            ("interpreter_import", "Interpreter import"),
+                            ("import_call_logs", "Call log import"),
+                            ("export_call_logs", "Call log export"),
+                            ("export_universal", "Universal's Format export"),
+                            ("export_interpreters", "Interpreter export"),
+                        ],
+                        max_length=50,
+                        verbose_name="Kind",
+                    ),
+                ),
+                (
+                    "Name",
+                    models.CharField(blank=True, max_length=255, verbose_name="Name"),
+                ),
+                ("Dry_Run", models.BooleanField(default=False, verbose_name="Preview")),
+                ("Started_At", models.DateTimeField(verbose_name="Started At")),
+                ("Seconds", models.FloatField(verbose_name="Seconds")),
+                ("Rows", models.IntegerField(default=0, verbose_name="Rows")),
+                ("Queries", models.IntegerField(default=0, verbose_name="Queries")),
+                (
+                    "Peak_Memory",
+                    models.BigIntegerField(null=True, verbose_name="Peak Memory"),
+                ),
+                ("Stages", models.JSONField(default=dict, verbose_name="Stages")),
+                ("Error", models.TextField(blank=True, verbose_name="Error")),
+                (
+                    "Profile",
+                    models.FileField(
+                        blank=True, upload_to="profiles/", verbose_name="Profile"
+                    ),
+                ),
+                (
+                    "Created_By",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Created By",
+                    ),
+                ),
+                (
+                    "Job",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="invoice.job",
+                        verbose_name="Job",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "import history entry",
+                "verbose_name_plural": "import history",
+                "ordering": ["-Started_At"],
+            },
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 4.1.5 on 2026-10-18 18:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("invoice", "0009_pipelinerun"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportedFile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "Sha256",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="SHA-256"
+                    ),
+                ),
+                (
+                    "Name",
+                    models.CharField(blank=True, max_length=255, verbose_name="Name"),
+                ),
+                ("Rows_Done", models.IntegerField(default=0, verbose_name="Rows Done")),
+                (
+                    "Created_At",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created At"),
+                ),
+                (
+                    "Completed_At",
+                    models.DateTimeField(null=True, verbose_name="Completed At"),
+                ),
+                (
+                    "Created_By",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Created By",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ImportedChunk",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "Sha256",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="SHA-256"
+                    ),
+                ),
+                ("Rows", models.IntegerField(verbose_name="Rows")),
+                (
+                    "File",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chunks",
+                        to="invoice.importedfile",
+                        verbose_name="File",
+                    ),
+                ),
+            ],
+        ),
+    ]
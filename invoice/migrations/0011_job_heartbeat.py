@@ -0,0 +1,18 @@
+# Generated by Django 4.1.5 on 2026-10-18 20:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("invoice", "0010_importedfile"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="Heartbeat",
+            field=models.DateTimeField(null=True, verbose_name="Heartbeat"),
+        ),
+    ]
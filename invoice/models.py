@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 class Interpreter(models.Model):
@@ -21,7 +23,7 @@ class Interpreter(models.Model):
         ("WWI Spanish", "WWI Spanish"),
     ]
 
-    Name = models.CharField("Name", max_length=255)
+    Name = models.CharField("Name", max_length=255, db_index=True)
     Payment_Method = models.CharField(
         "Payment Method", max_length=50, blank=True, choices=PAYMENT_CHOICES
     )
@@ -35,8 +37,9 @@ class Interpreter(models.Model):
         return self.Name
 
 
-class CallLog(models.Model):
-    CallId = models.CharField("Call Id", max_length=25, blank=True)
+# Fields shared by the working call log table and its archive
+class BaseCallLog(models.Model):
+    CallId = models.CharField("Call Id", max_length=25, blank=True, db_index=True)
     Call_Time = models.DateTimeField("Call Time", null=True)
     Interpreter_Calltime = models.IntegerField("Interpreter Calltime", null=True)
     Language = models.CharField("Language", max_length=100, blank=True)
@@ -44,10 +47,279 @@ class CallLog(models.Model):
         "Interpreter Pay", max_digits=6, decimal_places=2, null=True
     )
     Interpreter_Name = models.CharField("Interpreter Name", max_length=255, blank=True)
-    Customer_Name = models.CharField("Customer Name", max_length=255, blank=True)
+    Customer_Name = models.CharField(
+        "Customer Name", max_length=255, blank=True, db_index=True
+    )
     Service_Center = models.CharField(
         "Service Center", max_length=50, blank=True,
     )
 
+    class Meta:
+        abstract = True
+
     def __str__(self):
         return self.Interpreter_Name
+
+
+class CallLog(BaseCallLog):
+    # Resolved from Interpreter_Name on import; empty until the name is known
+    Interpreter = models.ForeignKey(
+        Interpreter,
+        verbose_name="Interpreter",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="call_logs",
+    )
+
+    class Meta:
+        constraints = [
+            # Blank Call Ids come from hand-entered rows and may repeat. The
+            # partial index can't serve CallId IN (...) lookups, hence db_index.
+            models.UniqueConstraint(
+                fields=["CallId"],
+                condition=~models.Q(CallId=""),
+                name="unique_call_id",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["Call_Time"], name="calllog_time_idx"),
+            models.Index(
+                fields=["Service_Center", "Call_Time"], name="calllog_center_time_idx"
+            ),
+            models.Index(
+                fields=["Interpreter_Name", "Call_Time"],
+                name="calllog_interpreter_time_idx",
+            ),
+        ]
+
+
+# Call logs of closed months, moved out of CallLog by archive_calllogs so the
+# admin, exports and imports only work on recent rows. Rows keep their pk.
+class ArchivedCallLog(BaseCallLog):
+    id = models.BigIntegerField(primary_key=True)
+    Interpreter = models.ForeignKey(
+        Interpreter,
+        verbose_name="Interpreter",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="archived_call_logs",
+    )
+
+    class Meta:
+        verbose_name = "archived call log"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["CallId"],
+                condition=~models.Q(CallId=""),
+                name="unique_archived_call_id",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["Call_Time"], name="archivedcalllog_time_idx"),
+            models.Index(
+                fields=["Interpreter_Name", "Call_Time"],
+                name="archivedcalllog_interp_idx",
+            ),
+        ]
+
+
+class InterpreterTotal(models.Model):
+    Interpreter_Name = models.CharField("Interpreter Name", max_length=255)
+    Period = models.CharField("Period", max_length=7, blank=True)
+    Call_Count = models.IntegerField("Call Count", default=0)
+    Total_Amount = models.DecimalField(
+        "Total Amount", max_digits=12, decimal_places=2, default=0
+    )
+    Total_Minutes = models.IntegerField("Total Minutes", default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["Interpreter_Name", "Period"],
+                name="unique_interpreter_period_total",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.Interpreter_Name} ({self.Period})"
+
+
+# Call log sums per interpreter, service center, language and day, kept up
+# to date with every write like InterpreterTotal, for the payroll reports.
+# Covers archived call logs as well.
+class DailyTotal(models.Model):
+    Interpreter_Name = models.CharField("Interpreter Name", max_length=255)
+    Service_Center = models.CharField("Service Center", max_length=50, blank=True)
+    Language = models.CharField("Language", max_length=100, blank=True)
+    Day = models.DateField("Day", null=True)
+    Call_Count = models.IntegerField("Call Count", default=0)
+    Total_Amount = models.DecimalField(
+        "Total Amount", max_digits=12, decimal_places=2, default=0
+    )
+    Total_Minutes = models.IntegerField("Total Minutes", default=0)
+    # Sum of pay / minutes over the calls, the "minutes" of Universal's Format
+    Pay_Per_Minute = models.FloatField("Pay Per Minute", default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["Interpreter_Name", "Service_Center", "Language", "Day"],
+                name="unique_daily_total",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["Day"], name="dailytotal_day_idx"),
+            models.Index(fields=["Service_Center", "Day"], name="dailytotal_center_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.Interpreter_Name} ({self.Day})"
+
+
+class Job(models.Model):
+    IMPORT_CALL_LOGS = "import_call_logs"
+    EXPORT_CALL_LOGS = "export_call_logs"
+    EXPORT_UNIVERSAL = "export_universal"
+    EXPORT_INTERPRETERS = "export_interpreters"
+    KIND_CHOICES = [
+        (IMPORT_CALL_LOGS, "Call log import"),
+        (EXPORT_CALL_LOGS, "Call log export"),
+        (EXPORT_UNIVERSAL, "Universal's Format export"),
+        (EXPORT_INTERPRETERS, "Interpreter export"),
+    ]
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    Kind = models.CharField("Kind", max_length=50, choices=KIND_CHOICES)
+    Status = models.CharField(
+        "Status", max_length=20, choices=STATUS_CHOICES, default=PENDING
+    )
+    Params = models.JSONField("Parameters", default=dict, blank=True)
+    Input_File = models.FileField("Input File", upload_to="jobs/input/", blank=True)
+    Result_File = models.FileField("Result File", upload_to="jobs/results/", blank=True)
+    Rows_Done = models.IntegerField("Rows Done", default=0)
+    Rows_Total = models.IntegerField("Rows Total", null=True)
+    Message = models.TextField("Message", blank=True)
+    Created_By = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name="Created By",
+        null=True,
+        on_delete=models.SET_NULL,
+    )
+    Created_At = models.DateTimeField("Created At", auto_now_add=True)
+    Started_At = models.DateTimeField("Started At", null=True)
+    # Last sign of life from the worker running the job, renewed with its
+    # progress; also tells that worker whether the job is still its own
+    Heartbeat = models.DateTimeField("Heartbeat", null=True)
+    Finished_At = models.DateTimeField("Finished At", null=True)
+
+    class Meta:
+        ordering = ["-pk"]
+
+    def __str__(self):
+        return f"{self.get_Kind_display()} #{self.pk}"
+
+    @property
+    def is_active(self):
+        return self.Status in (self.PENDING, self.RUNNING)
+
+    @property
+    def rows_per_second(self):
+        if not self.Started_At:
+            return None
+        seconds = ((self.Finished_At or timezone.now()) - self.Started_At).total_seconds()
+        return self.Rows_Done / seconds if seconds > 0 else None
+
+
+# One import or export as recorded by invoice.instrumentation
+class PipelineRun(models.Model):
+    CALL_LOG_IMPORT = "call_log_import"
+    INTERPRETER_IMPORT = "interpreter_import"
+    KIND_CHOICES = [
+        (CALL_LOG_IMPORT, "Call log import"),
+        (INTERPRETER_IMPORT, "Interpreter import"),
+    ] + Job.KIND_CHOICES
+
+    Kind = models.CharField("Kind", max_length=50, choices=KIND_CHOICES)
+    Name = models.CharField("Name", max_length=255, blank=True)
+    Created_By = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name="Created By",
+        null=True,
+        on_delete=models.SET_NULL,
+    )
+    Job = models.ForeignKey(
+        Job, verbose_name="Job", null=True, blank=True, on_delete=models.SET_NULL
+    )
+    Dry_Run = models.BooleanField("Preview", default=False)
+    Started_At = models.DateTimeField("Started At")
+    Seconds = models.FloatField("Seconds")
+    Rows = models.IntegerField("Rows", default=0)
+    Queries = models.IntegerField("Queries", default=0)
+    Peak_Memory = models.BigIntegerField("Peak Memory", null=True)
+    # {stage: {"calls", "seconds", "queries", "db_seconds"[, "peak_memory"]}}
+    Stages = models.JSONField("Stages", default=dict)
+    Error = models.TextField("Error", blank=True)
+    Profile = models.FileField("Profile", upload_to="profiles/", blank=True)
+
+    class Meta:
+        ordering = ["-Started_At"]
+        verbose_name = "import history entry"
+        verbose_name_plural = "import history"
+
+    def __str__(self):
+        return f"{self.get_Kind_display()} {self.Name}".strip()
+
+    def as_log(self):
+        return {
+            "event": "pipeline_run",
+            "kind": self.Kind,
+            "name": self.Name,
+            "dry_run": self.Dry_Run,
+            "seconds": round(self.Seconds, 3),
+            "rows": self.Rows,
+            "queries": self.Queries,
+            "peak_memory": self.Peak_Memory,
+            "stages": self.Stages,
+            "error": self.Error,
+        }
+
+
+# A call log file by content hash, so the same file isn't imported twice.
+# Rows_Done counts the rows committed so far, which a failed import resumes
+# after; Completed_At is set once the whole file is in.
+class ImportedFile(models.Model):
+    Sha256 = models.CharField("SHA-256", max_length=64, unique=True)
+    Name = models.CharField("Name", max_length=255, blank=True)
+    Rows_Done = models.IntegerField("Rows Done", default=0)
+    Created_By = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name="Created By",
+        null=True,
+        on_delete=models.SET_NULL,
+    )
+    Created_At = models.DateTimeField("Created At", auto_now_add=True)
+    Completed_At = models.DateTimeField("Completed At", null=True)
+
+    def __str__(self):
+        return self.Name or self.Sha256
+
+
+# A chunk of imported rows by content hash, so files overlapping an earlier
+# one only import the chunks that earlier file didn't have
+class ImportedChunk(models.Model):
+    Sha256 = models.CharField("SHA-256", max_length=64, unique=True)
+    File = models.ForeignKey(
+        ImportedFile, verbose_name="File", related_name="chunks", on_delete=models.CASCADE
+    )
+    Rows = models.IntegerField("Rows")
@@ -0,0 +1,56 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .caching import cached_for_queryset
+
+# Unfiltered lists of at least this many rows (going by the table
+# statistics) show the estimate instead of counting the whole table
+ESTIMATE_THRESHOLD = 100000
+
+
+# Row count from the statistics ANALYZE keeps, or None if there are none yet
+def estimated_row_count(queryset):
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [table])
+        elif connection.vendor == "sqlite":
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # The first number of every row for a table is its row count
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    count = int(float(str(row[0]).split()[0]))
+    # PostgreSQL reports -1 for tables that were never analyzed
+    return count if count >= 0 else None
+
+
+# Imports run this so the estimates follow the table's growth;
+# PostgreSQL's autovacuum would get there too, SQLite never does on its own.
+def analyze_table(model):
+    connection = connections[model.objects.db]
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE %s" % connection.ops.quote_name(model._meta.db_table))
+
+
+# Counts are cached per filter and search until call logs change. An
+# unfiltered list of a large table uses the table statistics instead.
+class CachedCountPaginator(Paginator):
+    estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list.order_by()
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                self.estimated = True
+                return estimate
+        return cached_for_queryset("count", queryset, lambda queryset: queryset.count())
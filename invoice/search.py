@@ -0,0 +1,56 @@
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Created by migration 0006 on SQLite builds with FTS5; kept in sync with
+# invoice_calllog by triggers.
+SQLITE_SEARCH_TABLE = "invoice_calllog_search"
+SQLITE_SEARCH_TRIGGERS = {
+    "invoice_calllog_search_insert",
+    "invoice_calllog_search_delete",
+    "invoice_calllog_search_update",
+}
+# The trigram tokenizer can't match anything shorter
+MIN_TRIGRAM_LENGTH = 3
+
+_available = {}
+
+
+# Rebuilding invoice_calllog (as SQLite migrations altering it do) drops the
+# triggers, in which case the index is stale and LIKE is used instead.
+def sqlite_search_available():
+    if connection.vendor != "sqlite":
+        return False
+    name = connection.settings_dict["NAME"]
+    if name not in _available:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name = %s OR tbl_name = %s",
+                [SQLITE_SEARCH_TABLE, "invoice_calllog"],
+            )
+            names = {row[0] for row in cursor.fetchall()}
+        _available[name] = SQLITE_SEARCH_TABLE in names and SQLITE_SEARCH_TRIGGERS <= names
+    return _available[name]
+
+
+def fts_phrase(term):
+    return '"%s"' % term.replace('"', '""')
+
+
+# One FTS5 query for "all of `words`, or any of `alternatives`", each matched
+# as a case-insensitive substring of the interpreter or customer name.
+# Returns None when a term is too short for the trigram index.
+def sqlite_contains_q(words, alternatives):
+    terms = list(words) + list(alternatives)
+    if not terms or any(len(term) < MIN_TRIGRAM_LENGTH for term in terms):
+        return None
+    groups = []
+    if words:
+        groups.append("(%s)" % " AND ".join(fts_phrase(word) for word in words))
+    groups.extend(fts_phrase(term) for term in alternatives)
+    return Q(
+        pk__in=RawSQL(
+            f"SELECT rowid FROM {SQLITE_SEARCH_TABLE} WHERE {SQLITE_SEARCH_TABLE} MATCH %s",
+            [" OR ".join(groups)],
+        )
+    )
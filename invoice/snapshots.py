@@ -0,0 +1,173 @@
+import json
+import os
+import shutil
+from decimal import Decimal
+from tempfile import mkdtemp
+
+import numpy as np
+from django.conf import settings
+from django.db import models
+from django.utils.functional import cached_property
+
+from .archive import month_start, shift_period
+from .caching import call_log_version
+from .exports import EXPORT_CHUNK_SIZE, ExportCallLogResource
+from .instrumentation import stage
+from .models import CallLog
+
+# How a column's cells are stored: text as fixed-width unicode, numbers as
+# int64 or, when some are blank, as float64 with NaN for the blanks. All of
+# them can be memory-mapped, unlike arrays of Python objects. Decimals are
+# stored as float64 and rounded back to the field's decimal places.
+TEXT, INTEGER, NUMBER, DECIMAL = "text", "integer", "number", "decimal"
+# What the export resource renders for a missing value
+BLANK = ""
+
+
+def snapshot_root():
+    return getattr(settings, "CALL_LOG_SNAPSHOT_DIR", None)
+
+
+def snapshots_enabled():
+    return bool(snapshot_root())
+
+
+def column_kind(field):
+    model_field = CallLog._meta.get_field(field.attribute)
+    if isinstance(model_field, models.IntegerField):
+        return INTEGER
+    if isinstance(model_field, models.DecimalField):
+        return DECIMAL
+    if isinstance(model_field, models.FloatField):
+        return NUMBER
+    return TEXT
+
+
+def encode_column(kind, values):
+    if kind == TEXT:
+        return np.array(values, dtype=str)
+    if kind == INTEGER and BLANK not in values:
+        return np.array(values, dtype=np.int64)
+    return np.array([np.nan if value == BLANK else float(value) for value in values])
+
+
+# Back to the Python values the export resource renders
+def decode_column(kind, array, places=None):
+    values = array.tolist()
+    if array.dtype.kind != "f":
+        return values
+    if kind == INTEGER:
+        return [BLANK if value != value else int(value) for value in values]
+    if kind == DECIMAL:
+        return [BLANK if value != value else Decimal(f"{value:.{places}f}") for value in values]
+    return [BLANK if value != value else value for value in values]
+
+
+# The call log export's cells for one month (or, for period None, the call
+# logs without a Call Time), rendered by the export resource once and kept
+# as one .npy file per column, plus the pks to put the months back in
+# changelist order. Snapshots are kept per call log version, so any import
+# or other change to call logs makes new ones be built.
+class MonthSnapshot:
+    def __init__(self, period, version=None):
+        self.period = period
+        self.version = call_log_version() if version is None else version
+        self.path = os.path.join(snapshot_root(), str(self.version), period or "undated")
+
+    def load(self):
+        if not os.path.exists(os.path.join(self.path, "columns.json")):
+            with stage("snapshot"):
+                self.build()
+        with open(os.path.join(self.path, "columns.json")) as f:
+            kinds = json.load(f)
+        return {
+            name: (kind, np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r"))
+            for name, kind in kinds
+        }
+
+    def build(self):
+        if self.period is None:
+            queryset = CallLog.objects.filter(Call_Time__isnull=True)
+        else:
+            queryset = CallLog.objects.filter(
+                Call_Time__gte=month_start(self.period),
+                Call_Time__lt=month_start(shift_period(self.period, 1)),
+            )
+        queryset = queryset.order_by("pk")
+        resource = ExportCallLogResource()
+        fields = resource.get_export_fields()
+        columns = [[] for _ in fields]
+        pks = []
+        for obj in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            pks.append(obj.pk)
+            for column, field in zip(columns, fields):
+                column.append(resource.export_field(field, obj))
+
+        root = snapshot_root()
+        os.makedirs(root, exist_ok=True)
+        # Snapshots of earlier versions can't be used any more
+        for name in os.listdir(root):
+            if name != str(self.version) and not name.startswith("."):
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+        # Written aside and moved in place, so no worker reads a half-written one
+        building = mkdtemp(prefix=".", dir=root)
+        kinds = []
+        for field, values in zip(fields, columns):
+            kind = column_kind(field)
+            np.save(os.path.join(building, f"{field.attribute}.npy"), encode_column(kind, values))
+            kinds.append((field.attribute, kind))
+        np.save(os.path.join(building, "pk.npy"), np.array(pks, dtype=np.int64))
+        kinds.append(("pk", INTEGER))
+        with open(os.path.join(building, "columns.json"), "w") as f:
+            json.dump(kinds, f)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        try:
+            os.rename(building, self.path)
+        except OSError:
+            # Another worker built it first
+            shutil.rmtree(building, ignore_errors=True)
+
+
+# Rows of the call log export for whole months, optionally of one service
+# center, in the changelist's default order, newest pk first. Stands in for the
+# queryset in run_export.
+class CallLogSnapshot:
+    model = CallLog
+
+    def __init__(self, periods, service_center=None):
+        self.periods = periods
+        self.service_center = service_center
+
+    # (kind, cells) of every exported field, in export order
+    @cached_property
+    def columns(self):
+        names = [field.attribute for field in ExportCallLogResource().get_export_fields()]
+        version = call_log_version()
+        months = [MonthSnapshot(period, version).load() for period in self.periods]
+        if not months:
+            return [(TEXT, np.zeros(0, dtype=str)) for name in names]
+
+        def combined(name):
+            kind = months[0][name][0]
+            return kind, np.concatenate([month[name][1] for month in months])
+
+        order = np.argsort(-combined("pk")[1])
+        if self.service_center is not None:
+            order = order[combined("Service_Center")[1][order] == self.service_center]
+        return [(kind, cells[order]) for kind, cells in map(combined, names)]
+
+    def count(self):
+        return len(self.columns[0][1])
+
+    def rows(self):
+        places = [
+            getattr(CallLog._meta.get_field(field.attribute), "decimal_places", None)
+            for field in ExportCallLogResource().get_export_fields()
+        ]
+        for start in range(0, self.count(), EXPORT_CHUNK_SIZE):
+            yield from zip(
+                *(
+                    decode_column(kind, cells[start:start + EXPORT_CHUNK_SIZE], column_places)
+                    for (kind, cells), column_places in zip(self.columns, places)
+                )
+            )
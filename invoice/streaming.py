@@ -0,0 +1,57 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.http import StreamingHttpResponse
+
+
+# A streaming response that StreamingASGIHandler reads with async for, each
+# chunk made in the request's thread while the event loop serves other
+# requests. That is also the thread the view ran in, so the download keeps
+# its database connection and cursor. Under WSGI (runserver) it streams like
+# any StreamingHttpResponse.
+class ThreadedStreamingHttpResponse(StreamingHttpResponse):
+    # Same flag Django 4.2 sets on responses with an async iterator
+    is_async = True
+
+    async def __aiter__(self):
+        chunks = iter(self.streaming_content)
+        read = sync_to_async(next, thread_sensitive=True)
+        while True:
+            chunk = await read(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+
+# Django 4.1 reads streaming responses with a plain for loop on the event
+# loop, so one large download stalls every other request until it ends.
+# Responses that set is_async are read with async for instead, as Django
+# 4.2 does.
+class StreamingASGIHandler(ASGIHandler):
+    async def send_response(self, response, send):
+        if not getattr(response, "is_async", False):
+            return await super().send_response(response, send)
+
+        response_headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode("ascii")
+            if isinstance(value, str):
+                value = value.encode("latin1")
+            response_headers.append((bytes(header), bytes(value)))
+        for c in response.cookies.values():
+            response_headers.append((b"Set-Cookie", c.output(header="").encode("ascii").strip()))
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": response.status_code,
+                    "headers": response_headers,
+                }
+            )
+            async for part in response:
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body"})
+        finally:
+            # Also stops the rows where they are if the client went away
+            await sync_to_async(response.close, thread_sensitive=True)()
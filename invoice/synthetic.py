@@ -0,0 +1,136 @@
+import csv
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+from openpyxl import Workbook
+
+from .caching import call_logs_changed
+from .importer import CALL_LOG_HEADERS
+from .models import CallLog, Interpreter
+
+LANGUAGES = ["Spanish", "French", "Portuguese", "Arabic", "Mandarin", "Russian"]
+CUSTOMERS = ["Acme Health", "Globex Clinic", "Initech Legal", "Umbrella Care"]
+RATE = Decimal("0.25")
+SEED_BATCH_SIZE = 5000
+# Column titles as the vendor export writes them
+FILE_HEADERS = [header.replace("_", " ") for header in CALL_LOG_HEADERS]
+INTERPRETER_LIST_HEADERS = ["Name", "Payment Method", "Service Center"]
+# An XLSX sheet holds 1,048,576 rows, the header included
+XLSX_MAX_ROWS = 1048575
+
+
+def interpreter_name(number):
+    return f"Interpreter {number:04d}"
+
+
+def interpreters(count, rng):
+    return [
+        Interpreter(
+            Name=interpreter_name(number),
+            Payment_Method=rng.choice(Interpreter.PAYMENT_CHOICES)[0],
+            Service_Center=rng.choice(Interpreter.CENTER_CHOICES)[0],
+        )
+        for number in range(count)
+    ]
+
+
+def call_logs(count, interpreters, rng, start=None, days=365, prefix="S"):
+    start = start or timezone.make_aware(datetime(2023, 1, 1))
+    minutes_in_range = days * 24 * 60
+    for number in range(count):
+        interpreter = rng.choice(interpreters)
+        minutes = rng.randint(1, 60)
+        yield CallLog(
+            CallId=f"{prefix}{number}",
+            Call_Time=start + timedelta(minutes=rng.randrange(minutes_in_range)),
+            Interpreter_Calltime=minutes,
+            Language=rng.choice(LANGUAGES),
+            Interpreter_Pay=RATE * minutes,
+            Interpreter_Name=interpreter.Name,
+            Interpreter=interpreter,
+            Customer_Name=rng.choice(CUSTOMERS),
+            Service_Center=interpreter.Service_Center,
+        )
+
+
+# Fills the current database with reproducible fake interpreters and call
+# logs. InterpreterTotal is left alone; run rebuild_totals afterwards if the
+# totals matter.
+def seed(rows, interpreter_count=200, seed=0, progress=None, **kwargs):
+    rng = random.Random(seed)
+    people = Interpreter.objects.bulk_create(interpreters(interpreter_count, rng))
+    calls = call_logs(rows, people, rng, **kwargs)
+    done = 0
+    while done < rows:
+        batch = [next(calls) for _ in range(min(SEED_BATCH_SIZE, rows - done))]
+        CallLog.objects.bulk_create(batch)
+        done += len(batch)
+        if progress:
+            progress(done)
+    call_logs_changed()
+    return done
+
+
+# Rows in the 16-column layout of the vendor call log export, for the
+# interpreters `names`. Columns the import ignores get plausible values too,
+# so the files are as large as real ones.
+def call_log_rows(count, names, rng, start=None, days=365, prefix="S"):
+    start = start or datetime(2023, 1, 1)
+    minutes_in_range = days * 24 * 60
+    for number in range(count):
+        interpreter = rng.randrange(len(names))
+        language = rng.randrange(len(LANGUAGES))
+        minutes = rng.randint(1, 60)
+        yield [
+            f"{prefix}{number}",
+            f"555{rng.randrange(10**7):07d}",
+            start + timedelta(minutes=rng.randrange(minutes_in_range)),
+            minutes * 60 - rng.randrange(60),
+            "IVR",
+            "",
+            minutes,
+            minutes,
+            1000 + interpreter,
+            language + 1,
+            LANGUAGES[language],
+            RATE * minutes,
+            "Y",
+            f"AC{rng.randrange(100):02d}",
+            names[interpreter],
+            rng.choice(CUSTOMERS),
+        ]
+
+
+def write_csv(path, headers, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        writer.writerows(rows)
+
+
+# Write-only workbooks stream rows to disk instead of keeping them all
+def write_xlsx(path, headers, rows):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx}
+
+
+def write_call_log_file(path, file_format, rows):
+    WRITERS[file_format](path, FILE_HEADERS, rows)
+
+
+# Same layout as documents/InterpreterList.csv
+def write_interpreter_list(path, interpreters):
+    write_csv(
+        path,
+        INTERPRETER_LIST_HEADERS,
+        ([person.Name, person.Payment_Method, person.Service_Center] for person in interpreters),
+    )
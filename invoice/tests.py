@@ -1,3 +1,720 @@
-from django.test import TestCase
+import csv
+import io
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import tablib
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .admin import ImportCallLogResource, retry_jobs, update_service_center
+from .archive import archive_before, current_month, restore_call_ids, restore_period
+from .caching import call_log_version
+from .dedup import file_digest
+from .exports import ExportCallLogResource, export_rows
+from .importer import CallLogImportError, import_call_log_files, import_call_logs
+from .jobs import (
+    STALE_JOB_AGE,
+    JobLost,
+    JobProgress,
+    claim_job,
+    claim_next_job,
+    enqueue,
+    run_job,
+    selection_changelist,
+    selection_params,
+)
+from .models import (
+    ArchivedCallLog,
+    CallLog,
+    DailyTotal,
+    ImportedFile,
+    Interpreter,
+    InterpreterTotal,
+    Job,
+)
+from .snapshots import CallLogSnapshot
+from .synthetic import FILE_HEADERS
+from .totals import (
+    TotalsDelta,
+    apply_deltas,
+    call_log_summary,
+    daily_total_summary,
+    rebuild_totals,
+)
+
+TEST_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+# A row in the vendor's 16-column layout
+def call_row(call_id, name, pay, minutes, when, language="Spanish"):
+    return [
+        call_id, "5550000000", when, minutes * 60, "IVR", "", minutes, minutes,
+        "1000", "1", language, pay, "Y", "AC01", name, "Acme Health",
+    ]
+
+
+def csv_bytes(rows):
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(FILE_HEADERS)
+    writer.writerows(rows)
+    return text.getvalue().encode()
+
+
+def csv_file(rows):
+    return io.BytesIO(csv_bytes(rows))
+
+
+# Every test gets a cache, media and snapshot folder of its own
+class InvoiceTestCase(TestCase):
+    def setUp(self):
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder, ignore_errors=True)
+        overrides = override_settings(
+            CACHES=TEST_CACHES,
+            MEDIA_ROOT=os.path.join(folder, "media"),
+            CALL_LOG_SNAPSHOT_DIR=os.path.join(folder, "snapshots"),
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # Each import and export would log a line
+        logger = logging.getLogger("invoice.pipeline")
+        self.addCleanup(logger.setLevel, logger.level)
+        logger.setLevel(logging.WARNING)
+        self.spanish = Interpreter.objects.create(Name="Ana Ruiz", Service_Center="WWI Spanish")
+        self.foreign = Interpreter.objects.create(Name="Li Wei", Service_Center="WWI Foreign")
+        self.user = User.objects.create_superuser("admin", password=None)
+
+    def admin_request(self):
+        request = RequestFactory().post("/")
+        request.user = self.user
+        request._messages = CookieStorage(request)
+        return request
+
+
+# The totals kept up to date with every write must come out the same as
+# rebuilding them from the call logs
+class IncrementalTotalsTests(InvoiceTestCase):
+    def totals(self):
+        monthly = sorted(
+            InterpreterTotal.objects.values_list(
+                "Interpreter_Name", "Period", "Call_Count", "Total_Amount", "Total_Minutes"
+            )
+        )
+        daily = sorted(
+            (name, center, language, day, calls, amount, minutes, round(per_minute, 6))
+            for name, center, language, day, calls, amount, minutes, per_minute in (
+                DailyTotal.objects.values_list(
+                    "Interpreter_Name",
+                    "Service_Center",
+                    "Language",
+                    "Day",
+                    "Call_Count",
+                    "Total_Amount",
+                    "Total_Minutes",
+                    "Pay_Per_Minute",
+                )
+            )
+        )
+        interpreters = sorted(
+            Interpreter.objects.values_list("Name", "Total_Amount", "Total_Minutes")
+        )
+        return monthly, daily, interpreters
+
+    def assertTotalsRebuilt(self):
+        incremental = self.totals()
+        self.assertTrue(incremental[1], "no daily totals were written")
+        rebuild_totals()
+        self.assertEqual(incremental, self.totals())
+
+    def fast_import(self, rows):
+        import_call_logs(csv_file(rows), "csv")
+
+    def admin_import(self, rows, bulk=False):
+        dataset = tablib.Dataset().load(csv_bytes(rows).decode(), format="csv")
+        result = ImportCallLogResource(bulk=bulk).import_data(dataset, use_transactions=True)
+        self.assertFalse(result.has_errors() or result.has_validation_errors())
+
+    def first_rows(self):
+        return [
+            call_row("c1", "Ana Ruiz", "7.00", 28, "2023-03-01 10:00"),
+            call_row("c2", "Ana Ruiz", "3.50", 14, "2023-03-02 11:00", "French"),
+            call_row("c3", "Li Wei", "5.00", 20, "2023-04-10 09:30", "Mandarin"),
+        ]
+
+    def test_fast_import(self):
+        self.fast_import(self.first_rows())
+        self.assertTotalsRebuilt()
+
+    def test_multi_file_import(self):
+        rows = self.first_rows()
+        import_call_log_files(
+            [("a.csv", "csv", csv_bytes(rows[:2])), ("b.csv", "csv", csv_bytes(rows[2:]))],
+            processes=1,
+        )
+        self.assertTotalsRebuilt()
+
+    def test_admin_import(self):
+        self.admin_import(self.first_rows())
+        self.assertTotalsRebuilt()
+        self.admin_import([call_row("c1", "Ana Ruiz", "9.00", 30, "2023-03-05 10:00")])
+        self.assertTotalsRebuilt()
+
+    def test_admin_bulk_import(self):
+        self.admin_import(self.first_rows(), bulk=True)
+        self.assertTotalsRebuilt()
+        self.admin_import([call_row("c1", "Ana Ruiz", "9.00", 30, "2023-03-05 10:00")], bulk=True)
+        self.assertTotalsRebuilt()
+
+    def test_update_service_center(self):
+        self.fast_import(self.first_rows())
+        update_service_center(
+            admin.site._registry[CallLog], self.admin_request(), CallLog.objects.all()
+        )
+        self.assertEqual(CallLog.objects.get(CallId="c1").Service_Center, "WWI Spanish")
+        self.assertTotalsRebuilt()
+
+    # The file has no Service Center, so an updated row keeps the stored one
+    def test_import_existing_call_id_after_update_service_center(self):
+        self.fast_import(self.first_rows())
+        update_service_center(
+            admin.site._registry[CallLog], self.admin_request(), CallLog.objects.all()
+        )
+        self.fast_import([call_row("c1", "Ana Ruiz", "7.00", 28, "2023-03-01 10:00")])
+        self.assertEqual(CallLog.objects.get(CallId="c1").Service_Center, "WWI Spanish")
+        self.assertFalse(DailyTotal.objects.filter(Service_Center=""))
+        self.assertTotalsRebuilt()
+        self.admin_import([call_row("c2", "Ana Ruiz", "4.00", 16, "2023-03-02 11:00", "French")])
+        self.assertTotalsRebuilt()
+
+    # Every March, whatever the year; each year's March only has one call
+    def test_daily_totals_of_a_month_without_a_year(self):
+        self.fast_import(
+            self.first_rows()
+            + [call_row("c4", "Ana Ruiz", "2.00", 8, "2024-03-05 10:00")]
+        )
+        model_admin = admin.site._registry[CallLog]
+        for query in ["period=all&Call_Time__month=3", "period=all&Call_Time__month=3&Call_Time__day=2"]:
+            with self.subTest(query=query):
+                changelist, request = selection_changelist(Job(Params={"query": query}), CallLog)
+                self.assertEqual(
+                    daily_total_summary(model_admin.daily_totals_for(changelist)),
+                    call_log_summary(changelist.get_queryset(request)),
+                )
+
+    def test_delete_archived_call_logs(self):
+        self.fast_import(self.first_rows())
+        archive_before("2023-04")
+        model_admin = admin.site._registry[ArchivedCallLog]
+        request = self.admin_request()
+        model_admin.delete_model(request, ArchivedCallLog.objects.get(CallId="c1"))
+        self.assertTotalsRebuilt()
+        model_admin.delete_queryset(request, ArchivedCallLog.objects.all())
+        self.assertTotalsRebuilt()
+        for model in [InterpreterTotal, DailyTotal]:
+            self.assertFalse(admin.site._registry[model].has_delete_permission(request))
+
+    def test_admin_edit_and_delete(self):
+        self.fast_import(self.first_rows())
+        model_admin = admin.site._registry[CallLog]
+        request = self.admin_request()
+        call = CallLog.objects.get(CallId="c1")
+        call.Interpreter_Pay = Decimal("8.25")
+        call.Call_Time = timezone.make_aware(datetime(2023, 5, 1, 8))
+        model_admin.save_model(request, call, None, True)
+        self.assertTotalsRebuilt()
+        added = CallLog(
+            CallId="c9", Interpreter_Name="Li Wei", Interpreter_Pay=Decimal("2"), Interpreter_Calltime=8
+        )
+        model_admin.save_model(request, added, None, False)
+        self.assertTotalsRebuilt()
+        model_admin.delete_model(request, CallLog.objects.get(CallId="c2"))
+        self.assertTotalsRebuilt()
+        model_admin.delete_queryset(request, CallLog.objects.filter(CallId__in=["c3", "c9"]))
+        self.assertTotalsRebuilt()
+
+    def test_archive_and_restore(self):
+        self.fast_import(self.first_rows())
+        self.assertEqual(archive_before("2023-04"), 2)
+        self.assertTotalsRebuilt()
+        # Importing an archived CallId moves it back first
+        self.fast_import([call_row("c2", "Ana Ruiz", "4.00", 16, "2023-03-02 11:00", "French")])
+        self.assertTotalsRebuilt()
+        self.assertEqual(restore_period("2023-03"), 1)
+        self.assertTotalsRebuilt()
+
+
+class AdminImportTests(InvoiceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    # The preview runs in the request, the confirmed import as a job
+    def test_confirmed_import_is_queued(self):
+        rows = [
+            call_row("c1", "Ana Ruiz", "7.00", 28, "2023-03-01 10:00"),
+            call_row("c2", "Li Wei", "5.00", 20, "2023-04-10 09:30", "Mandarin"),
+        ]
+        model_admin = admin.site._registry[CallLog]
+        csv_format = [f().get_title() for f in model_admin.get_import_formats()].index("csv")
+        response = self.client.post(
+            reverse("admin:invoice_calllog_import"),
+            {
+                "import_file": SimpleUploadedFile("march.csv", csv_bytes(rows)),
+                "input_format": csv_format,
+                "import_again": "on",
+                "bulk_mode": "on",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["result"].bulk)
+        confirm_form = response.context["confirm_form"]
+        # Only the preview was in bulk mode; the job writes in batches anyway
+        self.assertFalse(confirm_form["bulk_mode"].value())
+        self.assertFalse(CallLog.objects.exists())
+
+        response = self.client.post(
+            reverse("admin:invoice_calllog_process_import"),
+            {name: confirm_form[name].value() or "" for name in confirm_form.fields},
+        )
+        job = Job.objects.get()
+        self.assertRedirects(response, reverse("admin:invoice_job_change", args=[job.pk]))
+        self.assertEqual((job.Kind, job.Params["import_again"]), (Job.IMPORT_CALL_LOGS, True))
+        self.assertTrue(job.Input_File.name.endswith(".csv"))
+        self.assertFalse(CallLog.objects.exists())
+
+        run_job(job)
+        self.assertEqual(job.Status, Job.DONE, job.Message)
+        self.assertEqual(sorted(CallLog.objects.values_list("CallId", flat=True)), ["c1", "c2"])
+
+    # No savepoint per row: the queries don't grow with the number of rows
+    def test_bulk_import_queries(self):
+        rows = [
+            call_row(f"c{i}", "Ana Ruiz", "1.00", 4, "2023-03-01 10:00") for i in range(200)
+        ]
+        for dry_run, saved in [(True, 0), (False, 200)]:
+            dataset = tablib.Dataset().load(csv_bytes(rows).decode(), format="csv")
+            resource = ImportCallLogResource(bulk=True)
+            with CaptureQueriesContext(connection) as queries:
+                result = resource.import_data(dataset, dry_run=dry_run, use_transactions=True)
+            self.assertEqual(result.totals["new"], 200)
+            self.assertLess(len(queries), 30)
+            self.assertEqual(CallLog.objects.count(), saved)
+
+
+class ChangelistTests(InvoiceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        import_call_logs(
+            csv_file(
+                [
+                    call_row("c1", "Ana Ruiz", "7.00", 28, "2023-03-01 10:00"),
+                    call_row("c2", "Li Wei", "5.00", 20, "2023-03-10 09:30"),
+                ]
+            ),
+            "csv",
+        )
+        update_service_center(
+            admin.site._registry[CallLog], self.admin_request(), CallLog.objects.all()
+        )
+
+    # The service center filter lists the choices without reading the table
+    def test_service_center_filter(self):
+        for model in [CallLog, ArchivedCallLog, DailyTotal]:
+            url = reverse(f"admin:invoice_{model._meta.model_name}_changelist")
+            with self.subTest(model=model.__name__):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, {"Service_Center__exact": "WWI Foreign"})
+                self.assertEqual(response.status_code, 200)
+                distinct = f'DISTINCT "{model._meta.db_table}"."Service_Center"'
+                self.assertFalse([query for query in queries if distinct in query["sql"]])
+                self.assertContains(response, "WWI Spanish")
+        response = self.client.get(
+            reverse("admin:invoice_calllog_changelist"),
+            {"period": "all", "Service_Center__exact": "WWI Foreign"},
+        )
+        self.assertEqual([call.CallId for call in response.context["cl"].result_list], ["c2"])
+
+
+class TotalsDeltaTests(InvoiceTestCase):
+    def call(self, pay, minutes, day, center="WWI Spanish", name="Ana Ruiz"):
+        return CallLog(
+            Interpreter_Name=name,
+            Service_Center=center,
+            Language="Spanish",
+            Call_Time=timezone.make_aware(datetime(2023, 3, day, 10)),
+            Interpreter_Pay=Decimal(pay),
+            Interpreter_Calltime=minutes,
+        )
+
+    def test_apply_sums_calls_per_month_and_day(self):
+        totals = TotalsDelta()
+        totals.add_call(self.call("6.00", 24, 1))
+        totals.add_call(self.call("4.00", 10, 1))
+        totals.add_call(self.call("2.00", 8, 2))
+        stats = totals.apply()
+        self.assertEqual(stats["interpreters"], 1)
+        self.assertEqual(stats["days"], 2)
+        monthly = InterpreterTotal.objects.get()
+        self.assertEqual(
+            (monthly.Period, monthly.Call_Count, monthly.Total_Amount, monthly.Total_Minutes),
+            ("2023-03", 3, Decimal("12.00"), 42),
+        )
+        first = DailyTotal.objects.get(Day=datetime(2023, 3, 1).date())
+        self.assertEqual((first.Call_Count, first.Total_Minutes), (2, 34))
+        self.assertAlmostEqual(first.Pay_Per_Minute, 6 / 24 + 4 / 10)
+        self.spanish.refresh_from_db()
+        self.assertEqual((self.spanish.Total_Amount, self.spanish.Total_Minutes), (12.0, 42))
+
+    def test_removing_every_call_deletes_the_total_rows(self):
+        totals = TotalsDelta()
+        totals.add_call(self.call("6.00", 24, 1))
+        totals.add_call(self.call("2.00", 8, 2, center="WWI Foreign"))
+        totals.apply()
+        totals.remove_call(self.call("6.00", 24, 1))
+        totals.apply()
+        self.assertEqual(DailyTotal.objects.get().Service_Center, "WWI Foreign")
+        totals.remove_call(self.call("2.00", 8, 2, center="WWI Foreign"))
+        totals.apply()
+        self.assertFalse(InterpreterTotal.objects.exists())
+        self.assertFalse(DailyTotal.objects.exists())
+        self.spanish.refresh_from_db()
+        self.assertIsNone(self.spanish.Total_Amount)
+
+    def test_apply_deltas_creates_updates_and_deletes(self):
+        fields = ["Interpreter_Name", "Period"]
+        sums = TotalsDelta.MONTHLY_FIELDS
+        apply_deltas(
+            InterpreterTotal,
+            fields,
+            sums,
+            {("A", "2023-01"): [2, Decimal("5"), 10], ("B", "2023-01"): [1, Decimal("1"), 3]},
+            "Interpreter_Name",
+        )
+        apply_deltas(
+            InterpreterTotal,
+            fields,
+            sums,
+            {
+                ("A", "2023-01"): [1, Decimal("2.50"), 4],
+                ("B", "2023-01"): [-1, Decimal("-1"), -3],
+                ("C", ""): [1, Decimal("0"), 0],
+            },
+            "Interpreter_Name",
+        )
+        self.assertEqual(
+            sorted(InterpreterTotal.objects.values_list(*fields, *sums)),
+            [("A", "2023-01", 3, Decimal("7.50"), 14), ("C", "", 1, Decimal("0.00"), 0)],
+        )
+
+
+class ImportDedupTests(InvoiceTestCase):
+    def rows(self, numbers):
+        return [
+            call_row(f"c{number}", "Ana Ruiz", "1.00", 4, f"2023-03-{number:02d} 10:00")
+            for number in numbers
+        ]
+
+    def call_ids(self):
+        return sorted(CallLog.objects.values_list("CallId", flat=True), key=lambda id: int(id[1:]))
+
+    def test_same_file_is_imported_once(self):
+        data = csv_bytes(self.rows(range(1, 4)))
+        self.assertEqual(import_call_logs(io.BytesIO(data), "csv")["created"], 3)
+        CallLog.objects.filter(CallId="c1").delete()
+        stats = import_call_logs(io.BytesIO(data), "csv")
+        self.assertIn("already_imported", stats)
+        self.assertEqual(self.call_ids(), ["c2", "c3"])
+        stats = import_call_logs(io.BytesIO(data), "csv", import_again=True)
+        self.assertEqual((stats["created"], stats["updated"]), (1, 2))
+
+    def test_chunks_of_earlier_files_are_skipped(self):
+        import_call_logs(csv_file(self.rows(range(1, 5))), "csv", chunk_size=2)
+        stats = import_call_logs(csv_file(self.rows([1, 2, 5, 6])), "csv", chunk_size=2)
+        self.assertEqual((stats["skipped"], stats["created"], stats["chunks"]), (2, 2, 1))
+        self.assertEqual(self.call_ids(), ["c1", "c2", "c3", "c4", "c5", "c6"])
+
+    def test_failed_import_keeps_its_committed_chunks(self):
+        rows = self.rows(range(1, 6))
+        rows[3][7] = "not a number"
+        data = csv_bytes(rows)
+        with self.assertRaises(CallLogImportError):
+            import_call_logs(io.BytesIO(data), "csv", chunk_size=2)
+        imported = ImportedFile.objects.get()
+        self.assertEqual((imported.Rows_Done, imported.Completed_At), (2, None))
+        self.assertEqual(self.call_ids(), ["c1", "c2"])
+
+    def test_import_resumes_after_the_committed_rows(self):
+        data = csv_bytes(self.rows(range(1, 6)))
+        import_call_logs(io.BytesIO(csv_bytes(self.rows([1, 2]))), "csv")
+        # As left by an attempt that failed after its first two rows
+        ImportedFile.objects.create(Sha256=file_digest(io.BytesIO(data)), Rows_Done=2)
+        stats = import_call_logs(io.BytesIO(data), "csv", chunk_size=2)
+        self.assertEqual((stats["resumed"], stats["created"], stats["updated"]), (2, 3, 0))
+        self.assertEqual(self.call_ids(), ["c1", "c2", "c3", "c4", "c5"])
+        self.assertIsNotNone(ImportedFile.objects.get(Rows_Done=5).Completed_At)
+
+    # Only the first attempt of an "Import again" job starts the file over
+    def test_retried_import_again_job_resumes(self):
+        data = csv_bytes(self.rows(range(1, 6)))
+        import_call_logs(io.BytesIO(data), "csv")
+        job = enqueue(
+            Job.IMPORT_CALL_LOGS, params={"import_again": True}, input_file=ContentFile(data, name="march.csv")
+        )
+        run_job(job)
+        self.assertEqual(job.Status, Job.DONE, job.Message)
+        self.assertEqual(job.Params["attempted"], True)
+        self.assertIn("Imported 5 call logs (0 new, 5 updated)", job.Message)
+        # As left by a retried attempt that failed after its first two rows
+        ImportedFile.objects.update(Rows_Done=2, Completed_At=None)
+        Job.objects.filter(pk=job.pk).update(Status=Job.PENDING)
+        job.refresh_from_db()
+        run_job(job)
+        self.assertEqual(job.Status, Job.DONE, job.Message)
+        self.assertIn("Imported 3 call logs", job.Message)
+        self.assertIn("Resumed after the 2 rows", job.Message)
+
+    def test_multi_file_import_leaves_out_files_imported_before(self):
+        first = csv_bytes(self.rows([1, 2]))
+        import_call_logs(io.BytesIO(first), "csv")
+        stats = import_call_log_files(
+            [("first.csv", "csv", first), ("second.csv", "csv", csv_bytes(self.rows([3])))],
+            processes=1,
+        )
+        self.assertEqual((stats["files"], stats["files_skipped"], stats["created"]), (1, 1, 1))
+
+    def test_failed_multi_file_import_saves_nothing(self):
+        bad = self.rows([3])
+        bad[0][7] = "not a number"
+        with self.assertRaises(CallLogImportError):
+            import_call_log_files(
+                [("good.csv", "csv", csv_bytes(self.rows([1, 2]))), ("bad.csv", "csv", csv_bytes(bad))],
+                processes=1,
+            )
+        self.assertFalse(CallLog.objects.exists())
+        self.assertFalse(ImportedFile.objects.exists())
+
+
+class ArchiveTests(InvoiceTestCase):
+    def setUp(self):
+        super().setUp()
+        import_call_logs(
+            csv_file(
+                [
+                    call_row("c1", "Ana Ruiz", "7.00", 28, "2023-02-10 10:00"),
+                    call_row("c2", "Ana Ruiz", "3.50", 14, "2023-03-02 11:00"),
+                    call_row("c3", "Li Wei", "5.00", 20, "2023-04-10 09:30"),
+                ]
+            ),
+            "csv",
+        )
+        self.pks = dict(CallLog.objects.values_list("CallId", "pk"))
+
+    def test_archive_keeps_rows_and_pks(self):
+        self.assertEqual(archive_before("2023-04", progress=lambda rows: None), 2)
+        self.assertEqual(list(CallLog.objects.values_list("CallId", flat=True)), ["c3"])
+        self.assertEqual(
+            dict(ArchivedCallLog.objects.values_list("CallId", "pk")),
+            {"c1": self.pks["c1"], "c2": self.pks["c2"]},
+        )
+        self.assertEqual(restore_period("2023-03"), 1)
+        self.assertEqual(CallLog.objects.get(CallId="c2").pk, self.pks["c2"])
+        self.assertEqual(list(ArchivedCallLog.objects.values_list("CallId", flat=True)), ["c1"])
+
+    def test_restore_call_ids(self):
+        archive_before("2023-04")
+        self.assertEqual(restore_call_ids(["c1", "c3", "", "unknown"]), 1)
+        self.assertEqual(sorted(CallLog.objects.values_list("CallId", flat=True)), ["c1", "c3"])
+
+
+class SnapshotTests(InvoiceTestCase):
+    def setUp(self):
+        super().setUp()
+        rows = [
+            call_row(f"c{number}", name, f"{number}.25", number, f"2023-0{month}-1{number % 10} 10:00")
+            for number, (name, month) in enumerate(
+                [("Ana Ruiz", 2), ("Li Wei", 2), ("Ana Ruiz", 3), ("Li Wei", 4), ("Ana Ruiz", 4)]
+            )
+        ]
+        rows.append(call_row("c9", "Li Wei", "", "", ""))
+        import_call_logs(csv_file(rows), "csv")
+        update_service_center(
+            admin.site._registry[CallLog], self.admin_request(), CallLog.objects.all()
+        )
+
+    def export(self, query):
+        model_admin = admin.site._registry[CallLog]
+        changelist, request = selection_changelist(Job(Params={"query": query}), CallLog)
+        snapshot = model_admin.snapshot_for(changelist)
+        self.assertIsInstance(snapshot, CallLogSnapshot)
+        rows = [list(row) for row in snapshot.rows()]
+        self.assertEqual(snapshot.count(), len(rows))
+        return rows, list(export_rows(ExportCallLogResource(), changelist.get_queryset(request)))
+
+    def test_snapshot_rows_match_the_database_export(self):
+        for query in [
+            "period=all",
+            "period=all&Call_Time__year=2023&Call_Time__month=4",
+            "period=all&Service_Center__exact=WWI+Foreign",
+        ]:
+            with self.subTest(query=query):
+                snapshot_rows, database_rows = self.export(query)
+                self.assertTrue(snapshot_rows)
+                self.assertEqual(snapshot_rows, database_rows)
+
+    # Only the Marches are loaded, not every month between the first and last
+    def test_month_without_a_year(self):
+        import_call_logs(
+            csv_file(
+                [
+                    call_row("c20", "Ana Ruiz", "2.00", 8, "2024-03-05 10:00"),
+                    call_row("c21", "Li Wei", "3.00", 9, "2023-06-01 10:00"),
+                ]
+            ),
+            "csv",
+        )
+        snapshot_rows, database_rows = self.export("period=all&Call_Time__month=3")
+        self.assertEqual(len(database_rows), 2)
+        self.assertEqual(snapshot_rows, database_rows)
+
+    def test_sorted_or_searched_lists_have_no_snapshot(self):
+        model_admin = admin.site._registry[CallLog]
+        for query in ["period=all&o=2", "period=all&q=Ana"]:
+            changelist, request = selection_changelist(Job(Params={"query": query}), CallLog)
+            self.assertIsNone(model_admin.snapshot_for(changelist))
+
+    def test_changes_build_new_snapshots(self):
+        self.export("period=all")
+        version = call_log_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            import_call_logs(csv_file([call_row("c1", "Li Wei", "9.00", 36, "2023-02-11 10:00")]), "csv")
+        self.assertNotEqual(call_log_version(), version)
+        snapshot_rows, database_rows = self.export("period=all")
+        self.assertEqual(snapshot_rows, database_rows)
+        # The snapshots of the earlier version are gone
+        self.assertEqual(os.listdir(settings.CALL_LOG_SNAPSHOT_DIR), [str(call_log_version())])
+
+
+class JobQueueTests(InvoiceTestCase):
+    def test_claim_next_job_takes_the_oldest_pending_job(self):
+        first = enqueue(Job.EXPORT_INTERPRETERS)
+        second = enqueue(Job.EXPORT_INTERPRETERS)
+        Job.objects.filter(pk=first.pk).update(Status=Job.DONE)
+        third = enqueue(Job.EXPORT_INTERPRETERS)
+        claimed = claim_next_job()
+        self.assertEqual((claimed.pk, claimed.Status), (second.pk, Job.RUNNING))
+        self.assertIsNotNone(claimed.Started_At)
+        self.assertEqual(claim_next_job().pk, third.pk)
+        self.assertIsNone(claim_next_job())
+
+    def test_run_job_records_failures(self):
+        job = enqueue(Job.IMPORT_CALL_LOGS, self.user)
+        run_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.Status, Job.FAILED)
+        self.assertIn("Traceback", job.Message)
+        self.assertIsNotNone(job.Finished_At)
+
+    def test_retry_failed_and_stalled_imports(self):
+        now = timezone.now()
+        long_ago = now - STALE_JOB_AGE - timedelta(minutes=1)
+        jobs = {
+            name: enqueue(Job.IMPORT_CALL_LOGS) for name in ["failed", "stalled", "running", "done"]
+        }
+        Job.objects.filter(pk=jobs["failed"].pk).update(Status=Job.FAILED, Started_At=now)
+        Job.objects.filter(pk=jobs["stalled"].pk).update(
+            Status=Job.RUNNING, Started_At=long_ago, Heartbeat=long_ago
+        )
+        # Started long ago, but its worker still reports progress
+        Job.objects.filter(pk=jobs["running"].pk).update(
+            Status=Job.RUNNING, Started_At=long_ago, Heartbeat=now
+        )
+        Job.objects.filter(pk=jobs["done"].pk).update(Status=Job.DONE, Started_At=now)
+        retry_jobs(admin.site._registry[Job], self.admin_request(), Job.objects.all())
+        statuses = {name: Job.objects.get(pk=job.pk) for name, job in jobs.items()}
+        self.assertEqual(
+            {name: job.Status for name, job in statuses.items()},
+            {"failed": Job.PENDING, "stalled": Job.PENDING, "running": Job.RUNNING, "done": Job.DONE},
+        )
+        self.assertIsNone(statuses["stalled"].Started_At)
+        self.assertIsNone(statuses["stalled"].Heartbeat)
+        self.assertEqual(claim_next_job().pk, jobs["failed"].pk)
+
+    # A stalled worker that comes back after its job was retried stops and
+    # leaves the job to the worker that claimed it since
+    def test_retried_job_is_lost_to_its_old_worker(self):
+        job = enqueue(Job.IMPORT_CALL_LOGS)
+        self.assertTrue(claim_job(job))
+        progress = JobProgress(job)
+        progress(5, 10)
+        Job.objects.filter(pk=job.pk).update(Status=Job.PENDING, Heartbeat=None)
+        claimed = claim_next_job()
+        with self.assertRaises(JobLost):
+            progress(8, force=True)
+        job.Status, job.Message = Job.FAILED, "stale worker"
+        self.assertEqual(run_job(job).Status, Job.FAILED)
+        claimed.refresh_from_db()
+        self.assertEqual((claimed.Status, claimed.Message, claimed.Rows_Done), (Job.RUNNING, "", 5))
+
+    def test_selection_params(self):
+        CallLog.objects.bulk_create(CallLog(CallId=f"c{number}") for number in range(3))
+        queryset = CallLog.objects.order_by("pk")[:2]
+        request = RequestFactory().post("/?period=all&q=Ana", {"select_across": "0"})
+        self.assertEqual(selection_params(request, queryset), {"pks": [call.pk for call in queryset]})
+        request = RequestFactory().post("/?period=all&q=Ana", {"select_across": "1"})
+        self.assertEqual(selection_params(request, queryset), {"query": "period=all&q=Ana"})
+
+    def test_selection_queryset_is_rebuilt_from_the_query(self):
+        import_call_logs(
+            csv_file(
+                [
+                    call_row("c1", "Ana Ruiz", "7.00", 28, "2023-03-01 10:00"),
+                    call_row("c2", "Li Wei", "5.00", 20, "2023-04-10 09:30"),
+                ]
+            ),
+            "csv",
+        )
+        job = enqueue(Job.EXPORT_CALL_LOGS, self.user, {"query": "period=all&q=Li"})
+        run_job(job)
+        self.assertEqual(job.Status, Job.DONE, job.Message)
+        self.assertEqual(job.Message, "Exported 1 call logs.")
+
+    # Summed from the daily totals, which hold several calls each, for the
+    # month the export was queued in
+    def test_universal_export_of_a_queued_month(self):
+        import_call_logs(
+            csv_file(
+                [
+                    call_row("c1", "Ana Ruiz", "7.00", 28, "2023-03-01 10:00"),
+                    call_row("c2", "Ana Ruiz", "3.50", 14, "2023-03-01 11:00"),
+                    call_row("c3", "Li Wei", "5.00", 20, "2023-04-10 09:30"),
+                ]
+            ),
+            "csv",
+        )
+        job = enqueue(Job.EXPORT_UNIVERSAL, self.user, {"query": "period=month"})
+        self.assertEqual(job.Params["month"], current_month())
+        job = enqueue(
+            Job.EXPORT_UNIVERSAL, self.user, {"query": "period=last_month", "month": "2023-04"}
+        )
+        run_job(job)
+        self.assertEqual(job.Status, Job.DONE, job.Message)
+        self.assertEqual(job.Message, "Exported 2 call logs.")
+        job = enqueue(Job.EXPORT_UNIVERSAL, self.user, {"query": "period=month", "month": "2023-04"})
+        run_job(job)
+        self.assertEqual(job.Message, "Exported 1 call logs.")
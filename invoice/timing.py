@@ -0,0 +1,23 @@
+from time import perf_counter
+
+
+# Database execute wrapper counting the queries run and the time spent in them
+class QueryTimer:
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.seconds += perf_counter() - started
+
+
+def server_timing(name, seconds, description=None):
+    value = f"{name};dur={seconds * 1000:.1f}"
+    if description:
+        value += f';desc="{description}"'
+    return value
@@ -0,0 +1,274 @@
+from collections import defaultdict
+from decimal import Decimal
+from time import perf_counter
+
+from django.db import connections, router, transaction
+from django.db.models import Case, Count, F, FloatField, Max, Q, Sum, Value, When
+from django.db.models.functions import Cast, TruncDate
+from django.utils import timezone
+
+from .caching import call_logs_changed
+from .instrumentation import timed
+from .models import ArchivedCallLog, CallLog, DailyTotal, Interpreter, InterpreterTotal
+
+# Keeps IN (...) lookups under SQLite's bound parameter limit
+LOOKUP_BATCH_SIZE = 500
+WRITE_BATCH_SIZE = 500
+
+
+def batched(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+# bulk_update builds a CASE WHEN per row and field, which takes far longer in
+# Python than the database takes to run it; one UPDATE statement executed
+# for every row does the same for a fraction of the cost.
+def update_rows(model, rows, fields):
+    if not rows:
+        return
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    opts = model._meta
+    columns = [opts.get_field(name) for name in fields]
+    sql = "UPDATE %s SET %s WHERE %s = %%s" % (
+        quote(opts.db_table),
+        ", ".join("%s = %%s" % quote(field.column) for field in columns),
+        quote(opts.pk.column),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            sql,
+            [
+                [field.get_db_prep_save(getattr(row, field.attname), connection) for field in columns]
+                + [row.pk]
+                for row in rows
+            ],
+        )
+
+
+def day_of(call_time):
+    if call_time is None:
+        return None
+    if timezone.is_aware(call_time):
+        call_time = timezone.localtime(call_time, timezone.get_default_timezone())
+    return call_time.date()
+
+
+def period_of(call_time):
+    day = day_of(call_time)
+    return day.strftime("%Y-%m") if day else ""
+
+
+# Pay is cast to float first: SQLite may store whole amounts as integers and
+# would then divide them as integers.
+def pay_per_minute():
+    return Case(
+        When(Interpreter_Calltime=0, then=Value(0.0)),
+        default=Cast("Interpreter_Pay", FloatField()) / F("Interpreter_Calltime"),
+        output_field=FloatField(),
+    )
+
+
+def current_period():
+    return (
+        InterpreterTotal.objects.exclude(Period="").aggregate(Max("Period"))[
+            "Period__max"
+        ]
+        or ""
+    )
+
+
+def call_log_summary(queryset):
+    summary = queryset.order_by().aggregate(
+        Calls=Count("pk"),
+        Pay=Sum("Interpreter_Pay"),
+        Minutes=Sum("Interpreter_Calltime"),
+    )
+    # SQLite sums decimals as floats
+    summary["Pay"] = (summary["Pay"] or Decimal(0)).quantize(Decimal("0.01"))
+    summary["Minutes"] = summary["Minutes"] or 0
+    return summary
+
+
+def daily_total_summary(queryset):
+    summary = queryset.order_by().aggregate(
+        Calls=Sum("Call_Count"), Pay=Sum("Total_Amount"), Minutes=Sum("Total_Minutes")
+    )
+    summary["Calls"] = summary["Calls"] or 0
+    summary["Pay"] = (summary["Pay"] or Decimal(0)).quantize(Decimal("0.01"))
+    summary["Minutes"] = summary["Minutes"] or 0
+    return summary
+
+
+# Adds deltas ({key: [sums...]}) to the total rows of `model`, whose unique
+# key is `key_fields` and sums `sum_fields`. Existing rows are found by
+# `lookup_field`, the first key field narrowing the search enough.
+def apply_deltas(model, key_fields, sum_fields, deltas, lookup_field):
+    existing = {}
+    values = {key[key_fields.index(lookup_field)] for key in deltas}
+    lookups = [Q(**{f"{lookup_field}__in": batch}) for batch in batched(values - {None}, LOOKUP_BATCH_SIZE)]
+    if None in values:
+        lookups.append(Q(**{f"{lookup_field}__isnull": True}))
+    for lookup in lookups:
+        for total in model.objects.select_for_update().filter(lookup):
+            existing[tuple(getattr(total, field) for field in key_fields)] = total
+
+    created, updated, emptied = [], [], []
+    for key, sums in deltas.items():
+        total = existing.get(key)
+        if total is None:
+            total = model(**dict(zip(key_fields, key)))
+        for field, value in zip(sum_fields, sums):
+            setattr(total, field, getattr(total, field) + value)
+        if total.Call_Count <= 0:
+            if total.pk:
+                emptied.append(total.pk)
+        elif total.pk:
+            updated.append(total)
+        else:
+            created.append(total)
+
+    model.objects.bulk_create(created, batch_size=WRITE_BATCH_SIZE)
+    update_rows(model, updated, sum_fields)
+    for batch in batched(emptied, LOOKUP_BATCH_SIZE):
+        model.objects.filter(pk__in=batch).delete()
+
+
+# Accumulates per (interpreter, period) and per (interpreter, center,
+# language, day) changes in memory so they can be written to InterpreterTotal
+# and DailyTotal in one pass.
+class TotalsDelta:
+    MONTHLY_FIELDS = ["Call_Count", "Total_Amount", "Total_Minutes"]
+    DAILY_KEY = ["Interpreter_Name", "Service_Center", "Language", "Day"]
+    DAILY_FIELDS = ["Call_Count", "Total_Amount", "Total_Minutes", "Pay_Per_Minute"]
+
+    def __init__(self):
+        self.deltas = defaultdict(lambda: [0, Decimal(0), 0])
+        self.daily = defaultdict(lambda: [0, Decimal(0), 0, 0.0])
+
+    def add(self, name, center, language, day, pay, minutes, per_minute, sign=1, calls=1):
+        sums = [sign * calls, sign * Decimal(pay or 0), sign * (minutes or 0)]
+        delta = self.deltas[(name, day.strftime("%Y-%m") if day else "")]
+        daily = self.daily[(name, center, language, day)]
+        for index, value in enumerate(sums):
+            delta[index] += value
+            daily[index] += value
+        daily[3] += sign * (per_minute or 0)
+
+    def add_call(self, call, sign=1):
+        minutes = call.Interpreter_Calltime
+        self.add(
+            call.Interpreter_Name,
+            call.Service_Center,
+            call.Language,
+            day_of(call.Call_Time),
+            call.Interpreter_Pay,
+            minutes,
+            float(call.Interpreter_Pay or 0) / minutes if minutes else 0,
+            sign,
+        )
+
+    def remove_call(self, call):
+        self.add_call(call, sign=-1)
+
+    def grouped(self, queryset, *fields):
+        return (
+            queryset.order_by()
+            .annotate(Day=TruncDate("Call_Time", tzinfo=timezone.get_default_timezone()))
+            .values("Interpreter_Name", "Service_Center", "Language", "Day", *fields)
+            .annotate(
+                Calls=Count("pk"),
+                Pay=Sum("Interpreter_Pay"),
+                Minutes=Sum("Interpreter_Calltime"),
+                Per_Minute=Sum(pay_per_minute()),
+            )
+        )
+
+    def add_row(self, row, sign=1, center=None):
+        self.add(
+            row["Interpreter_Name"],
+            row["Service_Center"] if center is None else center,
+            row["Language"],
+            row["Day"],
+            row["Pay"],
+            row["Minutes"],
+            row["Per_Minute"],
+            sign,
+            calls=row["Calls"],
+        )
+
+    def add_queryset(self, queryset, sign=1):
+        for row in self.grouped(queryset):
+            self.add_row(row, sign)
+
+    def remove_queryset(self, queryset):
+        self.add_queryset(queryset, sign=-1)
+
+    # For call logs about to get their interpreter's service center
+    def move_to_interpreter_center(self, queryset):
+        for row in self.grouped(queryset, "Interpreter__Service_Center"):
+            self.add_row(row, sign=-1)
+            self.add_row(row, center=row["Interpreter__Service_Center"])
+
+    @timed("totals")
+    def apply(self):
+        started = perf_counter()
+        deltas = {key: delta for key, delta in self.deltas.items() if any(delta)}
+        daily = {key: delta for key, delta in self.daily.items() if any(delta)}
+        self.deltas.clear()
+        self.daily.clear()
+        names = {name for name, _ in deltas}
+
+        with transaction.atomic():
+            apply_deltas(
+                InterpreterTotal,
+                ["Interpreter_Name", "Period"],
+                self.MONTHLY_FIELDS,
+                deltas,
+                "Interpreter_Name",
+            )
+            apply_deltas(DailyTotal, self.DAILY_KEY, self.DAILY_FIELDS, daily, "Day")
+            refresh_interpreter_totals()
+
+        return {
+            "interpreters": len(names),
+            "periods": len({period for _, period in deltas}),
+            "days": len({key[3] for key in daily}),
+            "seconds": perf_counter() - started,
+        }
+
+
+# Interpreter.Total_Amount / Total_Minutes mirror the latest billing period
+def refresh_interpreter_totals():
+    totals = {
+        name: (float(amount), minutes)
+        for name, amount, minutes in InterpreterTotal.objects.filter(
+            Period=current_period()
+        ).values_list("Interpreter_Name", "Total_Amount", "Total_Minutes")
+    }
+    changed = []
+    for interpreter in Interpreter.objects.only("Name", "Total_Amount", "Total_Minutes"):
+        amount, minutes = totals.get(interpreter.Name, (None, None))
+        if (interpreter.Total_Amount, interpreter.Total_Minutes) != (amount, minutes):
+            interpreter.Total_Amount = amount
+            interpreter.Total_Minutes = minutes
+            changed.append(interpreter)
+    Interpreter.objects.bulk_update(
+        changed, ["Total_Amount", "Total_Minutes"], batch_size=WRITE_BATCH_SIZE
+    )
+    return len(changed)
+
+
+def rebuild_totals():
+    with transaction.atomic():
+        InterpreterTotal.objects.all().delete()
+        DailyTotal.objects.all().delete()
+        totals = TotalsDelta()
+        totals.add_queryset(CallLog.objects.all())
+        totals.add_queryset(ArchivedCallLog.objects.all())
+        stats = totals.apply()
+        # Drops the cached summaries read from the daily totals
+        call_logs_changed()
+        return stats
@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wwi.settings')
+django.setup(set_prefix=False)
 
-application = get_asgi_application()
+# Like get_asgi_application(), with a handler that streams the admin's
+# CSV and XLSX downloads without blocking other requests
+from invoice.streaming import StreamingASGIHandler  # noqa: E402
+
+application = StreamingASGIHandler()
@@ -76,11 +76,48 @@ WSGI_APPLICATION = "wwi.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+# SQLite unless DB_ENGINE says otherwise. Production runs on PostgreSQL:
+# DB_ENGINE=postgresql with DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT.
+DB_ENGINE = os.environ.get("DB_ENGINE", "sqlite3")
+
+if DB_ENGINE == "sqlite3":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("DB_NAME", BASE_DIR / "db.sqlite3"),
+            # Seconds to wait for another connection's write to finish
+            "OPTIONS": {"timeout": 30},
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": f"django.db.backends.{DB_ENGINE}",
+            "NAME": os.environ.get("DB_NAME", "wwi"),
+            "USER": os.environ.get("DB_USER", ""),
+            "PASSWORD": os.environ.get("DB_PASSWORD", ""),
+            "HOST": os.environ.get("DB_HOST", ""),
+            "PORT": os.environ.get("DB_PORT", ""),
+            # DB_POOLER=pgbouncer when connecting through PgBouncer in
+            # transaction mode (deploy/pgbouncer.ini), which can't keep the
+            # server-side cursors the exports stream through
+            "DISABLE_SERVER_SIDE_CURSORS": os.environ.get("DB_POOLER") == "pgbouncer",
+        }
     }
+
+# Persistent connections: each process reuses its own connection across
+# requests instead of opening one per request. Shared pooling is PgBouncer's.
+DATABASES["default"]["CONN_MAX_AGE"] = int(os.environ.get("DB_CONN_MAX_AGE", 600))
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+# Applied to every new SQLite connection. WAL lets the admin keep reading
+# while an import writes; synchronous=NORMAL is still crash-safe with WAL.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "cache_size": -64000,
+    "mmap_size": 256 * 1024 * 1024,
 }
 
 
@@ -125,6 +162,23 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "static"),
 ]
 
+# Uploaded import files and generated export files of background jobs.
+# These are served through the admin job pages, never directly.
+MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+# Shared between the web server and the runjobs worker, so call log changes
+# made by either invalidate the cached admin summaries of both.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache"),
+    }
+}
+
+# Call log export snapshots, one folder of column files per month, rebuilt
+# whenever call logs change. None turns them off.
+CALL_LOG_SNAPSHOT_DIR = os.path.join(BASE_DIR, "cache", "snapshots")
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -133,3 +187,16 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 IMPORT_EXPORT_USE_TRANSACTIONS = True
 
 DATA_UPLOAD_MAX_NUMBER_FIELDS = None
+
+# Every import and export run is logged to "invoice.pipeline" as one JSON
+# line with its stage timings, besides showing up in the admin import history.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "invoice.pipeline": {"handlers": ["console"], "level": "INFO"},
+    },
+}